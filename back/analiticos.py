@@ -0,0 +1,236 @@
+"""
+Analíticos da turma por módulo, mantidos incrementalmente.
+
+Distribuição de notas, taxa de aprovação e ranking calculados com GROUP BY
+sobre `desempenho_modulo` disputariam a tabela com os envios dos alunos. Aqui
+cada correção de enviar_atividade atualiza, em memória, os contadores do
+módulo:
+  - a nota atual de cada aluno (a mesma linha que o upsert grava no banco), com
+    faixas de 10 pontos, soma das notas e quantidade de aprovados;
+  - o ranking (nota decrescente) mantido ordenado;
+  - erros por questão, contados a cada envio corrigido.
+O resumo de um módulo é montado uma vez e reaproveitado até o próximo envio
+daquele módulo; o custo da montagem não depende do número de alunos.
+
+reconstruir() refaz as notas, faixas e ranking a partir do histórico do banco
+(uma única consulta, SQL_HISTORICO_NOTAS). O app reconstrói na inicialização e
+periodicamente, o que também traz as notas corrigidas por outros workers; uma
+nota gravada durante a consulta entra na reconstrução seguinte. O banco guarda só a nota de cada
+envio, não as respostas, então os erros por questão não são reconstruídos:
+eles são salvos em um arquivo JSON (salvar/carregar_arquivo) e mantidos.
+"""
+import bisect
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+SQL_HISTORICO_NOTAS = """
+    SELECT d.modulo_id, d.aluno_id, a.nome, d.nota_final, d.status_modulo
+    FROM desempenho_modulo d
+    JOIN aluno a ON a.aluno_id = d.aluno_id
+    WHERE d.nota_final IS NOT NULL
+"""
+
+STATUS_APROVADO = 'Concluído'
+
+# Faixas de nota: [0, 10), [10, 20), ..., [90, 100]
+LARGURA_FAIXA = 10
+QUANTIDADE_FAIXAS = 10
+
+
+def faixa_da_nota(nota):
+    return min(max(int(nota // LARGURA_FAIXA), 0), QUANTIDADE_FAIXAS - 1)
+
+
+class _AnaliticoModulo:
+    __slots__ = ('notas', 'faixas', 'soma_notas', 'aprovados', 'ranking',
+                 'envios', 'envios_detalhados', 'erros', 'resumo')
+
+    def __init__(self):
+        self.notas = {}                       # aluno_id -> (nota, aprovado)
+        self.faixas = [0] * QUANTIDADE_FAIXAS
+        self.soma_notas = 0.0
+        self.aprovados = 0
+        self.ranking = []                     # [(-nota, aluno_id)] ordenado
+        self.envios = 0
+        self.envios_detalhados = 0            # envios com os erros por questão
+        self.erros = {}                       # id da questão -> erros
+        self.resumo = None
+
+    def definir_nota(self, aluno_id, nota, aprovado):
+        anterior = self.notas.get(aluno_id)
+        if anterior is not None:
+            nota_anterior, aprovado_anterior = anterior
+            self.faixas[faixa_da_nota(nota_anterior)] -= 1
+            self.soma_notas -= nota_anterior
+            self.aprovados -= aprovado_anterior
+            posicao = bisect.bisect_left(self.ranking, (-nota_anterior, aluno_id))
+            del self.ranking[posicao]
+        self.notas[aluno_id] = (nota, aprovado)
+        self.faixas[faixa_da_nota(nota)] += 1
+        self.soma_notas += nota
+        self.aprovados += aprovado
+        bisect.insort(self.ranking, (-nota, aluno_id))
+        self.resumo = None
+
+    def carregar_notas(self, notas):
+        """Substitui todas as notas de uma vez (uma ordenação, em vez de uma inserção por aluno)."""
+        self.notas = notas
+        self.faixas = [0] * QUANTIDADE_FAIXAS
+        for nota, _ in notas.values():
+            self.faixas[faixa_da_nota(nota)] += 1
+        self.soma_notas = sum(nota for nota, _ in notas.values())
+        self.aprovados = sum(aprovado for _, aprovado in notas.values())
+        self.ranking = sorted((-nota, aluno_id) for aluno_id, (nota, _) in notas.items())
+        self.resumo = None
+
+
+class AnaliticosTurma:
+    """Contadores por modulo_id, atualizados a cada correção e lidos sem consultar o banco."""
+
+    def __init__(self, tamanho_ranking=10):
+        self.tamanho_ranking = tamanho_ranking
+        self._modulos = {}
+        self._nomes = {}
+        self._lock = threading.Lock()
+        self._metricas = {'registros': 0, 'leituras': 0, 'resumos_montados': 0, 'reconstrucoes': 0}
+
+    def _modulo(self, modulo_id):
+        modulo = self._modulos.get(modulo_id)
+        if modulo is None:
+            modulo = self._modulos[modulo_id] = _AnaliticoModulo()
+        return modulo
+
+    def registrar(self, modulo_id, aluno_id, nome, nota, aprovado, questoes_erradas=None):
+        """Aplica uma correção: a nota substitui a anterior do aluno no módulo."""
+        with self._lock:
+            modulo = self._modulo(modulo_id)
+            modulo.definir_nota(aluno_id, float(nota), bool(aprovado))
+            modulo.envios += 1
+            if questoes_erradas is not None:
+                modulo.envios_detalhados += 1
+                for id_questao in questoes_erradas:
+                    modulo.erros[id_questao] = modulo.erros.get(id_questao, 0) + 1
+            if nome:
+                self._nomes[aluno_id] = nome
+            self._metricas['registros'] += 1
+
+    def resumo(self, modulo_id):
+        """Resumo do módulo, pronto para JSON (zerado se ninguém foi avaliado ainda)."""
+        with self._lock:
+            self._metricas['leituras'] += 1
+            modulo = self._modulos.get(modulo_id)
+            if modulo is None:
+                return self._montar_resumo(modulo_id, _AnaliticoModulo())
+            if modulo.resumo is None:
+                modulo.resumo = self._montar_resumo(modulo_id, modulo)
+                self._metricas['resumos_montados'] += 1
+            return modulo.resumo
+
+    def _montar_resumo(self, modulo_id, modulo):
+        alunos = len(modulo.notas)
+        ranking = []
+        for posicao, (nota_negativa, aluno_id) in enumerate(modulo.ranking[:self.tamanho_ranking], start=1):
+            ranking.append({
+                'posicao': posicao,
+                'aluno_id': aluno_id,
+                'nome': self._nomes.get(aluno_id, ''),
+                'nota': -nota_negativa,
+            })
+        erros = sorted(modulo.erros.items(), key=lambda item: (-item[1], item[0]))
+        return {
+            'modulo_id': modulo_id,
+            'alunos': alunos,
+            'aprovados': modulo.aprovados,
+            'taxa_aprovacao': modulo.aprovados / alunos if alunos else 0.0,
+            'nota_media': modulo.soma_notas / alunos if alunos else 0.0,
+            'histograma': [
+                {'de': indice * LARGURA_FAIXA, 'ate': (indice + 1) * LARGURA_FAIXA, 'alunos': quantidade}
+                for indice, quantidade in enumerate(modulo.faixas)
+            ],
+            'envios': modulo.envios,
+            'erros_por_questao': [
+                {'questao': id_questao, 'erros': quantidade,
+                 'taxa_erro': quantidade / modulo.envios_detalhados if modulo.envios_detalhados else 0.0}
+                for id_questao, quantidade in erros
+            ],
+            'ranking': ranking,
+        }
+
+    def modulos(self):
+        with self._lock:
+            return list(self._modulos)
+
+    # -----------------------------------------------------------------
+    # Reconstrução e persistência
+    # -----------------------------------------------------------------
+    def reconstruir(self, linhas):
+        """
+        Refaz notas, faixas e ranking a partir das linhas de SQL_HISTORICO_NOTAS.
+        Os contadores de envios e de erros por questão são mantidos.
+        """
+        notas_por_modulo = {}
+        nomes = {}
+        for linha in linhas:
+            aprovado = linha['status_modulo'] == STATUS_APROVADO
+            notas_por_modulo.setdefault(linha['modulo_id'], {})[linha['aluno_id']] = (float(linha['nota_final']), aprovado)
+            nomes[linha['aluno_id']] = linha['nome']
+        novos = {}
+        for modulo_id, notas in notas_por_modulo.items():
+            novos[modulo_id] = _AnaliticoModulo()
+            novos[modulo_id].carregar_notas(notas)
+
+        with self._lock:
+            for modulo_id, antigo in self._modulos.items():
+                novo = novos.get(modulo_id)
+                if novo is None:
+                    novo = novos[modulo_id] = _AnaliticoModulo()
+                novo.envios = antigo.envios
+                novo.envios_detalhados = antigo.envios_detalhados
+                novo.erros = antigo.erros
+            for novo in novos.values():
+                # Cada linha do histórico é ao menos um envio
+                novo.envios = max(novo.envios, len(novo.notas))
+            self._modulos = novos
+            self._nomes.update(nomes)
+            self._metricas['reconstrucoes'] += 1
+        logger.info("Analíticos reconstruídos: %d módulos, %d alunos.", len(novos), len(nomes))
+        return len(novos)
+
+    def salvar(self, caminho):
+        """Grava os erros por questão (o que o banco não tem) em JSON, de forma atômica."""
+        with self._lock:
+            dados = {
+                str(modulo_id): {'envios_detalhados': modulo.envios_detalhados, 'erros': dict(modulo.erros)}
+                for modulo_id, modulo in self._modulos.items() if modulo.envios_detalhados
+            }
+        temporario = caminho + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump({'modulos': dados}, arquivo, ensure_ascii=False)
+        os.replace(temporario, caminho)
+
+    def carregar_arquivo(self, caminho):
+        """Soma aos contadores os erros por questão salvos por salvar(); False se o arquivo não existe."""
+        try:
+            with open(caminho, encoding='utf-8') as arquivo:
+                dados = json.load(arquivo)
+        except FileNotFoundError:
+            return False
+        with self._lock:
+            for modulo_id, salvo in dados.get('modulos', {}).items():
+                modulo = self._modulo(int(modulo_id))
+                modulo.envios_detalhados += salvo.get('envios_detalhados', 0)
+                for id_questao, quantidade in salvo.get('erros', {}).items():
+                    modulo.erros[id_questao] = modulo.erros.get(id_questao, 0) + quantidade
+                modulo.resumo = None
+        return True
+
+    def estatisticas(self):
+        with self._lock:
+            metricas = dict(self._metricas)
+            metricas['modulos'] = len(self._modulos)
+            metricas['alunos'] = len(self._nomes)
+        return metricas
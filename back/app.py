@@ -6,19 +6,43 @@ try:
 except RuntimeError:
     pass
 
-from flask import Flask, render_template, request, redirect, url_for, session, current_app, flash
+from flask import Flask, render_template, request, redirect, url_for, session, current_app, flash, make_response, g, has_request_context
+from flask.logging import default_handler
 from flask_socketio import SocketIO, emit, disconnect
-from flask_mysqldb import MySQL
 # IMPORTAÇÕES DO CHATBOT
 from google import genai
 from google.genai import types
 from dotenv import load_dotenv
+from datetime import datetime
+from functools import wraps
 from uuid import uuid4
-from unidecode import unidecode
+from analiticos import AnaliticosTurma, SQL_HISTORICO_NOTAS
+from armazenamento_chats import ArmazenamentoChats, HistoricoChatsSQLite, caminho_padrao_historico
+from assets import Assets
+from banco import Banco, rotulo_sql
+from broker_local import criar_gerenciador
+from cache_fragmentos import CacheFragmentos, ExtensaoCacheFragmentos
+from cache_respostas import MINIMO_TOKENS, CacheRespostas, normalizar_pergunta
+from conteudo import CatalogoConteudo, caminho_padrao_pacote, normalizar_slug
+from executor_ia import ExecutorIA, ErroSobrecarga, ErroTempoEsgotado
+from gemini_fake import ClienteGeminiFake
+from limites import ErroLimiteTaxa, FilaJusta, LimitadorTaxa
+from log_assincrono import LogAssincrono
+from instrucoes_chat import CatalogoInstrucoes, resumir_modulo
+from gravacao_progresso import GravadorProgresso, SQL_DESBLOQUEIO, SQL_NIVEL_ALUNO, SQL_RESULTADO
+from metricas import JanelaLatencias, RegistroMetricas
+from pool_chaves import PoolChavesGemini, SessaoChat, classificar_erro_chave, ERRO_OUTRO
+from estrutura_curso import EstruturaCurso, SQL_MODULOS
+from perfis import CachePerfis, SQL_EMAIL_CADASTRADO, SQL_LOGIN_ALUNO, SQL_PERFIL_ALUNO, SQL_SENHA_ALUNO
+from progresso import ServicoProgresso, SQL_PROGRESSO_ALUNO
+from senhas import ServicoSenhas, MODO_TPOOL
+from voo_unico import ErroEsperaVooUnico, VooUnico
+import atexit
 import os
 import hashlib
-import json
-import re
+import logging
+import math
+import time
 
 NIVEIS_ORDEM = {
     'Básico': 'Intermediário',
@@ -29,6 +53,8 @@ NIVEIS_ORDEM = {
 # Carrega variáveis de ambiente (GENAI_KEY)
 load_dotenv()
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
 # *******************************************************************
 # CONFIGURAÇÃO GERAL DO FLASK E MYSQL
 # *******************************************************************
@@ -41,25 +67,136 @@ app.secret_key = 'levelup' # Mantenha a chave do app.py
 # CONFIGURAÇÃO DO CHATBOT: Substitua pela sua chave GENAI_KEY
 
 # CONFIGURAÇÃO DO BANCO DE DADOS (MySQL)
-app.config['MYSQL_HOST'] = 'localhost'
-app.config['MYSQL_USER'] = 'root'
-app.config['MYSQL_PASSWORD'] = 'senai'
-app.config['MYSQL_DB'] = 'levelup'
+app.config['MYSQL_HOST'] = os.getenv('MYSQL_HOST', 'localhost')
+app.config['MYSQL_USER'] = os.getenv('MYSQL_USER', 'root')
+app.config['MYSQL_PASSWORD'] = os.getenv('MYSQL_PASSWORD', 'senai')
+app.config['MYSQL_DB'] = os.getenv('MYSQL_DB', 'levelup')
+app.config['MYSQL_PORT'] = int(os.getenv('MYSQL_PORT', 3306))
 app.config['MYSQL_CURSORCLASS'] = 'DictCursor'
+# Pool de conexões (limite de conexões simultâneas e espera máxima por uma vaga)
+app.config['MYSQL_POOL_SIZE'] = int(os.getenv('MYSQL_POOL_SIZE', 10))
+app.config['MYSQL_POOL_TIMEOUT'] = float(os.getenv('MYSQL_POOL_TIMEOUT', 5))
+
+# Camada de acesso a dados: uma conexão do pool e um cursor por requisição
+banco = Banco(app)
+
+# HASH DE SENHAS (scrypt, calculado no pool de threads nativas para não travar o eventlet)
+servico_senhas = ServicoSenhas(
+    n=int(os.getenv('SENHAS_SCRYPT_N', 2 ** 14)),
+    r=int(os.getenv('SENHAS_SCRYPT_R', 8)),
+    p=int(os.getenv('SENHAS_SCRYPT_P', 1)),
+    modo=os.getenv('SENHAS_MODO', MODO_TPOOL),
+    max_simultaneos=int(os.getenv('SENHAS_MAX_SIMULTANEOS', 0)) or None,
+)
+
+# Imagens otimizadas e arquivos com hash gerados por build_assets.py (static/dist),
+# servidos em /assets com cache immutable; helpers asset_url() e imagem_responsiva()
+assets = Assets(app)
+
+# CACHE DE FRAGMENTOS DOS TEMPLATES ({% cache 'nome', partes... %} ... {% endcache %})
+app.jinja_env.add_extension(ExtensaoCacheFragmentos)
+cache_fragmentos = CacheFragmentos(max_entradas=int(os.getenv('FRAGMENTOS_CACHE_MAX', 1000)))
+if os.getenv('FRAGMENTOS_CACHE', '1') == '1':
+    app.jinja_env.cache_fragmentos = cache_fragmentos
 
-mysql = MySQL(app)
+# *******************************************************************
+# INSTRUMENTAÇÃO: MÉTRICAS (PROMETHEUS EM /metrics) E LOG SEM BLOQUEIO
+# *******************************************************************
+registro_metricas = RegistroMetricas()
+METRICA_HTTP_DURACAO = registro_metricas.histograma(
+    'http_requisicao_duracao_segundos', "Duração das requisições HTTP por rota.", ('rota', 'metodo', 'status'))
+METRICA_HTTP_SQL = registro_metricas.histograma(
+    'http_comandos_sql_por_requisicao', "Comandos SQL executados por requisição HTTP.", ('rota',),
+    limites=(0, 1, 2, 3, 4, 6, 8, 12, 20, 50))
+METRICA_SQL_DURACAO = registro_metricas.histograma(
+    'sql_duracao_segundos', "Duração dos comandos SQL por operação e tabela.", ('operacao',),
+    limites=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+METRICA_EVENTO_DURACAO = registro_metricas.histograma(
+    'socketio_evento_duracao_segundos', "Duração dos eventos do SocketIO.", ('evento',))
+METRICA_GEMINI_DURACAO = registro_metricas.histograma(
+    'gemini_chamada_duracao_segundos', "Duração das chamadas ao Gemini por índice da chave.", ('chave', 'modo', 'resultado'))
+METRICA_GEMINI_MIGRACOES = registro_metricas.contador(
+    'gemini_migracoes_total', "Conversas migradas para outra chave do Gemini.")
+
+banco.ao_executar = lambda sql, duracao: METRICA_SQL_DURACAO.observar(duracao, operacao=rotulo_sql(sql))
+
+# Os handlers de log rodam numa thread própria; as rotas só enfileiram o registro
+log_assincrono = LogAssincrono([default_handler], tamanho_fila=int(os.getenv('LOG_FILA_MAX', 10000)))
+log_assincrono.anexar(app.logger)
+# Registro de acesso das rotas mais usadas (substitui os prints de depuração):
+# guarda só LOG_AMOSTRAGEM dos registros informativos; avisos e erros sempre passam
+log_rotas = log_assincrono.anexar(logging.getLogger('levelup.rotas'),
+                                  taxa_amostragem=float(os.getenv('LOG_AMOSTRAGEM', 0.1)))
+log_rotas.setLevel(os.getenv('LOG_ROTAS_NIVEL', 'INFO'))
+log_assincrono.iniciar()
+atexit.register(log_assincrono.parar)
+
+@app.before_request
+def iniciar_medicao():
+    g._inicio_requisicao = time.perf_counter()
+
+@app.after_request
+def registrar_medicao(resposta):
+    inicio = g.pop('_inicio_requisicao', None)
+    if inicio is None:
+        return resposta
+    duracao = time.perf_counter() - inicio
+    rota = request.url_rule.rule if request.url_rule else 'sem_rota'
+    comandos_sql = g.get('_banco_comandos', 0)
+    METRICA_HTTP_DURACAO.observar(duracao, rota=rota, metodo=request.method, status=resposta.status_code)
+    METRICA_HTTP_SQL.observar(comandos_sql, rota=rota)
+    # Visível no painel de rede do navegador (tempo total e gasto no banco)
+    resposta.headers['Server-Timing'] = (
+        f'app;dur={duracao * 1000:.1f}, sql;dur={g.get("_banco_tempo_s", 0.0) * 1000:.1f};desc="{comandos_sql} comandos"'
+    )
+    return resposta
+
+def medir_evento(nome):
+    """Decorador dos handlers do SocketIO: registra a duração do evento."""
+    def decorador(f):
+        @wraps(f)
+        def medido(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                METRICA_EVENTO_DURACAO.observar(time.perf_counter() - inicio, evento=nome)
+        return medido
+    return decorador
 
 # CONFIGURAÇÃO DO SOCKETIO
+# Vários workers (servidor_multiprocesso.py): SOCKETIO_MESSAGE_QUEUE repassa os
+# emits entre os processos. Aceita redis://... (produção) ou levelup://host:porta
+# (broker local de broker_local.py, sem dependências).
+SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE') or None
+opcoes_fila_socketio = {}
+if SOCKETIO_MESSAGE_QUEUE:
+    gerenciador_fila = criar_gerenciador(SOCKETIO_MESSAGE_QUEUE)
+    if gerenciador_fila is not None:
+        opcoes_fila_socketio['client_manager'] = gerenciador_fila
+    else:
+        opcoes_fila_socketio['message_queue'] = SOCKETIO_MESSAGE_QUEUE
+
 # O SocketIO usará o objeto Flask (app)
 socketio = SocketIO(app, 
                     cors_allowed_origins="*",
                     # Garante que a sessão Flask seja acessível no SocketIO
                     manage_session=False, 
-                    async_mode='eventlet') 
+                    async_mode='eventlet',
+                    **opcoes_fila_socketio) 
 
 # -------------------------------------------------------------------
 # CONFIGURAÇÃO DO CHATBOT COM CHAVES ROTATIVAS (NOVO SISTEMA)
 # -------------------------------------------------------------------
+# GENAI_FAKE=1 usa um cliente simulado local (sem rede), para testes de carga
+GENAI_FAKE = os.getenv('GENAI_FAKE') == '1'
+
+def criar_cliente_genai(api_key):
+    """Cria o cliente Gemini real ou o simulado, conforme GENAI_FAKE."""
+    if GENAI_FAKE:
+        return ClienteGeminiFake(api_key=api_key)
+    return genai.Client(api_key=api_key)
+
 # 1. Carregar todas as chaves disponíveis do .env
 GENAI_KEYS = []
 i = 1   
@@ -67,87 +204,238 @@ while os.getenv(f"GENAI_KEY_{i}"):
     GENAI_KEYS.append(os.getenv(f"GENAI_KEY_{i}"))
     i += 1
 
+if not GENAI_KEYS and GENAI_FAKE:
+    GENAI_KEYS.append('chave-simulada')
+
 if not GENAI_KEYS:
     # Se isso acontecer, ele para o programa e alerta que não há chaves.
     raise RuntimeError("Nenhuma chave Gemini API encontrada no arquivo .env (Esperando GENAI_KEY_1, GENAI_KEY_2, etc.)")
 
-# 2. Variável de controle (global) para a chave ativa
-API_STATE = {
-    'active_key_index': 0,
-    # Inicializa o cliente usando a primeira chave (índice 0)
-    'client': genai.Client(api_key=GENAI_KEYS[0]) 
-}
+# 2. Pool de chaves: cada chave tem o seu cliente, cooldown após rate limit e taxa de erro;
+#    cada requisição usa a chave mais saudável (sem uma chave "ativa" global).
+pool_chaves = PoolChavesGemini(
+    GENAI_KEYS,
+    criar_cliente_genai,
+    cooldown_cota=float(os.getenv('GENAI_COOLDOWN_COTA', 60)),
+    cooldown_chave_invalida=float(os.getenv('GENAI_COOLDOWN_CHAVE_INVALIDA', 3600)),
+    # Limite de requisições por minuto de cada chave (0 = só o cooldown após o 429)
+    rpm_por_chave=int(os.getenv('GENAI_RPM_POR_CHAVE', 0))
+)
+
+# 3. Controle de admissão do chat: baldes de tokens por conexão e por aluno, e uma
+#    fila justa (rodízio entre alunos) para a cota das chaves. Rejeições viram
+#    um evento 'erro' com retry_after.
+limite_conexao = LimitadorTaxa(
+    capacidade=int(os.getenv('CHAT_RAJADA_CONEXAO', 5)),
+    taxa_por_segundo=float(os.getenv('CHAT_MENSAGENS_MINUTO_CONEXAO', 10)) / 60
+)
+limite_aluno = LimitadorTaxa(
+    capacidade=int(os.getenv('CHAT_RAJADA_ALUNO', 8)),
+    taxa_por_segundo=float(os.getenv('CHAT_MENSAGENS_MINUTO_ALUNO', 15)) / 60
+)
+fila_chaves = FilaJusta(pool_chaves, max_espera=float(os.getenv('GENAI_MAX_ESPERA_COTA', 10)))
+
+# 4. Executor das chamadas ao Gemini: limita concorrência, fila e tempo por chamada,
+#    para que respostas lentas não travem o servidor para todos os alunos.
+executor_ia = ExecutorIA(
+    concorrencia=int(os.getenv('GENAI_CONCORRENCIA', 8)),
+    max_fila=int(os.getenv('GENAI_MAX_FILA', 32)),
+    timeout=float(os.getenv('GENAI_TIMEOUT', 30)),
+    usar_tpool=os.getenv('GENAI_USAR_TPOOL') == '1'
+)
 # -------------------------------------------------------------------
 
-def switch_to_next_api_key():
+def _garantir_chave_saudavel(sessao, tentadas):
     """
-    Alterna para a próxima chave de API disponível.
-    Retorna True se conseguir mudar, False se todas falharam.
+    Antes de cada envio: se a chave da sessão entrou em cooldown (por erro desta
+    ou de outra requisição), migra a conversa para a chave mais saudável.
     """
-    global API_STATE, GENAI_KEYS
-    
-    current_index = API_STATE['active_key_index']
-    next_index = (current_index + 1) % len(GENAI_KEYS) # Rota para o próximo índice
-
-    if next_index == current_index:
-        # Significa que só há 1 chave, ou que o loop deu uma volta completa.
-        app.logger.error("ERRO GRAVE: A única chave API falhou ou todas as chaves falharam.")
-        return False
-        
-    try:
-        new_key = GENAI_KEYS[next_index]
-        API_STATE['client'] = genai.Client(api_key=new_key)
-        API_STATE['active_key_index'] = next_index
-        app.logger.warning(f"Chave API esgotada/falhou. Mudando para a chave no índice {next_index}.")
-        return True
-    except Exception as e:
-        app.logger.error(f"Falha ao inicializar o cliente com a chave no índice {next_index}: {e}")
+    if sessao.estado_chave.disponivel() and sessao.estado_chave.indice not in tentadas:
+        return
+    novo_estado = pool_chaves.escolher(excluir=tentadas)
+    if novo_estado is None:
+        raise RuntimeError("Todas as chaves da API falharam ou foram esgotadas.")
+    app.logger.warning(f"Migrando chat da chave {sessao.estado_chave.indice} para a chave {novo_estado.indice} (histórico preservado).")
+    METRICA_GEMINI_MIGRACOES.inc()
+    sessao.migrar_para(novo_estado)
+
+def _tratar_erro_chave(sessao, erro, tentadas):
+    """Registra o erro na chave da sessão; retorna True se vale tentar outra chave."""
+    tipo = classificar_erro_chave(erro)
+    pool_chaves.reportar_erro(sessao.estado_chave, tipo or ERRO_OUTRO)
+    if tipo is None:
         return False
+    app.logger.warning(f"Erro da API na chave {sessao.estado_chave.indice} ({tipo}): {erro}")
+    tentadas.add(sessao.estado_chave.indice)
+    return True
 
-def send_message_with_rotation(chat_session, mensagem_usuario):
+def _medir_chamada_gemini(estado, modo, inicio, resultado):
+    METRICA_GEMINI_DURACAO.observar(time.perf_counter() - inicio, chave=estado.indice, modo=modo, resultado=resultado)
+
+def send_message_with_rotation(sessao, mensagem_usuario):
     """
-    Envia a mensagem e tenta rotacionar a chave em caso de erro da API.
+    Envia a mensagem pela chave mais saudável; em erro de cota/chave inválida,
+    migra a conversa (com histórico) para outra chave e tenta de novo.
     Retorna a resposta do Gemini ou levanta uma exceção final.
     """
-    global API_STATE
-    
-    # Tentativa 1
+    tentadas = set()
+    while True:
+        _garantir_chave_saudavel(sessao, tentadas)
+        estado = sessao.estado_chave
+        pool_chaves.iniciar_uso(estado)
+        inicio = time.perf_counter()
+        try:
+            resposta = sessao.chat.send_message(mensagem_usuario)
+        except Exception as e:
+            _medir_chamada_gemini(estado, 'unica', inicio, 'erro')
+            if not _tratar_erro_chave(sessao, e, tentadas):
+                raise
+            continue
+        _medir_chamada_gemini(estado, 'unica', inicio, 'ok')
+        pool_chaves.reportar_sucesso(estado)
+        return resposta
+
+def stream_message_with_rotation(sessao, mensagem_usuario):
+    """
+    Versão em streaming de send_message_with_rotation: gera os trechos da resposta.
+    A troca de chave só acontece se o erro vier antes do primeiro trecho.
+    """
+    tentadas = set()
+    while True:
+        _garantir_chave_saudavel(sessao, tentadas)
+        estado = sessao.estado_chave
+        pool_chaves.iniciar_uso(estado)
+        inicio = time.perf_counter()
+        try:
+            stream = iter(sessao.chat.send_message_stream(mensagem_usuario))
+            primeiro_trecho = next(stream, None)
+        except Exception as e:
+            _medir_chamada_gemini(estado, 'stream', inicio, 'erro')
+            if not _tratar_erro_chave(sessao, e, tentadas):
+                raise
+            continue
+        break
+
+    concluido = False
     try:
-        return chat_session.send_message(mensagem_usuario)
-    except (genai.errors.ResourceExhausted, genai.errors.PermissionDenied) as e:
-        # ResourceExhausted: Limite atingido (rate limit)
-        # PermissionDenied: Chave inválida ou expirada
-        app.logger.warning(f"Erro da API (chave): {type(e).__name__}. Tentando rotacionar a chave...")
-        
-        # 1. Tentar rotacionar a chave
-        if switch_to_next_api_key():
-            # 2. Recriar a sessão de chat (pois a antiga está ligada ao cliente velho)
-            # Nota: Isso recria o histórico, então o contexto anterior será perdido!
-            # Para manter o histórico, você precisaria reconstruir a conversa manualmente.
-            # Por simplicidade e em caso de falha de chave, vamos começar do zero.
-            curso_acesso = chat_session.config.system_instruction.split("curso de ")[-1].strip().split()[0]
-            
-            # Recria o chat usando o NOVO cliente da API_STATE
-            new_chat_session = API_STATE['client'].chats.create(
-                model="gemini-2.5-flash",
-                config=types.GenerateContentConfig(
-                    system_instruction=get_curso_system_instruction(curso_acesso)
-                )
-            )
-            
-            # 3. Tentar enviar a mensagem novamente com a nova sessão
-            return new_chat_session.send_message(mensagem_usuario)
+        if primeiro_trecho is not None:
+            yield primeiro_trecho
+        yield from stream
+        concluido = True
+    finally:
+        _medir_chamada_gemini(estado, 'stream', inicio, 'ok' if concluido else 'erro')
+        if concluido:
+            pool_chaves.reportar_sucesso(estado)
         else:
-            # Não conseguiu mudar de chave
-            raise RuntimeError("Todas as chaves da API falharam ou foram esgotadas.") from e
-    
-    # Outros erros (conexão, etc.) são levantados
-    except Exception as e:
-        raise
+            pool_chaves.reportar_erro(estado, ERRO_OUTRO)
+
 # *******************************************************************
 # LÓGICA DO CHATBOT (NOVO CONTEXTO: Professor do Curso)
 # *******************************************************************
-active_chats = {} # Armazena as sessões de chat contínuo por session_id
+MODELO_CHAT = "gemini-2.5-flash"
+
+# Instruções do sistema compiladas uma vez por curso (e por módulo, com CHAT_RESUMO_MODULO=1).
+# Com GENAI_CACHE_CONTEXTO=1 a instrução vai para o cache de contexto do Gemini quando
+# passa do mínimo de tokens dele; senão segue inline, como antes. Com as instruções atuais
+# (~200 tokens, ~600 com o resumo do módulo, abaixo do mínimo de 1024) o cache nunca é
+# usado, por isso vem desligado: ligue se a instrução crescer além do mínimo.
+CHAT_RESUMO_MODULO = os.getenv('CHAT_RESUMO_MODULO', '0') == '1'
+catalogo_instrucoes = CatalogoInstrucoes(
+    MODELO_CHAT,
+    usar_cache_provedor=os.getenv('GENAI_CACHE_CONTEXTO', '0') == '1',
+    ttl_cache_segundos=int(os.getenv('GENAI_CACHE_TTL', 7200)),
+    # Um chat inativo sai da memória depois de CHAT_TTL_SEGUNDOS: o cache precisa durar mais que isso
+    margem_renovacao=int(os.getenv('CHAT_TTL_SEGUNDOS', 1800)),
+    minimo_tokens_cache=int(os.getenv('GENAI_CACHE_MIN_TOKENS', 1024)),
+)
+
+def resumo_modulo_atual(curso_acesso):
+    """Resumo do primeiro módulo não concluído do nível atual do aluno, ou None."""
+    if not has_request_context() or 'aluno_id' not in session or not session.get('nivel_curso'):
+        return None
+    nivel = session['nivel_curso']
+    try:
+        snapshot = servico_progresso.obter(session['aluno_id'])
+        for modulo in estrutura_curso.modulos_do_nivel(curso_acesso, nivel):
+            if not snapshot.concluido(modulo['modulo_id'], nivel):
+                conteudo = catalogo_conteudo.obter_modulo(curso_acesso, nivel, modulo['ordem'])
+                return resumir_modulo(conteudo) if conteudo else None
+    except Exception as e:
+        # O resumo é opcional: sem ele o chat usa só a instrução do curso
+        app.logger.warning(f"Resumo do módulo atual indisponível: {e}")
+    return None
+
+def criar_chat_gemini(curso_acesso, historico=None):
+    """Cria uma sessão de chat na chave mais saudável, reenviando o histórico compacto se houver."""
+    estado_chave = pool_chaves.escolher()
+    if estado_chave is None:
+        raise RuntimeError("Todas as chaves da API falharam ou foram esgotadas.")
+    conteudo_historico = [
+        types.Content(role=papel, parts=[types.Part(text=texto)])
+        for papel, texto in (historico or [])
+    ]
+    resumo_modulo = resumo_modulo_atual(curso_acesso) if CHAT_RESUMO_MODULO else None
+
+    def config_para_chave(estado):
+        return catalogo_instrucoes.config_para(curso_acesso, estado, resumo_modulo)
+
+    return SessaoChat(
+        curso_acesso,
+        MODELO_CHAT,
+        config_para_chave(estado_chave),
+        estado_chave,
+        historico=conteudo_historico or None,
+        config_para_chave=config_para_chave
+    )
+
+# Sessões de chat contínuo por session_id + curso: LRU/TTL em memória com limite de
+# memória; o histórico fica em SQLite para reconstruir chats despejados ou de outro processo.
+# Com vários workers (CHAT_COMPARTILHADO=1, padrão quando há fila de mensagens) a versão
+# do histórico é conferida a cada mensagem, então não é preciso rotear o chat sempre
+# para o mesmo processo.
+active_chats = ArmazenamentoChats(
+    criar_chat_gemini,
+    HistoricoChatsSQLite(caminho_padrao_historico(BASE_DIR),
+                         max_mensagens=int(os.getenv('CHAT_MAX_MENSAGENS', 40)),
+                         # sqlite3 bloqueia (até o timeout, se outro worker estiver gravando): fora do hub
+                         usar_tpool=True),
+    max_chats=int(os.getenv('CHAT_MAX_SESSOES', 500)),
+    ttl_segundos=int(os.getenv('CHAT_TTL_SEGUNDOS', 1800)),
+    max_bytes=int(os.getenv('CHAT_MAX_MB', 32)) * 1024 * 1024,
+    compartilhado=os.getenv('CHAT_COMPARTILHADO', '1' if SOCKETIO_MESSAGE_QUEUE else '0') == '1'
+)
+
+# Respostas em streaming (eventos 'nova_mensagem_parcial' + 'nova_mensagem_concluida').
+# CHAT_STREAMING=0 volta ao envio da resposta completa em um único 'nova_mensagem'.
+CHAT_STREAMING = os.getenv('CHAT_STREAMING', '1') == '1'
+
+# Cache de respostas frequentes por curso/nível (FAQ_CACHE=0 desativa)
+FAQ_CACHE_ATIVO = os.getenv('FAQ_CACHE', '1') == '1'
+cache_faq = CacheRespostas(
+    max_entradas=int(os.getenv('FAQ_CACHE_MAX', 2000)),
+    ttl_segundos=int(os.getenv('FAQ_CACHE_TTL', 6 * 3600)),
+    # Só a pergunta normalizada igual é respondida; FAQ_SIMILARIDADE (ex.: 0.6) tolera erro de digitação
+    limiar_similaridade=float(os.getenv('FAQ_SIMILARIDADE')) if os.getenv('FAQ_SIMILARIDADE') else None
+)
+
+# Primeiras perguntas iguais e simultâneas (ex.: a turma inteira perguntando sobre
+# o mesmo módulo) viram uma única chamada ao Gemini (CHAT_VOO_UNICO=0 desativa)
+VOO_UNICO_ATIVO = os.getenv('CHAT_VOO_UNICO', '1') == '1'
+voo_unico = VooUnico(timeout_espera=executor_ia.timeout + 5)
+
+def chave_pergunta_compartilhada(curso_acesso, mensagem):
+    """Chave (curso, pergunta normalizada) do agrupamento; None para perguntas curtas demais."""
+    # A mesma normalização do cache de FAQ: só saudações saem, a ordem e as palavras funcionais ficam
+    tokens = normalizar_pergunta(mensagem)
+    if len(tokens) < MINIMO_TOKENS:
+        return None
+    return (curso_acesso, ' '.join(tokens))
+
+# Latências do chat observadas no servidor (em segundos)
+LATENCIAS_CHAT = {
+    'primeiro_trecho': JanelaLatencias(),
+    'total': JanelaLatencias()
+}
 
 def limpar_nome_nivel(nivel):
     # Converte para minúsculas
@@ -156,54 +444,105 @@ def limpar_nome_nivel(nivel):
     
     return limpo
 
-def get_curso_system_instruction(curso_acesso):
-    """Gera as instruções do sistema baseadas no curso atual do aluno."""
-    return f"""
-Você é o Professor Dinossauro, um assistente virtual inteligente, amigável e focado.
-Seu papel é atuar como um professor particular, oferecendo informações, dicas e tirando dúvidas **APENAS** sobre o conteúdo do curso de {curso_acesso} que o aluno está estudando.
-
-Seja breve, direto e sucinto. Evite respostas longas. Use um tom encorajador e educativo.
-Se a pergunta for irrelevante ou fora do escopo do curso de {curso_acesso}, responda educadamente que você é especialista apenas neste curso.
-
-Regras importantes:
-Não incentive nem normalize conteúdos impróprios, ilegais ou perigosos.
-Não forneça diagnósticos médicos, conselhos legais ou instruções perigosas. Sempre recomende profissionais.
-Ignore provocações.
-
-Exemplos de tom:
-“Opa! Vou te ajudar rapidinho com isso do {curso_acesso}.”
-“Boa pergunta! No módulo X, você viu que...”
-"""
+def chave_chat(curso_acesso):
+    """Chave da sessão de chat do usuário atual (muda se o aluno mudar de curso)."""
+    if 'session_id' not in session:
+        session['session_id'] = str(uuid4())
+    return f"{session['session_id']}_{curso_acesso}"
 
 def get_user_chat(curso_acesso):
     """Obtém ou cria uma sessão de chat Gemini para o usuário atual, baseada no curso."""
-    # Como você quer o contexto do curso, a instrução de sistema deve ser específica.
-    # Usaremos o curso_acesso da sessão para gerar a instrução.
-    
-    if 'session_id' not in session:
-        session['session_id'] = str(uuid4())
-    
-    session_id = session['session_id']
-    
     # 1. Gera uma chave única que inclui o curso, para garantir que o chat mude se o aluno mudar de curso
-    chat_key = f"{session_id}_{curso_acesso}"
+    chat_key = chave_chat(curso_acesso)
     
-    if chat_key not in active_chats:
-        app.logger.info(f"Criando novo chat Gemini para chave: {chat_key}")
+    try:
+        # 2. Reaproveita a sessão em memória ou reconstrói a partir do histórico persistido
+        return active_chats.obter(chat_key, curso_acesso)
+    except Exception as e:
+        app.logger.error(f"Erro ao criar chat Gemini para {chat_key}: {e}", exc_info=True)
+        raise
+
+def manutencao_chats(intervalo_segundos=60, retencao_historico_dias=7):
+    """Tarefa de fundo: tira da memória chats expirados e expurga histórico antigo."""
+    while True:
+        socketio.sleep(intervalo_segundos)
         try:
-            instrucoes_curso = get_curso_system_instruction(curso_acesso)
-            
-            # ATENÇÃO: Usa o cliente ATIVO em API_STATE
-            chat_session = API_STATE['client'].chats.create(
-                model="gemini-2.5-flash",
-                config=types.GenerateContentConfig(system_instruction=instrucoes_curso)
-            )
-            active_chats[chat_key] = chat_session
+            active_chats.expirar()
+            active_chats.expurgar_historico(retencao_historico_dias * 86400)
         except Exception as e:
-            app.logger.error(f"Erro ao criar chat Gemini para {chat_key}: {e}", exc_info=True)
+            app.logger.error(f"Erro na manutenção dos chats: {e}", exc_info=True)
+
+def admitir_mensagem(aluno_id):
+    """Consome um token da conexão e um do aluno; levanta ErroLimiteTaxa se algum estiver vazio."""
+    espera = limite_conexao.tentar(request.sid)
+    if espera:
+        raise ErroLimiteTaxa("Você está mandando mensagens rápido demais.", espera)
+    if aluno_id is not None:
+        espera = limite_aluno.tentar(aluno_id)
+        if espera:
+            limite_conexao.devolver(request.sid)
+            raise ErroLimiteTaxa("Você está mandando mensagens rápido demais.", espera)
+
+def reservar_cota_chave(user_chat, cliente_fila):
+    """Espera a vez do aluno na cota das chaves; se a chave liberada for outra, o chat migra para ela."""
+    estado = fila_chaves.aguardar(cliente_fila, preferida=user_chat.estado_chave)
+    if estado is not user_chat.estado_chave:
+        user_chat.migrar_para(estado)
+
+def gerar_resposta(user_chat, mensagem_usuario, cliente_fila, streaming):
+    """Chama o Gemini pelo chat da sessão, envia a resposta ao cliente e retorna o texto."""
+    # Uma reserva de cota por mensagem: vale também para a resposta única depois de uma falha no streaming
+    reservar_cota_chave(user_chat, cliente_fila)
+
+    # 1. Modo streaming: envia os trechos conforme chegam
+    resposta_texto = None
+    if streaming:
+        resposta_texto = responder_em_streaming(user_chat, mensagem_usuario)
+
+    if resposta_texto is None:
+        # 2. Modo resposta única: chama a função de envio com rotação (pelo executor limitado)
+        inicio = time.monotonic()
+        resposta_gemini = executor_ia.executar(send_message_with_rotation, user_chat, mensagem_usuario)
+        LATENCIAS_CHAT['total'].registrar(time.monotonic() - inicio)
+        
+        # 3. Extrai o texto da resposta
+        resposta_texto = resposta_gemini.text
+        
+        # ... (Emite a resposta) ...
+        emit('nova_mensagem', {"remetente": "bot", "texto": resposta_texto})
+    return resposta_texto
+
+def responder_em_streaming(user_chat, mensagem_usuario):
+    """
+    Envia a resposta do Gemini ao cliente em trechos e retorna o texto completo.
+    Retorna None se a geração falhar antes do primeiro trecho (o chamador
+    cai para o modo de resposta única); erros depois disso são levantados.
+    """
+    inicio = time.monotonic()
+    partes = []
+    try:
+        with executor_ia.reservar():
+            trechos = executor_ia.iterar(stream_message_with_rotation(user_chat, mensagem_usuario))
+            for trecho in trechos:
+                texto = trecho.text
+                if not texto:
+                    continue
+                if not partes:
+                    LATENCIAS_CHAT['primeiro_trecho'].registrar(time.monotonic() - inicio)
+                partes.append(texto)
+                emit('nova_mensagem_parcial', {"remetente": "bot", "texto": texto})
+    except (ErroSobrecarga, ErroTempoEsgotado):
+        raise
+    except Exception as e:
+        if partes:
             raise
-            
-    return active_chats[chat_key]
+        app.logger.warning(f"Streaming indisponível ({type(e).__name__}: {e}); usando resposta única.")
+        return None
+
+    LATENCIAS_CHAT['total'].registrar(time.monotonic() - inicio)
+    resposta_texto = "".join(partes)
+    emit('nova_mensagem_concluida', {"remetente": "bot", "texto": resposta_texto})
+    return resposta_texto
 
 @socketio.on('connect')
 def handle_connect():
@@ -215,6 +554,7 @@ def handle_connect():
         emit('status_conexao', {'data': 'Conectado. Olá! Como posso ajudar com o curso?', 'session_id': user_session_id})
 
 @socketio.on('enviar_mensagem')
+@medir_evento('enviar_mensagem')
 def handle_enviar_mensagem(data):
     """Manipulador para o evento 'enviar_mensagem' emitido pelo cliente."""
     with current_app.app_context():
@@ -227,21 +567,64 @@ def handle_enviar_mensagem(data):
                 emit('erro', {"erro": "Mensagem ou contexto do curso ausente."})
                 return
 
+            # Limite de mensagens por conexão e por aluno (vale também para respostas do cache)
+            aluno_id = session.get('aluno_id')
+            admitir_mensagem(aluno_id)
+
+            chat_key = chave_chat(curso_acesso)
+            nivel_curso = session.get('nivel_curso')
+
             user_chat = get_user_chat(curso_acesso)
 
             if user_chat is None:
                 emit('erro', {"erro": "Sessão de chat não pôde ser estabelecida."})
                 return
+
+            # 0. Primeira pergunta da conversa já respondida para este curso/nível: responde do cache.
+            # No meio da conversa a resposta depende do contexto e não vai para o cache.
+            primeira_pergunta = user_chat.sem_historico()
+            usar_faq = FAQ_CACHE_ATIVO and primeira_pergunta
+            if usar_faq:
+                resposta_cache = cache_faq.obter(curso_acesso, nivel_curso, mensagem_usuario)
+                if resposta_cache is not None:
+                    emit('nova_mensagem', {"remetente": "bot", "texto": resposta_cache})
+                    # O chat da sessão precisa conhecer a troca para as próximas perguntas
+                    user_chat.acrescentar_troca(mensagem_usuario, resposta_cache)
+                    active_chats.registrar_troca(chat_key, mensagem_usuario, resposta_cache)
+                    return
                 
-            # 1. NOVO PASSO: Chama a função de envio com rotação
-            resposta_gemini = send_message_with_rotation(user_chat, mensagem_usuario)
-            
-            # 2. Extrai o texto da resposta
-            resposta_texto = resposta_gemini.text
-            
-            # ... (Emite a resposta) ...
-            emit('nova_mensagem', {"remetente": "bot", "texto": resposta_texto})
+            cliente_fila = aluno_id if aluno_id is not None else request.sid
+            streaming = CHAT_STREAMING and data.get('streaming', True)
+            chave_voo = None
+            if VOO_UNICO_ATIVO and primeira_pergunta:
+                chave_voo = chave_pergunta_compartilhada(curso_acesso, mensagem_usuario)
+
+            if chave_voo is None:
+                resposta_texto = gerar_resposta(user_chat, mensagem_usuario, cliente_fila, streaming)
+            else:
+                # Primeira pergunta da conversa: quem chega com a mesma pergunta enquanto
+                # outra sessão já está perguntando espera e recebe a mesma resposta
+                resposta_texto, compartilhada = voo_unico.executar(
+                    chave_voo, lambda: gerar_resposta(user_chat, mensagem_usuario, cliente_fila, streaming))
+                if compartilhada:
+                    emit('nova_mensagem', {"remetente": "bot", "texto": resposta_texto})
+                    # As próximas perguntas seguem no chat da sessão, que precisa conhecer esta troca
+                    user_chat.acrescentar_troca(mensagem_usuario, resposta_texto)
+
+            # 4. Persiste a troca para reconstruir o chat se ele sair da memória
+            active_chats.registrar_troca(chat_key, mensagem_usuario, resposta_texto)
+            if usar_faq:
+                cache_faq.guardar(curso_acesso, nivel_curso, mensagem_usuario, resposta_texto)
             
+        except ErroLimiteTaxa as e:
+            retry_after = max(1, math.ceil(e.retry_after))
+            emit('erro', {"erro": f"{e} Tente novamente em {retry_after}s.", "retry_after": retry_after})
+        except ErroSobrecarga:
+            app.logger.warning("Fila do Gemini cheia; mensagem descartada.")
+            emit('erro', {"erro": "O Professor Dinossauro está atendendo muitos alunos agora. Tente novamente em instantes."})
+        except (ErroTempoEsgotado, ErroEsperaVooUnico):
+            app.logger.warning("Tempo esgotado na chamada ao Gemini.")
+            emit('erro', {"erro": "O Professor Dinossauro demorou demais para responder. Tente novamente."})
         except Exception as e:
             app.logger.error(f"Erro ao processar 'enviar_mensagem': {e}", exc_info=True)
             # Mensagem de erro mais amigável para o usuário:
@@ -259,43 +642,125 @@ def handle_disconnect():
 # FUNÇÕES E ROTAS EXISTENTES DO SEU APP.PY (NÃO ALTERADAS)
 # *******************************************************************
 
+# Catálogo de conteúdo: os JSONs são lidos uma vez e ficam indexados em memória.
+# Se existir o pacote gerado por compilar_conteudo.py (já validado), ele é usado no lugar dos JSONs.
+catalogo_conteudo = CatalogoConteudo(os.path.join(BASE_DIR, '..', 'static', 'json_content'),
+                                     caminho_pacote=caminho_padrao_pacote(BASE_DIR))
+catalogo_conteudo.carregar()
+
+def _versao_template(nome):
+    try:
+        return os.stat(os.path.join(app.root_path, app.template_folder, nome)).st_mtime_ns
+    except OSError:
+        return 0
+
+# Entra no ETag das páginas de módulo: um deploy com template novo invalida o cache do navegador
+VERSAO_TEMPLATE_MODULO = _versao_template('modulo_page.html')
+
+def etag_modulo(curso, nivel, ordem, versao_conteudo):
+    """ETag da página do módulo: muda só quando o conteúdo (JSON) ou o template mudam."""
+    base = f"{curso}|{nivel}|{ordem}|{versao_conteudo}|{VERSAO_TEMPLATE_MODULO}"
+    return hashlib.sha1(base.encode('utf-8')).hexdigest()
+
 def carregar_conteudo_json(curso, ordem, nivel):
     """
-    Carrega o conteúdo do módulo a partir de um arquivo JSON, incluindo o nível.
-    Caminho assumido: ../static/json_content/{curso}/{nivel}/modulo_{ordem}.json
+    Retorna o conteúdo do módulo a partir do catálogo em memória.
+    Arquivo de origem: ../static/json_content/{curso}/{nivel}/modulo_{ordem}.json
+    (o arquivo só é relido se tiver sido modificado desde a última leitura),
+    ou o pacote compilado (conteudo.pack), se existir.
     """
-    try:
-        # Pega o diretório base do projeto (onde app.py está)
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        curso_limpo = curso.lower().replace('ê', 'e').replace('ã', 'a')
-        nivel_limpo = nivel.lower().replace('á', 'a').replace('é', 'e')
-        
-        # Constrói o caminho completo do arquivo
-        caminho_arquivo = os.path.join(base_dir, 
-                                       '..', 
-                                       'static', 
-                                       'json_content', 
-                                       curso_limpo,
-                                       nivel_limpo,
-                                       f'modulo_{ordem}.json')
-        
-        # DEBUG (é bom manter isso por enquanto):
-        print(f"\n[DEBUG JSON] Tentando abrir: {caminho_arquivo}\n")
-            
-        with open(caminho_arquivo, 'r', encoding='utf-8') as f:
-            conteudo = json.load(f)
-            return conteudo
-            
-    except FileNotFoundError:
-        print(f"[ERRO JSON] Arquivo não encontrado no caminho: {caminho_arquivo}")
-        return None
-    except json.JSONDecodeError:
-        print(f"[ERRO JSON] JSON mal formatado em: {caminho_arquivo}")
-        return None
+    conteudo = catalogo_conteudo.obter_modulo(curso, nivel, ordem)
+    if conteudo is None:
+        app.logger.error(f"Conteúdo não encontrado: curso={curso}, nivel={nivel}, ordem={ordem}")
+    return conteudo
+
+def _carregar_modulos_do_banco():
+    return banco.consultar_todos(SQL_MODULOS)
+
+# Estrutura da tabela `modulo` em memória (anterior/próximo/primeiro/último do nível)
+estrutura_curso = EstruturaCurso(_carregar_modulos_do_banco)
+
+def _gravar_lote_progresso(resultados, desbloqueios, niveis):
+    """Grava um lote do GravadorProgresso em uma única transação (fora de requisição)."""
+    with app.app_context():
+        if desbloqueios:
+            banco.executar_varios(SQL_DESBLOQUEIO, desbloqueios)
+        if resultados:
+            banco.executar_varios(SQL_RESULTADO, resultados)
+        if niveis:
+            banco.executar_varios(SQL_NIVEL_ALUNO, niveis)
+        banco.commit()
+
+# PROGRESSO_WRITE_BEHIND=1: enviar_atividade só registra o resultado em um diário
+# em disco e responde; os upserts são feitos em lote por uma tarefa de fundo
+gravador_progresso = None
+if os.getenv('PROGRESSO_WRITE_BEHIND', '0') == '1':
+    gravador_progresso = GravadorProgresso(
+        _gravar_lote_progresso,
+        os.getenv('PROGRESSO_DIARIO', os.path.join(BASE_DIR, 'progresso_diario.jsonl')),
+        max_lote=int(os.getenv('PROGRESSO_LOTE_MAX', 200)),
+        intervalo_segundos=float(os.getenv('PROGRESSO_LOTE_INTERVALO', 1.0)),
+        # fsync do diário no pool de threads nativas: não trava o hub do eventlet
+        fsync_tpool=True,
+    )
+
+def _carregar_progresso_do_banco(aluno_id):
+    linhas = banco.consultar_todos(SQL_PROGRESSO_ALUNO, [aluno_id])
+    if gravador_progresso is not None:
+        # Resultados enviados e ainda não gravados no banco continuam visíveis
+        linhas = gravador_progresso.sobrepor(aluno_id, linhas)
+    return linhas
+
+# Progresso de cada aluno (desempenho_modulo) em cache, lido em uma única consulta
+servico_progresso = ServicoProgresso(_carregar_progresso_do_banco)
+
+def _carregar_perfil_do_banco(aluno_id):
+    perfil = banco.consultar_um(SQL_PERFIL_ALUNO, [aluno_id])
+    if perfil and gravador_progresso is not None:
+        perfil['nivel_curso'] = gravador_progresso.nivel_pendente(aluno_id) or perfil['nivel_curso']
+    return perfil
+
+# Dados do aluno (nome, email, curso, nível) em cache: preenchido no login
+cache_perfis = CachePerfis(_carregar_perfil_do_banco,
+                           max_alunos=int(os.getenv('PERFIS_CACHE_MAX', 10000)),
+                           ttl_segundos=int(os.getenv('PERFIS_CACHE_TTL', 1800)))
+
+# Analíticos da turma por módulo (faixas de nota, aprovação, erros por questão e
+# ranking), atualizados a cada correção e reconstruídos do banco na inicialização
+# e a cada ANALITICOS_RECONSTRUIR_S: com vários workers, cada um só vê as próprias
+# correções até a reconstrução seguinte (0 desativa a reconstrução periódica).
+# Os erros por questão não estão no banco: ficam salvos em ANALITICOS_ARQUIVO
+ANALITICOS_ARQUIVO = os.getenv('ANALITICOS_ARQUIVO', os.path.join(BASE_DIR, 'analiticos_questoes.json'))
+ANALITICOS_RECONSTRUIR_S = int(os.getenv('ANALITICOS_RECONSTRUIR_S', 60))
+analiticos_turma = AnaliticosTurma(tamanho_ranking=int(os.getenv('ANALITICOS_RANKING', 10)))
+analiticos_turma.carregar_arquivo(ANALITICOS_ARQUIVO)
+
+def reconstruir_analiticos():
+    """Refaz notas e ranking dos analíticos a partir do banco, depois de gravar o write-behind pendente."""
+    if gravador_progresso is not None:
+        # As notas que ainda estão só no diário precisam estar no banco antes da leitura
+        gravador_progresso.descarregar()
+    with app.app_context():
+        analiticos_turma.reconstruir(banco.consultar_todos(SQL_HISTORICO_NOTAS))
+
+def manter_analiticos(intervalo_segundos=60, intervalo_reconstrucao=60):
+    """Tarefa de fundo: grava os erros por questão em disco e reconstrói as notas do banco."""
+    ultima_reconstrucao = time.monotonic()
+    while True:
+        socketio.sleep(intervalo_segundos)
+        try:
+            analiticos_turma.salvar(ANALITICOS_ARQUIVO)
+        except Exception as e:
+            app.logger.error(f"Erro ao salvar os analíticos: {e}", exc_info=True)
+        if intervalo_reconstrucao and time.monotonic() - ultima_reconstrucao >= intervalo_reconstrucao:
+            ultima_reconstrucao = time.monotonic()
+            try:
+                reconstruir_analiticos()
+            except Exception as e:
+                app.logger.error(f"Erro ao reconstruir os analíticos: {e}", exc_info=True)
 
 def login_required(f):
     """Verifica se o aluno está logado na sessão."""
-    from functools import wraps
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if 'loggedin' not in session:
@@ -316,20 +781,26 @@ def login():
         email = request.form['email']
         senha = request.form['senha']
         
-        cur = mysql.connection.cursor()
-        cur.execute("SELECT aluno_id, nome, senha_hash, curso_acesso, nivel_curso FROM aluno WHERE email = %s", [email])
-        aluno = cur.fetchone()
-        cur.close()
+        # Consulta única pelo índice UNIQUE de email: autenticação e dados do perfil juntos
+        aluno = banco.consultar_um(SQL_LOGIN_ALUNO, [email])
 
         if aluno:
-            senha_hash_input = hashlib.sha256(senha.encode()).hexdigest()
+            verificacao = servico_senhas.verificar(senha, aluno['senha_hash'])
             
-            if senha_hash_input == aluno['senha_hash']:
+            if verificacao.valida:
+                if verificacao.precisa_atualizar:
+                    # Hash legado (SHA-256) ou scrypt com parâmetros antigos: regrava no formato atual
+                    banco.executar(SQL_SENHA_ALUNO, [servico_senhas.gerar(senha), aluno['aluno_id']])
+                    banco.commit()
                 session['loggedin'] = True
                 session['aluno_id'] = aluno['aluno_id']
                 session['nome'] = aluno['nome']
                 session['curso_acesso'] = aluno['curso_acesso']
                 session['nivel_curso'] = aluno['nivel_curso']
+                if gravador_progresso is not None:
+                    # Subida de nível enviada e ainda não gravada no banco
+                    session['nivel_curso'] = gravador_progresso.nivel_pendente(aluno['aluno_id']) or aluno['nivel_curso']
+                cache_perfis.guardar(dict(aluno, nivel_curso=session['nivel_curso']))
                 
                 flash('Login realizado com sucesso!', 'success')
                 return redirect(url_for('curso_home'))
@@ -351,21 +822,17 @@ def cadastro():
         senha = request.form['senha']
         curso_acesso = request.form['curso_acesso']
 
-        cur = mysql.connection.cursor()
-        cur.execute("SELECT * FROM aluno WHERE email = %s", [email])
-        if cur.fetchone():
-            cur.close()
+        if banco.consultar_um(SQL_EMAIL_CADASTRADO, [email]):
             return render_template('cadastro.html', erro='Este email já está cadastrado.')
 
-        senha_hash = hashlib.sha256(senha.encode()).hexdigest()
+        senha_hash = servico_senhas.gerar(senha)
 
-        cur.execute("""
+        banco.executar("""
             INSERT INTO aluno (nome, email, senha_hash, curso_acesso, nivel_curso) 
             VALUES (%s, %s, %s, %s, %s)
         """, (nome, email, senha_hash, 'Inglês', 'Básico'))
         
-        mysql.connection.commit()
-        cur.close()
+        banco.commit()
         
         return redirect(url_for('login'))
 
@@ -383,38 +850,13 @@ def curso_home():
     curso_acesso = session['curso_acesso']
     nivel_atual = session.get('nivel_curso')
     
-    cur = mysql.connection.cursor()
-    
-    cur.execute("SELECT modulo_id, nome, ordem FROM modulo WHERE curso_acesso = %s AND nivel = %s ORDER BY ordem ASC", 
-                [curso_acesso, nivel_atual])
-    modulos = cur.fetchall()
-    
-    cur.execute("SELECT modulo_id, status_modulo, nota_final FROM desempenho_modulo WHERE aluno_id = %s", [aluno_id])
-    desempenho = cur.fetchall()
-    
-    cur.close()
-
-    desempenho_map = {item['modulo_id']: item for item in desempenho}
-
-    modulos_com_progresso = []
-    modulos_concluidos = 0
-    total_modulos = len(modulos)
+    # Estrutura do nível em memória + snapshot de progresso do aluno (1 consulta no máximo)
+    modulos = estrutura_curso.modulos_do_nivel(curso_acesso, nivel_atual)
+    progresso = servico_progresso.obter(aluno_id)
 
-    for modulo in modulos:
-        modulo_progresso = desempenho_map.get(modulo['modulo_id'], None)
-        
-        status = modulo_progresso['status_modulo'] if modulo_progresso else 'Não Iniciado'
-        
-        if status == 'Concluído':
-            modulos_concluidos += 1
-        
-        modulos_com_progresso.append({
-            'modulo_id': modulo['modulo_id'],
-            'nome': modulo['nome'],
-            'ordem': modulo['ordem'],
-            'status': status,
-            'nota_final': modulo_progresso.get('nota_final') if modulo_progresso else None
-        })
+    modulos_com_progresso = progresso.modulos_com_progresso(modulos)
+    total_modulos = len(modulos_com_progresso)
+    modulos_concluidos = sum(1 for modulo in modulos_com_progresso if modulo['status'] == 'Concluído')
 
     progresso_curso_porcentagem = 0
     if total_modulos > 0:
@@ -434,15 +876,15 @@ def modulo_page(curso, ordem):
     curso_acesso = session['curso_acesso']
     nivel_atual = session.get('nivel_curso')
 
-    print(f"\n[DEBUG 1] ACESSANDO MODULO PAGE: {curso_acesso}, Nivel: {nivel_atual}, Ordem: {ordem}")
+    log_rotas.info("Acesso ao módulo: aluno=%s curso=%s nivel=%s ordem=%s", aluno_id, curso_acesso, nivel_atual, ordem)
     
-    curso_limpo = curso.lower().replace('ê', 'e').replace('ã', 'a')
-    curso_session_limpo = curso_acesso.lower().replace('ê', 'e').replace('ã', 'a')
+    curso_limpo = normalizar_slug(curso)
+    curso_session_limpo = normalizar_slug(curso_acesso)
 
     if curso_limpo != curso_session_limpo:
         return "Acesso negado ao curso.", 403
 
-    cur = mysql.connection.cursor()
+    progresso = servico_progresso.obter(aluno_id)
     
     # -----------------------------------------------------
     # Lógica de Validação de Acesso (Sequencial e Nível)
@@ -451,25 +893,15 @@ def modulo_page(curso, ordem):
     if ordem > 1:
         # Lógica de validação do módulo anterior (Ordem > 1)
         # O código está OK neste bloco
-        modulo_anterior_ordem = ordem - 1
-        
-        cur.execute("SELECT modulo_id FROM modulo WHERE curso_acesso = %s AND nivel = %s AND ordem = %s", 
-                     [curso_acesso, nivel_atual, modulo_anterior_ordem])
-        modulo_anterior = cur.fetchone()
+        modulo_anterior = estrutura_curso.anterior(curso_acesso, nivel_atual, ordem)
         
         if modulo_anterior:
-            cur.execute("SELECT status_modulo FROM desempenho_modulo WHERE aluno_id = %s AND modulo_id = %s AND nivel_modulo = %s", 
-                          [aluno_id, modulo_anterior['modulo_id'], nivel_atual])
-            progresso_anterior = cur.fetchone()
-            
-            if not progresso_anterior or progresso_anterior['status_modulo'] != 'Concluído':
-                print("[DEBUG 2] BLOQUEADO: Módulo anterior não concluído.")
+            if not progresso.concluido(modulo_anterior['modulo_id'], nivel_atual):
+                log_rotas.info("Módulo bloqueado (anterior não concluído): aluno=%s ordem=%s", aluno_id, ordem)
                 flash("Você precisa concluir o módulo anterior para acessar este.", 'warning')
-                cur.close() 
                 return redirect(url_for('curso_home'))
         else:
-            print("[DEBUG 3] ERRO: Módulo anterior não encontrado no banco.")
-            cur.close()
+            log_rotas.warning("Módulo anterior não encontrado no banco: curso=%s nivel=%s ordem=%s", curso_acesso, nivel_atual, ordem)
             return "Módulo anterior não encontrado.", 404
 
     elif ordem == 1 and nivel_atual != 'Básico':
@@ -481,29 +913,21 @@ def modulo_page(curso, ordem):
         
         if nivel_anterior:
             # 2a. Encontrar o último módulo do nível anterior
-            cur.execute("SELECT modulo_id, ordem FROM modulo WHERE curso_acesso = %s AND nivel = %s ORDER BY ordem DESC LIMIT 1", 
-                         [curso_acesso, nivel_anterior])
-            ultimo_modulo_anterior = cur.fetchone()
+            ultimo_modulo_anterior = estrutura_curso.ultimo_do_nivel(curso_acesso, nivel_anterior)
             
             # 🚨 CORREÇÃO PRINCIPAL: Verificação de 'None' deve redirecionar
             if not ultimo_modulo_anterior:
-                 # 🔴 DEBUG 5: Redirecionamento por Último Módulo Anterior não encontrado (Erro de configuração)
-                print("[DEBUG 5] ERRO: Último Módulo do Nível Anterior não encontrado no banco.")
-                cur.close()
+                 # Redirecionamento por Último Módulo Anterior não encontrado (Erro de configuração)
+                log_rotas.warning("Último módulo do nível %s não encontrado no banco: curso=%s", nivel_anterior, curso_acesso)
                 flash("Erro de configuração de nível. Módulo Final não encontrado.", 'danger')
                 return redirect(url_for('curso_home'))
             
             ultimo_modulo_id = ultimo_modulo_anterior['modulo_id']
             
             # 2b. Verificar se o último módulo do nível anterior está Concluído
-            cur.execute("SELECT status_modulo FROM desempenho_modulo WHERE aluno_id = %s AND modulo_id = %s", 
-                         [aluno_id, ultimo_modulo_id])
-            progresso_nivel_anterior = cur.fetchone()
-            
-            if not progresso_nivel_anterior or progresso_nivel_anterior['status_modulo'] != 'Concluído':
-                print(f"[DEBUG 4] BLOQUEADO: Nível {nivel_anterior} não concluído. Módulo ID: {ultimo_modulo_anterior['modulo_id']}")
+            if not progresso.concluido(ultimo_modulo_id):
+                log_rotas.info("Nível bloqueado: aluno=%s nivel %s não concluído (módulo %s)", aluno_id, nivel_anterior, ultimo_modulo_id)
                 flash(f"Você precisa concluir o Nível {nivel_anterior} para iniciar o Nível {nivel_atual}.", 'warning')
-                cur.close()
                 return redirect(url_for('curso_home'))
         # Se 'nivel_anterior' não for encontrado, o código simplesmente continua, o que está correto para evitar falha no Básico.
         
@@ -511,27 +935,34 @@ def modulo_page(curso, ordem):
     # Carregamento de Conteúdo Final (Se todas as validações passarem)
     # -----------------------------------------------------
     
-    # 🟢 DEBUG 6: Chamando a função de carregamento
-    print("[DEBUG 6] INICIANDO CARREGAMENTO DO JSON...")
-    
-    # 🚨 LEMBRETE: Sua função carregar_conteudo_json precisa da correção do acento (nivel.lower().replace('á', 'a'))
+    # Chamando a função de carregamento
     conteudo = carregar_conteudo_json(curso_limpo, ordem, nivel_atual) 
     
     if not conteudo:
-        cur.close()
         return "Conteúdo do módulo não encontrado ou inválido.", 404
 
-    cur.close() 
-
     # -----------------------------------------------------
-    # Renderização
+    # GET condicional: o acesso já foi validado acima, então o navegador pode
+    # reaproveitar a página que já tem se o conteúdo não mudou (304).
     # -----------------------------------------------------
-
-    return render_template('modulo_page.html', 
-                            curso=curso_limpo, 
-                            ordem=ordem, 
-                            nivel=nivel_atual, 
-                            modulo=conteudo)
+    versao_conteudo = catalogo_conteudo.versao(curso_limpo, nivel_atual, ordem)
+    etag = etag_modulo(curso_limpo, nivel_atual, ordem, versao_conteudo)
+    if request.if_none_match.contains(etag):
+        resposta = make_response('', 304)
+    else:
+        # -----------------------------------------------------
+        # Renderização (a lista de questões vem do cache de fragmentos)
+        # -----------------------------------------------------
+        resposta = make_response(render_template('modulo_page.html', 
+                                curso=curso_limpo, 
+                                ordem=ordem, 
+                                nivel=nivel_atual, 
+                                modulo=conteudo,
+                                versao_conteudo=versao_conteudo))
+    resposta.set_etag(etag)
+    # 'private, no-cache': o navegador guarda, mas revalida a cada acesso (a validação de acesso sempre roda)
+    resposta.headers['Cache-Control'] = 'private, no-cache'
+    return resposta
 
 @app.route('/curso/<string:curso>/modulo/<int:ordem>', methods=['POST'])
 @login_required
@@ -545,54 +976,29 @@ def enviar_atividade(curso, ordem):
         flash("Erro: O seu nível de curso não foi encontrado. Por favor, refaça o login.", 'danger')
         return redirect(url_for('login'))
         
-    NOTA_MINIMA_ACERTOS = 7 
-    
-    curso_limpo = curso.lower().replace('ê', 'e').replace('ã', 'a')
+    curso_limpo = normalizar_slug(curso)
     
-    # 🔴 MUDANÇA: Passa o nível para a função JSON
-    conteudo = carregar_conteudo_json(curso_limpo, ordem, nivel_atual) 
-    if not conteudo:
+    # Gabarito já compilado no catálogo (não relê o JSON a cada envio)
+    gabarito = catalogo_conteudo.obter_gabarito(curso_limpo, nivel_atual, ordem)
+    if gabarito is None:
         return "Erro: Conteúdo do módulo indisponível.", 404
 
-    # --- Lógica de Avaliação (Inalterada) ---
-    respostas_corretas = conteudo.get('respostas_corretas', {})
-    respostas_aluno = request.form
-    total_perguntas = len(respostas_corretas)
-    acertos = 0
-    # ... (Seu loop de correção) ...
-    for id_pergunta, resposta_correta in respostas_corretas.items():
-        resposta_aluno = respostas_aluno.get(f'pergunta_{id_pergunta}')
-        if resposta_aluno and resposta_aluno.upper() == resposta_correta.upper():
-            acertos += 1
-            
-    erros = total_perguntas - acertos
-    nota_final = (acertos / total_perguntas) * 100 if total_perguntas > 0 else 0
-    aprovado = acertos >= NOTA_MINIMA_ACERTOS
+    # --- Lógica de Avaliação ---
+    resultado, questoes_erradas = gabarito.corrigir_detalhado(request.form)
+    acertos, erros, total_perguntas, nota_final, aprovado = resultado
     novo_status = 'Concluído' if aprovado else 'Em Andamento' 
     
-    cur = mysql.connection.cursor()
-
-    # 🔴 MUDANÇA: Buscar modulo_id com filtro de nível
-    cur.execute("SELECT modulo_id FROM modulo WHERE curso_acesso = %s AND nivel = %s AND ordem = %s", 
-                [curso_acesso, nivel_atual, ordem])
-    modulo_info = cur.fetchone()
+    # 🔴 MUDANÇA: Buscar modulo_id com filtro de nível (estrutura em memória)
+    modulo_info = estrutura_curso.modulo(curso_acesso, nivel_atual, ordem)
     
     if not modulo_info:
-        cur.close()
         return "Módulo não encontrado no banco de dados para o seu nível atual.", 404
 
     modulo_id = modulo_info['modulo_id']
     
-    # 🔴 MUDANÇA: Inserir 'nivel_modulo' no desempenho
-    sql_desempenho = """
-        INSERT INTO desempenho_modulo (aluno_id, modulo_id, nivel_modulo, status_modulo, nota_final, data_conclusao)
-        VALUES (%s, %s, %s, %s, %s, NOW())
-        ON DUPLICATE KEY UPDATE 
-            status_modulo = VALUES(status_modulo), 
-            nota_final = VALUES(nota_final),
-            data_conclusao = NOW()
-    """
-    cur.execute(sql_desempenho, (aluno_id, modulo_id, nivel_atual, novo_status, nota_final)) # 🔴 NOVO: nivel_atual aqui
+    # Alterações de progresso deste envio: gravadas no fim (na hora ou em lote)
+    desbloqueios = []
+    novo_nivel_aluno = None
 
     
     # -----------------------------------------------------
@@ -601,24 +1007,12 @@ def enviar_atividade(curso, ordem):
     should_redirect = False # Flag para forçar o redirecionamento
     
     if aprovado:
-        proxima_ordem = ordem + 1
-        
         # 1. Tenta encontrar o próximo módulo DENTRO DO NÍVEL ATUAL
-        cur.execute("SELECT modulo_id FROM modulo WHERE curso_acesso = %s AND nivel = %s AND ordem = %s", 
-                    [curso_acesso, nivel_atual, proxima_ordem])
-        proximo_modulo_mesmo_nivel = cur.fetchone()
+        proximo_modulo_mesmo_nivel = estrutura_curso.proximo(curso_acesso, nivel_atual, ordem)
 
         if proximo_modulo_mesmo_nivel:
             # Desbloqueia o próximo módulo do MESMO NÍVEL
-            proximo_modulo_id = proximo_modulo_mesmo_nivel['modulo_id']
-            
-            # 🔴 MUDANÇA: Inserir o nivel_modulo ao desbloquear
-            sql_desbloqueio = """
-                INSERT INTO desempenho_modulo (aluno_id, modulo_id, status_modulo, nivel_modulo)
-                VALUES (%s, %s, 'Em Andamento', %s)
-                ON DUPLICATE KEY UPDATE aluno_id = aluno_id
-            """
-            cur.execute(sql_desbloqueio, (aluno_id, proximo_modulo_id, nivel_atual))
+            desbloqueios.append((proximo_modulo_mesmo_nivel['modulo_id'], nivel_atual))
             
         else:
             # 2. Não há próximo módulo no nível. Tenta avançar para o PRÓXIMO NÍVEL.
@@ -631,35 +1025,45 @@ def enviar_atividade(curso, ordem):
             elif proximo_nivel:
                 # TRANSIÇÃO DE NÍVEL
                 
-                # a. Atualiza o banco de dados do aluno
-                cur.execute("UPDATE aluno SET nivel_curso = %s WHERE aluno_id = %s", 
-                            [proximo_nivel, aluno_id])
+                # a. Atualiza o nível do aluno
+                novo_nivel_aluno = proximo_nivel
                 
                 # b. Desbloqueia o primeiro módulo (ordem 1) do NOVO NÍVEL
-                cur.execute("SELECT modulo_id FROM modulo WHERE curso_acesso = %s AND nivel = %s AND ordem = 1", 
-                            [curso_acesso, proximo_nivel])
-                primeiro_modulo_proximo_nivel = cur.fetchone()
+                primeiro_modulo_proximo_nivel = estrutura_curso.primeiro_do_nivel(curso_acesso, proximo_nivel)
                 
                 if primeiro_modulo_proximo_nivel:
-                    primeiro_modulo_id = primeiro_modulo_proximo_nivel['modulo_id']
-                    
-                    # 🔴 MUDANÇA: Desbloqueio usando o NOVO NÍVEL
-                    sql_desbloqueio_novo_nivel = """
-                        INSERT INTO desempenho_modulo (aluno_id, modulo_id, status_modulo, nivel_modulo)
-                        VALUES (%s, %s, 'Em Andamento', %s)
-                        ON DUPLICATE KEY UPDATE aluno_id = aluno_id
-                    """
-                    cur.execute(sql_desbloqueio_novo_nivel, (aluno_id, primeiro_modulo_id, proximo_nivel))
+                    desbloqueios.append((primeiro_modulo_proximo_nivel['modulo_id'], proximo_nivel))
                 
-                # c. Atualiza a sessão
+                # c. Atualiza a sessão e o perfil em cache
                 session['nivel_curso'] = proximo_nivel
+                cache_perfis.atualizar_nivel(aluno_id, proximo_nivel)
                 
                 # 🏆 MUDANÇA AQUI: Usa a categoria 'level_up' para o pop-up
                 flash(f'Parabéns! Você concluiu o nível {nivel_atual} e avançou para o nível {proximo_nivel}!', 'level_up')
                 should_redirect = True
-            
-    mysql.connection.commit()
-    cur.close()
+
+    if gravador_progresso is not None:
+        # Write-behind: só o diário em disco; o banco é atualizado no próximo lote
+        gravador_progresso.registrar_envio(aluno_id,
+                                           resultado=(modulo_id, nivel_atual, novo_status, nota_final),
+                                           desbloqueios=desbloqueios,
+                                           nivel_aluno=novo_nivel_aluno)
+    else:
+        # 🔴 MUDANÇA: Inserir 'nivel_modulo' no desempenho
+        banco.executar(SQL_RESULTADO, (aluno_id, modulo_id, nivel_atual, novo_status, nota_final, datetime.now()))
+        for modulo_desbloqueado_id, nivel_desbloqueado in desbloqueios:
+            banco.executar(SQL_DESBLOQUEIO, (aluno_id, modulo_desbloqueado_id, nivel_desbloqueado))
+        if novo_nivel_aluno:
+            banco.executar(SQL_NIVEL_ALUNO, [novo_nivel_aluno, aluno_id])
+        banco.commit()
+
+    # Atualiza o snapshot de progresso em cache no lugar (sem nova consulta)
+    servico_progresso.registrar_resultado(aluno_id, modulo_id, nivel_atual, novo_status, nota_final)
+    for modulo_desbloqueado_id, nivel_desbloqueado in desbloqueios:
+        servico_progresso.registrar_desbloqueio(aluno_id, modulo_desbloqueado_id, nivel_desbloqueado)
+
+    # Analíticos do módulo atualizados no lugar (sem agregar desempenho_modulo)
+    analiticos_turma.registrar(modulo_id, aluno_id, session.get('nome'), nota_final, aprovado, questoes_erradas)
 
     # -----------------------------------------------------
     # 🔴 NOVO FLUXO DE RETORNO
@@ -676,49 +1080,46 @@ def enviar_atividade(curso, ordem):
                             nota_final=nota_final,
                             aprovado=aprovado)
 
+# Contas que veem os analíticos da turma (o esquema não tem papel de professor):
+# emails separados por vírgula. Vazio: ninguém vê
+PROFESSORES_EMAILS = {e.strip().lower() for e in os.getenv('PROFESSORES_EMAILS', '').split(',') if e.strip()}
+
+def eh_professor():
+    perfil = cache_perfis.obter(session['aluno_id'])
+    return bool(perfil) and perfil['email'].lower() in PROFESSORES_EMAILS
+
+@app.route('/curso/<string:curso>/modulo/<int:ordem>/analiticos')
+@login_required
+def analiticos_modulo(curso, ordem):
+    """Resumo da turma no módulo (JSON), só para professores. ?nivel= escolhe outro nível."""
+    if not eh_professor():
+        return {"erro": "Acesso restrito aos professores."}, 403
+    nivel = request.args.get('nivel') or session.get('nivel_curso')
+    modulo_info = estrutura_curso.modulo(curso, nivel, ordem) if nivel else None
+    if not modulo_info:
+        return {"erro": "Módulo não encontrado."}, 404
+    resumo = dict(analiticos_turma.resumo(modulo_info['modulo_id']))
+    resumo.update(nome=modulo_info['nome'], nivel=modulo_info['nivel'], curso_acesso=modulo_info['curso_acesso'])
+    return resumo
+
 @app.route('/perfil')
 @login_required
 def perfil():
     aluno_id = session['aluno_id']
     curso_acesso = session['curso_acesso']
     
-    cur = mysql.connection.cursor()
-    
-    cur.execute("SELECT nome, email, curso_acesso FROM aluno WHERE aluno_id = %s", [aluno_id])
-    dados_aluno = cur.fetchone()
+    # Perfil em cache desde o login (consulta `aluno` só se tiver expirado)
+    dados_aluno = cache_perfis.obter(aluno_id)
     
     if not dados_aluno:
-        cur.close()
         session.clear()
         return redirect(url_for('login'))
 
-    cur.execute("SELECT COUNT(modulo_id) AS total_modulos FROM modulo WHERE curso_acesso = %s", [curso_acesso])
-    total_modulos = cur.fetchone()['total_modulos']
-
-    sql_concluidos = """
-        SELECT COUNT(dm.modulo_id) AS modulos_concluidos 
-        FROM desempenho_modulo dm
-        JOIN modulo m ON dm.modulo_id = m.modulo_id
-        WHERE dm.aluno_id = %s 
-        AND m.curso_acesso = %s
-        AND dm.status_modulo = 'Concluído'
-    """
-    cur.execute(sql_concluidos, [aluno_id, curso_acesso])
-    modulos_concluidos = cur.fetchone()['modulos_concluidos']
-
-    sql_atividade_recente = """
-        SELECT m.nome, dm.data_conclusao
-        FROM desempenho_modulo dm
-        JOIN modulo m ON dm.modulo_id = m.modulo_id
-        WHERE dm.aluno_id = %s 
-        AND dm.status_modulo = 'Concluído'
-        ORDER BY dm.data_conclusao DESC
-        LIMIT 5
-    """
-    cur.execute(sql_atividade_recente, [aluno_id])
-    atividades_recente = cur.fetchall()
-    
-    cur.close()
+    # Totais e atividade recente saem da estrutura em memória + snapshot do aluno
+    progresso = servico_progresso.obter(aluno_id)
+    total_modulos = estrutura_curso.total_do_curso(curso_acesso)
+    modulos_concluidos = progresso.modulos_concluidos(estrutura_curso, curso_acesso)
+    atividades_recente = progresso.atividades_recentes(estrutura_curso, limite=5)
 
     progresso_curso_porcentagem = 0
     if total_modulos > 0:
@@ -738,7 +1139,65 @@ def pagamento_ficticio(curso_acesso):
     if curso_acesso not in ['Inglês', 'Espanhol']:
         return redirect(url_for('index'))
     return render_template('pagamento.html', curso_acesso=curso_acesso)
-                            
+
+# *******************************************************************
+# MÉTRICAS (formato Prometheus; só responde para endereços locais)
+# *******************************************************************
+# Atrás de um proxy reverso, o remote_addr é o do proxy: bloqueie /metrics nele também.
+METRICAS_ENDERECOS = {e.strip() for e in os.getenv('METRICAS_ENDERECOS', '127.0.0.1,::1').split(',') if e.strip()}
+
+registro_metricas.medidor('chats_ativos', "Sessões de chat em memória.", funcao=lambda: len(active_chats))
+registro_metricas.coletor('chats', active_chats.estatisticas)
+registro_metricas.coletor('chat_latencia_s', lambda: {nome: janela.resumo() for nome, janela in LATENCIAS_CHAT.items()})
+registro_metricas.coletor('gemini_chaves', pool_chaves.estatisticas)
+registro_metricas.coletor('executor_ia', executor_ia.estatisticas)
+registro_metricas.coletor('limite_conexao', limite_conexao.estatisticas)
+registro_metricas.coletor('limite_aluno', limite_aluno.estatisticas)
+registro_metricas.coletor('fila_chaves', fila_chaves.estatisticas)
+registro_metricas.coletor('voo_unico', voo_unico.estatisticas)
+registro_metricas.coletor('instrucoes_chat', catalogo_instrucoes.estatisticas)
+registro_metricas.coletor('banco_pool', banco.pool.estatisticas)
+registro_metricas.coletor('cache_faq', cache_faq.estatisticas)
+registro_metricas.coletor('cache_perfis', cache_perfis.estatisticas)
+registro_metricas.coletor('cache_fragmentos', cache_fragmentos.estatisticas)
+registro_metricas.coletor('senhas', servico_senhas.estatisticas)
+registro_metricas.coletor('analiticos', analiticos_turma.estatisticas)
+registro_metricas.coletor('log', log_assincrono.estatisticas)
+if gravador_progresso is not None:
+    registro_metricas.coletor('gravacao_progresso', gravador_progresso.estatisticas)
+
+@app.route('/metrics')
+def metricas():
+    if request.remote_addr not in METRICAS_ENDERECOS:
+        return "Não encontrado.", 404
+    resposta = make_response(registro_metricas.exportar())
+    resposta.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    return resposta
+
 if __name__ == '__main__':
+    # Carrega a estrutura dos cursos já na inicialização (se o banco não estiver
+    # disponível agora, ela é carregada na primeira requisição que precisar)
+    with app.app_context():
+        try:
+            estrutura_curso.carregar()
+        except Exception as e:
+            app.logger.warning(f"Estrutura dos cursos não carregada na inicialização: {e}")
+    try:
+        # Depois da recuperação do diário do write-behind (notas ainda não gravadas)
+        reconstruir_analiticos()
+    except Exception as e:
+        app.logger.warning(f"Analíticos não reconstruídos na inicialização: {e}")
+
+    socketio.start_background_task(manutencao_chats)
+    socketio.start_background_task(manter_analiticos, int(os.getenv('ANALITICOS_SALVAR_S', 60)),
+                                   ANALITICOS_RECONSTRUIR_S)
+    atexit.register(analiticos_turma.salvar, ANALITICOS_ARQUIVO)
+    atexit.register(catalogo_instrucoes.fechar)
+    if gravador_progresso is not None:
+        socketio.start_background_task(gravador_progresso.executar, socketio.sleep)
+        atexit.register(gravador_progresso.fechar)
+
     # IMPORTANTE: Mude a forma de execução para usar o SocketIO
-    socketio.run(app, debug=True, host='0.0.0.0', port=5000, use_reloader=False)
\ No newline at end of file
+    # HOST/PORTA permitem subir vários workers na mesma máquina (servidor_multiprocesso.py)
+    socketio.run(app, debug=True, host=os.getenv('HOST', '0.0.0.0'), port=int(os.getenv('PORTA', 5000)),
+                 use_reloader=False)
\ No newline at end of file
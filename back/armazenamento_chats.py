@@ -0,0 +1,282 @@
+"""
+Armazenamento das sessões de chat do Professor Dinossauro.
+
+Substitui o antigo dicionário `active_chats`, que crescia sem limite:
+  - em memória fica no máximo `max_chats` sessões (LRU), cada uma com TTL de
+    inatividade e um teto aproximado de memória somando todas;
+  - cada troca (pergunta/resposta) é persistida de forma compacta em SQLite;
+  - uma sessão despejada (ou criada em outro processo, ou antes de um restart)
+    é reconstruída a partir das últimas trocas persistidas.
+
+Com vários workers (compartilhado=True) a mesma conversa pode receber
+mensagens em processos diferentes. A versão de uma conversa é o último `seq`
+gravado no histórico. Cada sessão em memória guarda a versão que conhece e é
+reconstruída quando outro processo gravou trocas depois dela.
+
+As chamadas ao sqlite3 bloqueiam a thread (e a espera pela trava de escrita
+de outro processo pode levar até o timeout). Com usar_tpool elas rodam no
+pool de threads nativas do eventlet, e o hub continua atendendo os outros
+alunos (inclusive o streaming das respostas).
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Custo fixo estimado de uma sessão em memória (objeto do chat, instrução do sistema...)
+BYTES_BASE_POR_CHAT = 4096
+
+
+class HistoricoChatsSQLite:
+    """Histórico (papel, texto) de cada conversa, guardado em um arquivo SQLite."""
+
+    def __init__(self, caminho, max_mensagens=40, usar_tpool=False):
+        self.caminho = caminho
+        # Quantas mensagens (user + model) são reenviadas ao reconstruir um chat
+        self.max_mensagens = max_mensagens
+        self.usar_tpool = usar_tpool
+        # Uma operação por vez na conexão; a green thread segura o lock enquanto
+        # a thread nativa do tpool executa
+        self._lock = threading.Lock()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False, timeout=10)
+        with self._lock:
+            self._conexao.execute("PRAGMA journal_mode=WAL")
+            self._conexao.execute("PRAGMA synchronous=NORMAL")
+            self._conexao.execute("""
+                CREATE TABLE IF NOT EXISTS chat_mensagem (
+                    chave TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    papel TEXT NOT NULL,
+                    texto TEXT NOT NULL,
+                    criado_em REAL NOT NULL,
+                    PRIMARY KEY (chave, seq)
+                )
+            """)
+            self._conexao.commit()
+
+    def carregar(self, chave):
+        """Últimas mensagens da conversa, da mais antiga para a mais nova."""
+        return self.carregar_versionado(chave)[0]
+
+    def carregar_versionado(self, chave):
+        """(últimas mensagens, versão da conversa), lidas no mesmo instante."""
+        def ler():
+            return self._conexao.execute(
+                "SELECT seq, papel, texto FROM chat_mensagem WHERE chave = ? ORDER BY seq DESC LIMIT ?",
+                (chave, self.max_mensagens)
+            ).fetchall()
+        linhas = self._executar(ler)
+        versao = linhas[0][0] if linhas else 0
+        linhas = [(papel, texto) for _, papel, texto in reversed(linhas)]
+        # O histórico precisa começar com uma mensagem do usuário
+        while linhas and linhas[0][0] != 'user':
+            linhas.pop(0)
+        return linhas, versao
+
+    def versao(self, chave):
+        """Último seq gravado da conversa (0 se ela não existe)."""
+        return self._executar(lambda: self._conexao.execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM chat_mensagem WHERE chave = ?", (chave,)
+        ).fetchone()[0])
+
+    def acrescentar(self, chave, mensagens):
+        """
+        Acrescenta [(papel, texto), ...] ao fim da conversa.
+        Retorna (versão antes, versão depois) da gravação.
+        """
+        agora = time.time()
+
+        def gravar():
+            # Trava de escrita já na leitura do MAX(seq): outro processo gravando
+            # a mesma conversa espera, em vez de tentar o mesmo seq
+            self._conexao.execute("BEGIN IMMEDIATE")
+            try:
+                ultimo = self._conexao.execute(
+                    "SELECT COALESCE(MAX(seq), 0) FROM chat_mensagem WHERE chave = ?", (chave,)
+                ).fetchone()[0]
+                self._conexao.executemany(
+                    "INSERT INTO chat_mensagem (chave, seq, papel, texto, criado_em) VALUES (?, ?, ?, ?, ?)",
+                    [(chave, ultimo + i, papel, texto, agora) for i, (papel, texto) in enumerate(mensagens, start=1)]
+                )
+                self._conexao.commit()
+            except Exception:
+                self._conexao.rollback()
+                raise
+            return ultimo
+
+        ultimo = self._executar(gravar)
+        return ultimo, ultimo + len(mensagens)
+
+    def apagar(self, chave):
+        def apagar():
+            self._conexao.execute("DELETE FROM chat_mensagem WHERE chave = ?", (chave,))
+            self._conexao.commit()
+        self._executar(apagar)
+
+    def expurgar(self, mais_antigas_que_segundos):
+        """Remove mensagens antigas; retorna quantas linhas foram apagadas."""
+        limite = time.time() - mais_antigas_que_segundos
+
+        def apagar_antigas():
+            cur = self._conexao.execute("DELETE FROM chat_mensagem WHERE criado_em < ?", (limite,))
+            self._conexao.commit()
+            return cur.rowcount
+        return self._executar(apagar_antigas)
+
+    def _executar(self, funcao):
+        with self._lock:
+            if self.usar_tpool:
+                from eventlet import tpool
+                return tpool.execute(funcao)
+            return funcao()
+
+
+class _EntradaChat:
+    __slots__ = ('chat', 'curso', 'bytes', 'mensagens', 'ultimo_uso', 'versao')
+
+    def __init__(self, chat, curso, historico, versao=0):
+        self.chat = chat
+        self.curso = curso
+        self.versao = versao
+        self.bytes = BYTES_BASE_POR_CHAT + sum(len(texto) for _, texto in historico)
+        self.mensagens = len(historico)
+        self.ultimo_uso = time.monotonic()
+
+
+class ArmazenamentoChats:
+    """Cache LRU/TTL de sessões de chat com reconstrução a partir do histórico."""
+
+    def __init__(self, fabrica_chat, historico, max_chats=500, ttl_segundos=1800,
+                 max_bytes=32 * 1024 * 1024, compartilhado=False):
+        # fabrica_chat(curso, [(papel, texto), ...]) -> nova sessão de chat
+        self._fabrica_chat = fabrica_chat
+        self._historico = historico
+        self.max_chats = max_chats
+        self.ttl_segundos = ttl_segundos
+        self.max_bytes = max_bytes
+        # Histórico usado por vários processos: confere a versão a cada acesso
+        self.compartilhado = compartilhado
+
+        self._entradas = OrderedDict()
+        self._bytes_residentes = 0
+        self._lock = threading.Lock()
+        self._metricas = {
+            'hits': 0,
+            'misses': 0,
+            'reconstruidos': 0,
+            'despejos_lru': 0,
+            'despejos_ttl': 0,
+            'despejos_memoria': 0,
+            'desatualizados': 0,
+        }
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def __contains__(self, chave):
+        return chave in self._entradas
+
+    def obter(self, chave, curso):
+        """Sessão de chat da chave; cria (ou reconstrói do histórico) se necessário."""
+        agora = time.monotonic()
+        versao_atual = self._historico.versao(chave) if self.compartilhado else None
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                if agora - entrada.ultimo_uso > self.ttl_segundos:
+                    self._remover(chave, 'despejos_ttl')
+                    entrada = None
+                elif versao_atual is not None and versao_atual != entrada.versao:
+                    # Outro processo respondeu nesta conversa: a sessão em memória não viu essas trocas
+                    self._remover(chave, 'desatualizados')
+                    entrada = None
+                else:
+                    entrada.ultimo_uso = agora
+                    self._entradas.move_to_end(chave)
+                    self._metricas['hits'] += 1
+                    return entrada.chat
+
+        historico, versao = self._historico.carregar_versionado(chave)
+        chat = self._fabrica_chat(curso, historico)
+
+        with self._lock:
+            self._metricas['misses'] += 1
+            if historico:
+                self._metricas['reconstruidos'] += 1
+            if chave in self._entradas:
+                self._remover(chave, None)
+            entrada = _EntradaChat(chat, curso, historico, versao)
+            self._entradas[chave] = entrada
+            self._bytes_residentes += entrada.bytes
+            self._despejar_excedentes()
+        return chat
+
+    def registrar_troca(self, chave, pergunta, resposta):
+        """Persiste uma pergunta/resposta e atualiza a contabilidade de memória."""
+        versao_anterior, versao_nova = self._historico.acrescentar(chave, [('user', pergunta), ('model', resposta)])
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                return
+            # Só avança se ninguém gravou entre a leitura e esta troca; senão a
+            # próxima mensagem reconstrói a sessão com as trocas do outro processo
+            if entrada.versao == versao_anterior:
+                entrada.versao = versao_nova
+            acrescimo = len(pergunta) + len(resposta)
+            entrada.bytes += acrescimo
+            entrada.mensagens += 2
+            self._bytes_residentes += acrescimo
+            # Conversas longas saem da memória; na próxima mensagem o chat é
+            # reconstruído só com as últimas mensagens persistidas.
+            if entrada.mensagens >= 2 * self._historico.max_mensagens:
+                self._remover(chave, None)
+            self._despejar_excedentes()
+
+    def remover(self, chave):
+        with self._lock:
+            self._remover(chave, None)
+
+    def _remover(self, chave, motivo):
+        entrada = self._entradas.pop(chave, None)
+        if entrada is None:
+            return
+        self._bytes_residentes -= entrada.bytes
+        if motivo:
+            self._metricas[motivo] += 1
+
+    def _despejar_excedentes(self):
+        while len(self._entradas) > self.max_chats:
+            chave = next(iter(self._entradas))
+            self._remover(chave, 'despejos_lru')
+        while self._bytes_residentes > self.max_bytes and len(self._entradas) > 1:
+            chave = next(iter(self._entradas))
+            self._remover(chave, 'despejos_memoria')
+
+    def expirar(self):
+        """Remove da memória as sessões inativas há mais que o TTL."""
+        limite = time.monotonic() - self.ttl_segundos
+        with self._lock:
+            expiradas = [chave for chave, entrada in self._entradas.items() if entrada.ultimo_uso < limite]
+            for chave in expiradas:
+                self._remover(chave, 'despejos_ttl')
+        return len(expiradas)
+
+    def expurgar_historico(self, mais_antigas_que_segundos):
+        return self._historico.expurgar(mais_antigas_que_segundos)
+
+    def estatisticas(self):
+        with self._lock:
+            metricas = dict(self._metricas)
+            metricas['residentes'] = len(self._entradas)
+            metricas['bytes_residentes'] = self._bytes_residentes
+        metricas['max_chats'] = self.max_chats
+        metricas['max_bytes'] = self.max_bytes
+        return metricas
+
+
+def caminho_padrao_historico(base_dir):
+    return os.getenv('CHAT_HISTORICO_DB', os.path.join(base_dir, 'chat_historico.sqlite3'))
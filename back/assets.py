@@ -0,0 +1,124 @@
+"""
+Arquivos estáticos gerados pelo build_assets.py (static/dist).
+
+Serve os arquivos com hash no nome em /assets/<arquivo> com cache longo e
+"immutable" (os sem hash, como o manifest.json, com "no-cache"), escolhendo a versão pré-comprimida (.br / .gz) conforme o
+Accept-Encoding, e expõe aos templates:
+  - asset_url('img/logo.png') -> URL com hash (ou /static/... sem build);
+  - imagem_responsiva('img/logo.png', alt=..., classe=..., sizes=...) ->
+    <picture> com AVIF/WebP em várias larguras e PNG de fallback.
+"""
+import json
+import logging
+import mimetypes
+import os
+import re
+
+from flask import request, send_from_directory, url_for
+from markupsafe import Markup, escape
+
+logger = logging.getLogger(__name__)
+
+NOME_MANIFESTO = 'manifest.json'
+CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+# Arquivos sem hash no nome podem mudar com o mesmo nome: o navegador revalida
+CACHE_REVALIDAR = 'no-cache'
+# logo.3f2a9c1b.webp, logo-640.3f2a9c1b.avif (hash de build_assets.hash_conteudo)
+PADRAO_NOME_COM_HASH = re.compile(r'\.[0-9a-f]{8}\.[^./]+$')
+# Ordem de preferência das versões pré-comprimidas
+CODIFICACOES = (('br', '.br'), ('gzip', '.gz'))
+
+
+class Assets:
+
+    def __init__(self, app=None):
+        self.diretorio_dist = None
+        self.formatos = []
+        self._manifesto = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.diretorio_dist = os.path.abspath(
+            app.config.get('ASSETS_DIST') or os.path.join(app.static_folder, 'dist')
+        )
+        self.recarregar()
+        app.add_url_rule('/assets/<path:arquivo>', 'asset', self.servir)
+        app.context_processor(lambda: {
+            'asset_url': self.url,
+            'imagem_responsiva': self.imagem_responsiva,
+        })
+
+    def recarregar(self):
+        """Relê o manifest.json (sem build, os helpers caem em /static/...)."""
+        caminho = os.path.join(self.diretorio_dist, NOME_MANIFESTO)
+        try:
+            with open(caminho, 'r', encoding='utf-8') as arquivo:
+                dados = json.load(arquivo)
+        except FileNotFoundError:
+            logger.info("Sem %s: servindo arquivos estáticos originais.", caminho)
+            dados = {}
+        except (OSError, json.JSONDecodeError) as erro:
+            logger.error("Manifesto de assets inválido (%s): %s", caminho, erro)
+            dados = {}
+        self.formatos = dados.get('formatos', [])
+        self._manifesto = dados.get('arquivos', {})
+        return len(self._manifesto)
+
+    # -----------------------------------------------------------------
+    # Helpers dos templates
+    # -----------------------------------------------------------------
+    def url(self, caminho):
+        entrada = self._manifesto.get(caminho)
+        if entrada is None:
+            return url_for('static', filename=caminho)
+        return url_for('asset', arquivo=entrada['arquivo'])
+
+    def imagem_responsiva(self, caminho, alt='', classe='', sizes='100vw', carregamento=None):
+        atributos = f'alt="{escape(alt)}"'
+        if classe:
+            atributos += f' class="{escape(classe)}"'
+        if carregamento:
+            atributos += f' loading="{escape(carregamento)}"'
+        atributos += ' decoding="async"'
+
+        entrada = self._manifesto.get(caminho)
+        if entrada is None or not entrada.get('variantes'):
+            return Markup(f'<img src="{escape(self.url(caminho))}" {atributos}>')
+
+        fontes = []
+        for formato in self.formatos:
+            variantes = entrada['variantes'].get(formato)
+            if not variantes:
+                continue
+            srcset = ', '.join(
+                f"{url_for('asset', arquivo=v['arquivo'])} {v['largura']}w" for v in variantes
+            )
+            fontes.append(
+                f'<source type="image/{formato}" srcset="{escape(srcset)}" sizes="{escape(sizes)}">'
+            )
+        # display: contents mantém o layout do <img> como se o <picture> não existisse
+        return Markup(
+            '<picture style="display: contents">'
+            + ''.join(fontes)
+            + f'<img src="{escape(self.url(caminho))}" {atributos}>'
+            + '</picture>'
+        )
+
+    # -----------------------------------------------------------------
+    # Rota /assets/<arquivo>
+    # -----------------------------------------------------------------
+    def servir(self, arquivo):
+        aceitas = request.accept_encodings
+        for codificacao, sufixo in CODIFICACOES:
+            if aceitas[codificacao] and os.path.isfile(os.path.join(self.diretorio_dist, arquivo + sufixo)):
+                tipo = mimetypes.guess_type(arquivo)[0] or 'application/octet-stream'
+                resposta = send_from_directory(self.diretorio_dist, arquivo + sufixo, mimetype=tipo)
+                resposta.headers['Content-Encoding'] = codificacao
+                break
+        else:
+            resposta = send_from_directory(self.diretorio_dist, arquivo)
+        com_hash = PADRAO_NOME_COM_HASH.search(arquivo) is not None
+        resposta.headers['Cache-Control'] = CACHE_IMUTAVEL if com_hash else CACHE_REVALIDAR
+        resposta.vary.add('Accept-Encoding')
+        return resposta
@@ -0,0 +1,77 @@
+"""
+Correção das atividades dos módulos.
+
+O gabarito de cada módulo ('respostas_corretas' no JSON) é compilado uma vez
+em uma estrutura compacta: o nome do campo do formulário já montado
+('pergunta_q1') e a resposta correta já em maiúsculas, de modo que a correção
+só chama .upper() na resposta do aluno (a comparação continua sem diferenciar
+maiúsculas de minúsculas, inclusive em respostas como "Yes" ou "don't").
+"""
+from collections import namedtuple
+
+NOTA_MINIMA_ACERTOS = 7
+
+ResultadoAvaliacao = namedtuple(
+    'ResultadoAvaliacao',
+    ['acertos', 'erros', 'total_perguntas', 'nota_final', 'aprovado']
+)
+
+
+class GabaritoCompilado:
+    """Gabarito normalizado de um módulo, pronto para corrigir envios."""
+
+    __slots__ = ('itens', 'ids', 'total_perguntas', 'nota_minima')
+
+    def __init__(self, respostas_corretas, nota_minima=NOTA_MINIMA_ACERTOS):
+        itens = []
+        for id_pergunta, resposta_correta in respostas_corretas.items():
+            itens.append((f'pergunta_{id_pergunta}', str(resposta_correta).upper()))
+        self.itens = tuple(itens)
+        # Ids das questões ('q1', 'q2'...), na mesma ordem de `itens`
+        self.ids = tuple(str(id_pergunta) for id_pergunta in respostas_corretas)
+        self.total_perguntas = len(self.itens)
+        self.nota_minima = nota_minima
+
+    def contar_acertos(self, respostas_aluno):
+        """Conta os acertos de um envio (qualquer mapeamento campo -> resposta)."""
+        get = respostas_aluno.get
+        acertos = 0
+        for campo, correta in self.itens:
+            if str(get(campo) or '').upper() == correta:
+                acertos += 1
+        return acertos
+
+    def corrigir(self, respostas_aluno):
+        """Corrige um envio e devolve o resultado usado pelo popup de desempenho."""
+        return self._resultado(self.contar_acertos(respostas_aluno))
+
+    def questoes_erradas(self, respostas_aluno):
+        """Ids das questões erradas (ou deixadas em branco) em um envio."""
+        get = respostas_aluno.get
+        return tuple(id_pergunta for id_pergunta, (campo, correta) in zip(self.ids, self.itens)
+                     if str(get(campo) or '').upper() != correta)
+
+    def corrigir_detalhado(self, respostas_aluno):
+        """Como corrigir(), mais os ids das questões erradas: (resultado, erradas)."""
+        erradas = self.questoes_erradas(respostas_aluno)
+        return self._resultado(self.total_perguntas - len(erradas)), erradas
+
+    def corrigir_lote(self, lista_respostas):
+        """
+        Corrige vários envios do mesmo módulo (ex.: recorreção em massa depois
+        de um ajuste no gabarito). Retorna a lista de resultados na mesma ordem.
+        """
+        contar = self.contar_acertos
+        resultado = self._resultado
+        return [resultado(contar(respostas)) for respostas in lista_respostas]
+
+    def _resultado(self, acertos):
+        total = self.total_perguntas
+        nota_final = (acertos / total) * 100 if total > 0 else 0
+        return ResultadoAvaliacao(acertos, total - acertos, total, nota_final,
+                                  acertos >= self.nota_minima)
+
+
+def compilar_gabarito(conteudo, nota_minima=NOTA_MINIMA_ACERTOS):
+    """Compila o gabarito a partir do conteúdo JSON de um módulo."""
+    return GabaritoCompilado(conteudo.get('respostas_corretas', {}), nota_minima)
@@ -0,0 +1,286 @@
+"""
+Camada de acesso ao MySQL com pool de conexões.
+
+Substitui o flask_mysqldb (uma conexão nova por contexto da aplicação) por um
+pool limitado de conexões reaproveitadas entre requisições. O pool usa as
+primitivas de `threading`/`queue`, que o eventlet.monkey_patch() transforma em
+versões cooperativas, então é seguro entre green threads.
+
+Cada requisição pega no máximo uma conexão e um cursor (guardados em flask.g),
+usados por todas as consultas da rota; no teardown eles voltam para o pool.
+Cada comando é cronometrado e contado na requisição (g._banco_comandos e
+g._banco_tempo_s); `ao_executar(sql, duracao)` permite enviar isso a métricas.
+"""
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from functools import lru_cache
+
+import MySQLdb
+import MySQLdb.cursors
+from flask import g
+
+logger = logging.getLogger(__name__)
+
+_PADRAO_TABELA = re.compile(r'\b(?:FROM|INTO|UPDATE)\s+`?(\w+)', re.IGNORECASE)
+
+
+@lru_cache(maxsize=512)
+def rotulo_sql(sql):
+    """Rótulo curto e de cardinalidade baixa para métricas: 'select:aluno', 'insert:desempenho_modulo'..."""
+    texto = sql.strip()
+    operacao = texto.split(None, 1)[0].lower() if texto else 'vazio'
+    tabela = _PADRAO_TABELA.search(texto)
+    return f"{operacao}:{tabela.group(1).lower()}" if tabela else operacao
+
+
+class ErroPoolEsgotado(RuntimeError):
+    """Nenhuma conexão ficou livre dentro do tempo limite de aquisição."""
+
+
+class PoolConexoes:
+    """Pool limitado de conexões MySQLdb com verificação de saúde."""
+
+    def __init__(self, parametros_conexao, tamanho=10, timeout_aquisicao=5.0, verificar_apos=30.0):
+        self._parametros = parametros_conexao
+        self.tamanho = tamanho
+        self.timeout_aquisicao = timeout_aquisicao
+        # Conexões ociosas há mais tempo que isso recebem um ping antes do uso
+        self.verificar_apos = verificar_apos
+
+        self._livres = queue.LifoQueue()
+        self._vagas = threading.BoundedSemaphore(tamanho)
+        self._lock = threading.Lock()
+        self._metricas = {
+            'aquisicoes': 0,
+            'esperas': 0,
+            'espera_total_s': 0.0,
+            'espera_max_s': 0.0,
+            'timeouts': 0,
+            'conexoes_criadas': 0,
+            'conexoes_descartadas': 0,
+            'em_uso': 0,
+        }
+
+    def _criar_conexao(self):
+        conexao = MySQLdb.connect(**self._parametros)
+        with self._lock:
+            self._metricas['conexoes_criadas'] += 1
+        return conexao
+
+    def _descartar(self, conexao):
+        try:
+            conexao.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._metricas['conexoes_descartadas'] += 1
+
+    def adquirir(self):
+        """Retorna uma conexão saudável, esperando até timeout_aquisicao por uma vaga."""
+        inicio = time.monotonic()
+        if not self._vagas.acquire(blocking=False):
+            if not self._vagas.acquire(timeout=self.timeout_aquisicao):
+                with self._lock:
+                    self._metricas['timeouts'] += 1
+                raise ErroPoolEsgotado(
+                    f"Nenhuma conexão livre em {self.timeout_aquisicao}s (pool com {self.tamanho})."
+                )
+            espera = time.monotonic() - inicio
+            with self._lock:
+                self._metricas['esperas'] += 1
+                self._metricas['espera_total_s'] += espera
+                self._metricas['espera_max_s'] = max(self._metricas['espera_max_s'], espera)
+
+        try:
+            conexao = self._conexao_livre_saudavel() or self._criar_conexao()
+        except Exception:
+            self._vagas.release()
+            raise
+
+        with self._lock:
+            self._metricas['aquisicoes'] += 1
+            self._metricas['em_uso'] += 1
+        return conexao
+
+    def _conexao_livre_saudavel(self):
+        while True:
+            try:
+                conexao, devolvida_em = self._livres.get_nowait()
+            except queue.Empty:
+                return None
+            if time.monotonic() - devolvida_em < self.verificar_apos:
+                return conexao
+            try:
+                conexao.ping()
+                return conexao
+            except MySQLdb.Error:
+                logger.warning("Conexão do pool falhou no ping; descartando.")
+                self._descartar(conexao)
+
+    def devolver(self, conexao, com_erro=False):
+        """Devolve a conexão ao pool (ou a descarta se ela ficou em estado inválido)."""
+        try:
+            if com_erro:
+                self._descartar(conexao)
+            else:
+                try:
+                    # Garante que nada pendente vaze para a próxima requisição
+                    conexao.rollback()
+                    self._livres.put((conexao, time.monotonic()))
+                except MySQLdb.Error:
+                    self._descartar(conexao)
+        finally:
+            with self._lock:
+                self._metricas['em_uso'] -= 1
+            self._vagas.release()
+
+    def estatisticas(self):
+        with self._lock:
+            metricas = dict(self._metricas)
+        metricas['livres'] = self._livres.qsize()
+        metricas['tamanho'] = self.tamanho
+        return metricas
+
+
+class Banco:
+    """
+    Acesso a dados usado pelas rotas. Lê a configuração MYSQL_* do app Flask
+    (os mesmos nomes usados pelo flask_mysqldb) e mais:
+      MYSQL_POOL_SIZE, MYSQL_POOL_TIMEOUT, MYSQL_POOL_PING_AFTER
+    """
+
+    def __init__(self, app=None):
+        self.pool = None
+        # Comandos SQL executados desde o início (benchmarks medem consultas por requisição)
+        self.total_comandos = 0
+        # Opcional: chamado com (sql, duracao em s) depois de cada comando
+        self.ao_executar = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        config = app.config
+        parametros = {
+            'host': config.get('MYSQL_HOST', 'localhost'),
+            'user': config.get('MYSQL_USER', 'root'),
+            'passwd': config.get('MYSQL_PASSWORD', ''),
+            'db': config.get('MYSQL_DB'),
+            'port': int(config.get('MYSQL_PORT', 3306)),
+            'charset': 'utf8mb4',
+            'use_unicode': True,
+        }
+        cursorclass = config.get('MYSQL_CURSORCLASS')
+        if cursorclass:
+            parametros['cursorclass'] = getattr(MySQLdb.cursors, cursorclass)
+
+        self.pool = PoolConexoes(
+            parametros,
+            tamanho=int(config.get('MYSQL_POOL_SIZE', 10)),
+            timeout_aquisicao=float(config.get('MYSQL_POOL_TIMEOUT', 5.0)),
+            verificar_apos=float(config.get('MYSQL_POOL_PING_AFTER', 30.0)),
+        )
+        app.teardown_appcontext(self._liberar)
+
+    # -----------------------------------------------------------------
+    # Conexão e cursor da requisição atual
+    # -----------------------------------------------------------------
+    @property
+    def connection(self):
+        conexao = g.get('_banco_conexao')
+        if conexao is None:
+            conexao = self.pool.adquirir()
+            g._banco_conexao = conexao
+        return conexao
+
+    def cursor(self):
+        """Cursor único da requisição (reaproveitado por todas as consultas)."""
+        cur = g.get('_banco_cursor')
+        if cur is None:
+            cur = self.connection.cursor()
+            g._banco_cursor = cur
+        return cur
+
+    def _liberar(self, exc=None):
+        cur = g.pop('_banco_cursor', None)
+        conexao = g.pop('_banco_conexao', None)
+        if cur is not None:
+            try:
+                cur.close()
+            except Exception:
+                pass
+        if conexao is not None:
+            com_erro = isinstance(exc, MySQLdb.OperationalError)
+            self.pool.devolver(conexao, com_erro=com_erro)
+
+    # -----------------------------------------------------------------
+    # Consultas
+    # -----------------------------------------------------------------
+    def _executar_cronometrado(self, metodo, sql, params):
+        inicio = time.perf_counter()
+        try:
+            return metodo(sql, params)
+        finally:
+            duracao = time.perf_counter() - inicio
+            self.total_comandos += 1
+            g._banco_comandos = g.get('_banco_comandos', 0) + 1
+            g._banco_tempo_s = g.get('_banco_tempo_s', 0.0) + duracao
+            if self.ao_executar is not None:
+                self.ao_executar(sql, duracao)
+
+    def consultar_um(self, sql, params=None):
+        cur = self.cursor()
+        self._executar_cronometrado(cur.execute, sql, params)
+        return cur.fetchone()
+
+    def consultar_todos(self, sql, params=None):
+        cur = self.cursor()
+        self._executar_cronometrado(cur.execute, sql, params)
+        return cur.fetchall()
+
+    def executar(self, sql, params=None):
+        """Executa um comando de escrita (sem commit) e retorna o rowcount."""
+        cur = self.cursor()
+        self._executar_cronometrado(cur.execute, sql, params)
+        return cur.rowcount
+
+    def executar_varios(self, sql, lista_params):
+        """
+        executemany (sem commit). Para INSERT ... VALUES o MySQLdb monta um único
+        INSERT de várias linhas; retorna o rowcount.
+        """
+        cur = self.cursor()
+        self._executar_cronometrado(cur.executemany, sql, lista_params)
+        return cur.rowcount
+
+    def commit(self):
+        conexao = g.get('_banco_conexao')
+        if conexao is not None:
+            conexao.commit()
+
+    def rollback(self):
+        conexao = g.get('_banco_conexao')
+        if conexao is not None:
+            conexao.rollback()
+
+
+def criar_banco_script(nome, tamanho_pool=1):
+    """
+    (app, banco) para ferramentas de linha de comando, com as mesmas variáveis
+    MYSQL_* do app.py. Use as consultas dentro de `with app.app_context():`.
+    """
+    from flask import Flask
+    app = Flask(nome)
+    app.config.update({
+        'MYSQL_HOST': os.getenv('MYSQL_HOST', 'localhost'),
+        'MYSQL_USER': os.getenv('MYSQL_USER', 'root'),
+        'MYSQL_PASSWORD': os.getenv('MYSQL_PASSWORD', 'senai'),
+        'MYSQL_DB': os.getenv('MYSQL_DB', 'levelup'),
+        'MYSQL_PORT': int(os.getenv('MYSQL_PORT', 3306)),
+        'MYSQL_CURSORCLASS': 'DictCursor',
+        'MYSQL_POOL_SIZE': tamanho_pool,
+    })
+    return app, Banco(app)
@@ -0,0 +1,253 @@
+"""
+Benchmark das rotas Flask e do evento de chat do SocketIO.
+
+Sobe o app em processo (test client do Flask e do Flask-SocketIO, sob
+eventlet, como em produção) contra um MySQL local e o cliente Gemini falso
+(GENAI_FAKE=1), e mede para cada cenário:
+  vazão (req/s), latência p50/p95/p99 e comandos SQL por requisição.
+
+Cenários: login, curso, modulo_get, modulo_get_304 (If-None-Match),
+modulo_post, perfil e chat (evento enviar_mensagem).
+
+MySQL descartável com o schema do projeto:
+    docker compose -f bench_mysql.yml up -d
+    python bench_app.py --mysql-port 3307 --salvar-baseline bench_baseline.json
+    ... alterações no app.py ...
+    python bench_app.py --mysql-port 3307 --comparar bench_baseline.json
+
+Com --comparar o comando sai com código 1 se algum cenário ficar mais lento
+que a tolerância (p95) ou passar a fazer mais comandos SQL por requisição.
+Só MySQL é suportado: o schema (ENUM, ON DUPLICATE KEY UPDATE) e a camada
+banco.py são específicos dele.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from metricas import percentil
+
+CENARIOS = ('login', 'curso', 'modulo_get', 'modulo_get_304', 'modulo_post', 'perfil', 'chat')
+SENHA_BENCH = 'senha-bench-123'
+
+
+def configurar_ambiente(args):
+    """Variáveis lidas pelo app.py na importação (precisa vir antes do import)."""
+    os.environ.update({
+        'MYSQL_HOST': args.mysql_host,
+        'MYSQL_PORT': str(args.mysql_port),
+        'MYSQL_USER': args.mysql_user,
+        'MYSQL_PASSWORD': args.mysql_password,
+        'MYSQL_DB': args.mysql_db,
+        'GENAI_FAKE': '1',
+        'GENAI_FAKE_LATENCIA': str(args.latencia_llm),
+        'FAQ_CACHE': '1' if args.faq else '0',
+        # O benchmark mede o app, não o controle de admissão do chat
+        'CHAT_RAJADA_CONEXAO': '100000',
+        'CHAT_RAJADA_ALUNO': '100000',
+        'CHAT_HISTORICO_DB': os.path.join(tempfile.mkdtemp(prefix='bench_levelup_'), 'chats.sqlite3'),
+    })
+    if args.scrypt_n:
+        os.environ['SENHAS_SCRYPT_N'] = str(args.scrypt_n)
+
+
+class Bench:
+
+    def __init__(self, modulo_app, usuarios, repeticoes):
+        self.m = modulo_app
+        self.app = modulo_app.app
+        self.usuarios = usuarios
+        self.repeticoes = repeticoes
+        self.emails = [f"bench{i:04d}@levelup.test" for i in range(usuarios)]
+        self.clientes = []
+
+    # -----------------------------------------------------------------
+    # Preparação
+    # -----------------------------------------------------------------
+    def preparar(self):
+        cliente = self.app.test_client()
+        for i, email in enumerate(self.emails):
+            cliente.post('/cadastro', data={
+                'nome': f'Aluno Bench {i}', 'email': email, 'senha': SENHA_BENCH, 'curso_acesso': 'Inglês',
+            })
+
+        banco = self.m.banco
+        with self.app.app_context():
+            marcadores = ', '.join(['%s'] * len(self.emails))
+            linhas = banco.consultar_todos(f"SELECT aluno_id FROM aluno WHERE email IN ({marcadores})", self.emails)
+            ids = [linha['aluno_id'] for linha in linhas]
+            marcadores = ', '.join(['%s'] * len(ids))
+            banco.executar(f"DELETE FROM desempenho_modulo WHERE aluno_id IN ({marcadores})", ids)
+            banco.executar(f"UPDATE aluno SET nivel_curso = 'Básico' WHERE aluno_id IN ({marcadores})", ids)
+            banco.commit()
+            self.m.estrutura_curso.carregar()
+        self.m.servico_progresso.invalidar()
+        self.m.cache_perfis.invalidar()
+
+        self.clientes = [self._cliente_logado(email) for email in self.emails]
+        conteudo = self.m.catalogo_conteudo.obter_modulo('ingles', 'Básico', 1)
+        self.respostas_modulo = {
+            f'pergunta_{id_pergunta}': letra for id_pergunta, letra in conteudo['respostas_corretas'].items()
+        }
+        resposta = self.clientes[0].get('/curso/ingles/modulo/1')
+        self.etag_modulo = resposta.headers.get('ETag')
+
+    def _cliente_logado(self, email):
+        cliente = self.app.test_client()
+        resposta = cliente.post('/login', data={'email': email, 'senha': SENHA_BENCH})
+        if resposta.status_code != 302 or '/curso' not in resposta.headers.get('Location', ''):
+            raise RuntimeError(f"Login de {email} falhou (status {resposta.status_code}).")
+        return cliente
+
+    # -----------------------------------------------------------------
+    # Cenários: cada um recebe (índice do usuário, repetição) e retorna True se deu certo
+    # -----------------------------------------------------------------
+    def login(self, usuario, _):
+        resposta = self.app.test_client().post('/login', data={'email': self.emails[usuario], 'senha': SENHA_BENCH})
+        return resposta.status_code == 302
+
+    def curso(self, usuario, _):
+        return self.clientes[usuario].get('/curso').status_code == 200
+
+    def modulo_get(self, usuario, _):
+        return self.clientes[usuario].get('/curso/ingles/modulo/1').status_code == 200
+
+    def modulo_get_304(self, usuario, _):
+        resposta = self.clientes[usuario].get('/curso/ingles/modulo/1', headers={'If-None-Match': self.etag_modulo})
+        return resposta.status_code == 304
+
+    def modulo_post(self, usuario, _):
+        return self.clientes[usuario].post('/curso/ingles/modulo/1', data=self.respostas_modulo).status_code == 200
+
+    def perfil(self, usuario, _):
+        return self.clientes[usuario].get('/perfil').status_code == 200
+
+    def chat(self, usuario, repeticao):
+        cliente_socket = self.m.socketio.test_client(self.app, flask_test_client=self.clientes[usuario])
+        try:
+            cliente_socket.get_received()
+            cliente_socket.emit('enviar_mensagem', {
+                'mensagem': f'Aluno {usuario}, pergunta número {repeticao}: como uso o verbo to be?',
+                'curso_acesso': 'Inglês',
+                'streaming': True,
+            })
+            eventos = {evento['name'] for evento in cliente_socket.get_received()}
+        finally:
+            cliente_socket.disconnect()
+        return bool(eventos & {'nova_mensagem', 'nova_mensagem_concluida'}) and 'erro' not in eventos
+
+    # -----------------------------------------------------------------
+    # Medição
+    # -----------------------------------------------------------------
+    def medir(self, nome):
+        import eventlet
+
+        cenario = getattr(self, nome)
+        latencias = []
+        falhas = [0]
+
+        def usuario(indice):
+            for repeticao in range(self.repeticoes):
+                inicio = time.perf_counter()
+                ok = cenario(indice, repeticao)
+                latencias.append(time.perf_counter() - inicio)
+                if not ok:
+                    falhas[0] += 1
+
+        comandos_antes = self.m.banco.total_comandos
+        inicio = time.perf_counter()
+        pool = eventlet.GreenPool(self.usuarios)
+        for indice in range(self.usuarios):
+            pool.spawn(usuario, indice)
+        pool.waitall()
+        duracao = time.perf_counter() - inicio
+        comandos = self.m.banco.total_comandos - comandos_antes
+
+        latencias.sort()
+        return {
+            'requisicoes': len(latencias),
+            'falhas': falhas[0],
+            'req_s': round(len(latencias) / duracao, 1),
+            'p50_ms': round(percentil(latencias, 50) * 1000, 2),
+            'p95_ms': round(percentil(latencias, 95) * 1000, 2),
+            'p99_ms': round(percentil(latencias, 99) * 1000, 2),
+            'sql_por_req': round(comandos / len(latencias), 2),
+        }
+
+
+def comparar(resultados, baseline, tolerancia):
+    """Lista de regressões em relação à baseline (vazia se nada piorou)."""
+    regressoes = []
+    for nome, atual in resultados.items():
+        anterior = baseline.get('cenarios', {}).get(nome)
+        if not anterior:
+            continue
+        if anterior['p95_ms'] and atual['p95_ms'] > anterior['p95_ms'] * (1 + tolerancia):
+            regressoes.append(f"{nome}: p95 {anterior['p95_ms']} -> {atual['p95_ms']} ms")
+        if atual['sql_por_req'] > anterior['sql_por_req']:
+            regressoes.append(f"{nome}: SQL por requisição {anterior['sql_por_req']} -> {atual['sql_por_req']}")
+        if atual['falhas'] > anterior.get('falhas', 0):
+            regressoes.append(f"{nome}: {atual['falhas']} falhas (antes {anterior.get('falhas', 0)})")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--usuarios', type=int, default=20, help="Usuários simultâneos.")
+    parser.add_argument('--repeticoes', type=int, default=10, help="Requisições por usuário em cada cenário.")
+    parser.add_argument('--cenarios', nargs='+', choices=CENARIOS, default=list(CENARIOS))
+    parser.add_argument('--mysql-host', default='127.0.0.1')
+    parser.add_argument('--mysql-port', type=int, default=3306)
+    parser.add_argument('--mysql-user', default='root')
+    parser.add_argument('--mysql-password', default='senai')
+    parser.add_argument('--mysql-db', default='levelup')
+    parser.add_argument('--latencia-llm', type=float, default=0.2, help="Latência do Gemini falso (s).")
+    parser.add_argument('--faq', action='store_true', help="Mantém o cache de FAQ ligado no cenário de chat.")
+    parser.add_argument('--scrypt-n', type=int, default=None,
+                        help="N do scrypt (padrão: o do app; use um valor baixo para medir só o app).")
+    parser.add_argument('--salvar-baseline', metavar='ARQUIVO')
+    parser.add_argument('--comparar', metavar='ARQUIVO')
+    parser.add_argument('--tolerancia', type=float, default=0.2, help="Piora aceitável do p95 (0.2 = 20%%).")
+    args = parser.parse_args()
+
+    configurar_ambiente(args)
+    import app as modulo_app
+
+    bench = Bench(modulo_app, args.usuarios, args.repeticoes)
+    bench.preparar()
+
+    print(f"{args.usuarios} usuários x {args.repeticoes} requisições por cenário\n")
+    print(f"{'cenário':<16} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'SQL/req':>8} {'falhas':>7}")
+    resultados = {}
+    for nome in args.cenarios:
+        r = bench.medir(nome)
+        resultados[nome] = r
+        print(f"{nome:<16} {r['req_s']:>8.1f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+              f"{r['p99_ms']:>8.2f} {r['sql_por_req']:>8.2f} {r['falhas']:>7}")
+
+    if args.salvar_baseline:
+        with open(args.salvar_baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'gerado_em': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'parametros': {'usuarios': args.usuarios, 'repeticoes': args.repeticoes,
+                               'latencia_llm': args.latencia_llm},
+                'cenarios': resultados,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\nBaseline gravada em {args.salvar_baseline}")
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            regressoes = comparar(resultados, json.load(f), args.tolerancia)
+        if regressoes:
+            print("\nRegressões:")
+            for regressao in regressoes:
+                print(f"  - {regressao}")
+            return 1
+        print("\nSem regressões em relação à baseline.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
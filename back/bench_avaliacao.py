@@ -0,0 +1,80 @@
+"""
+Micro-benchmark da correção de atividades.
+
+Compara o loop antigo de enviar_atividade (que chamava .upper() nos dois lados
+para cada questão) com o GabaritoCompilado, corrigindo um envio por vez e em lote.
+
+Uso: python bench_avaliacao.py [--envios 2000] [--repeticoes 5]
+"""
+import argparse
+import os
+import random
+import timeit
+
+from avaliacao import NOTA_MINIMA_ACERTOS
+from conteudo import CatalogoConteudo
+
+
+def corrigir_loop_antigo(respostas_corretas, respostas_aluno):
+    """Cópia fiel da lógica de avaliação anterior, usada como referência."""
+    total_perguntas = len(respostas_corretas)
+    acertos = 0
+    for id_pergunta, resposta_correta in respostas_corretas.items():
+        resposta_aluno = respostas_aluno.get(f'pergunta_{id_pergunta}')
+        if resposta_aluno and resposta_aluno.upper() == resposta_correta.upper():
+            acertos += 1
+    erros = total_perguntas - acertos
+    nota_final = (acertos / total_perguntas) * 100 if total_perguntas > 0 else 0
+    aprovado = acertos >= NOTA_MINIMA_ACERTOS
+    return acertos, erros, total_perguntas, nota_final, aprovado
+
+
+def gerar_envios(respostas_corretas, quantidade, semente=42):
+    rnd = random.Random(semente)
+    envios = []
+    for _ in range(quantidade):
+        envio = {}
+        for id_pergunta in respostas_corretas:
+            envio[f'pergunta_{id_pergunta}'] = rnd.choice('ABCDabcd')
+        envios.append(envio)
+    return envios
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--envios', type=int, default=2000)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    catalogo = CatalogoConteudo(os.path.join(base_dir, '..', 'static', 'json_content'))
+    catalogo.carregar()
+
+    curso, nivel, ordem = 'ingles', 'basico', 1
+    conteudo = catalogo.obter_modulo(curso, nivel, ordem)
+    gabarito = catalogo.obter_gabarito(curso, nivel, ordem)
+    respostas_corretas = conteudo['respostas_corretas']
+    envios = gerar_envios(respostas_corretas, args.envios)
+
+    # Os dois caminhos precisam dar exatamente o mesmo resultado
+    for envio in envios:
+        assert tuple(gabarito.corrigir(envio)) == corrigir_loop_antigo(respostas_corretas, envio)
+
+    casos = {
+        'loop antigo': lambda: [corrigir_loop_antigo(respostas_corretas, e) for e in envios],
+        'gabarito compilado': lambda: [gabarito.corrigir(e) for e in envios],
+        'gabarito compilado (lote)': lambda: gabarito.corrigir_lote(envios),
+    }
+
+    print(f"Módulo {curso}/{nivel}/{ordem}: {gabarito.total_perguntas} questões, {args.envios} envios")
+    referencia = None
+    for nome, funcao in casos.items():
+        melhor = min(timeit.repeat(funcao, number=1, repeat=args.repeticoes))
+        por_envio_us = melhor / args.envios * 1e6
+        if referencia is None:
+            referencia = melhor
+        print(f"  {nome:<28} {por_envio_us:8.2f} µs/envio  ({referencia / melhor:4.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
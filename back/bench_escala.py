@@ -0,0 +1,181 @@
+"""
+Benchmark de escala do chat: vazão com 1, 2, 4... workers na mesma máquina.
+
+Para cada quantidade de workers, sobe o cluster como o servidor_multiprocesso.py
+(app.py com GENAI_FAKE=1, broker local e histórico de chat compartilhado) e
+dispara a carga a partir de processos separados. Cada processo de carga roda
+vários clientes Socket.IO em green threads, e cada cliente manda --mensagens
+perguntas em sequência. Os clientes são distribuídos entre as portas dos
+workers, como faria um balanceador. Mede:
+  mensagens/s, latência p50/p95/p99 (envio -> resposta completa) e falhas.
+
+    python bench_escala.py --workers 1 2 4 --clientes 200 --mensagens 5
+
+O chat não usa o MySQL, mas o app.py precisa do mysqlclient instalado para
+importar. A escala só aparece com núcleos livres para os workers e para a
+carga (os processos de carga também usam CPU).
+Sem o pacote websocket-client os clientes usam long-polling.
+"""
+import eventlet
+eventlet.monkey_patch()
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from uuid import uuid4
+
+from broker_local import PREFIXO_URL, iniciar_broker_em_thread
+from metricas import percentil
+from servidor_multiprocesso import esperar_portas, iniciar_workers, parar_workers
+
+# O mesmo app.secret_key do app.py: os clientes chegam com uma sessão Flask
+# assinada, então cada um mantém a mesma conversa entre mensagens
+SEGREDO_SESSAO = 'levelup'
+
+
+def cookie_sessao(dados):
+    from flask import Flask
+    app = Flask('bench_escala')
+    app.secret_key = SEGREDO_SESSAO
+    return app.session_interface.get_signing_serializer(app).dumps(dados)
+
+
+# *******************************************************************
+# Processo de carga (python bench_escala.py --carga ...)
+# *******************************************************************
+def gerar_carga(portas, clientes, mensagens, streaming, indice_processo, timeout):
+    import socketio
+
+    latencias = []
+    falhas = [0]
+
+    def cliente(indice):
+        respostas = eventlet.queue.LightQueue()
+        sio = socketio.Client(reconnection=False)
+        sio.on('nova_mensagem', lambda dados: respostas.put(True))
+        sio.on('nova_mensagem_concluida', lambda dados: respostas.put(True))
+        sio.on('erro', lambda dados: respostas.put(False))
+        cookie = cookie_sessao({'session_id': str(uuid4()), 'nome': f'Aluno {indice_processo}-{indice}',
+                                'curso_acesso': 'Inglês', 'nivel_curso': 'Básico'})
+        try:
+            sio.connect(f"http://127.0.0.1:{portas[indice % len(portas)]}", headers={'Cookie': f'session={cookie}'})
+        except Exception:
+            falhas[0] += mensagens
+            return
+        try:
+            for numero in range(mensagens):
+                inicio = time.perf_counter()
+                sio.emit('enviar_mensagem', {
+                    'mensagem': f'Cliente {indice_processo}-{indice}, pergunta {numero}: como uso o verbo to be?',
+                    'curso_acesso': 'Inglês',
+                    'streaming': streaming,
+                })
+                try:
+                    ok = respostas.get(timeout=timeout)
+                except eventlet.queue.Empty:
+                    ok = False
+                if ok:
+                    latencias.append(time.perf_counter() - inicio)
+                else:
+                    falhas[0] += 1
+        finally:
+            sio.disconnect()
+
+    inicio = time.perf_counter()
+    pool = eventlet.GreenPool(clientes)
+    for indice in range(clientes):
+        pool.spawn(cliente, indice)
+    pool.waitall()
+    return {'latencias': latencias, 'falhas': falhas[0], 'duracao': time.perf_counter() - inicio}
+
+
+# *******************************************************************
+# Orquestração
+# *******************************************************************
+def medir(quantidade_workers, args, porta_broker):
+    diretorio = tempfile.mkdtemp(prefix='bench_escala_')
+    message_queue = f"{PREFIXO_URL}127.0.0.1:{porta_broker}"
+    workers = iniciar_workers(quantidade_workers, args.porta_base, message_queue, ambiente_extra={
+        'GENAI_FAKE': '1',
+        'GENAI_FAKE_LATENCIA': str(args.latencia_llm),
+        'FAQ_CACHE': '0',
+        'CHAT_HISTORICO_DB': os.path.join(diretorio, 'chats.sqlite3'),
+        'LOG_AMOSTRAGEM': '0',
+        'CHAT_RAJADA_CONEXAO': '100000',
+        'CHAT_RAJADA_ALUNO': '100000',
+    }, saida=subprocess.DEVNULL)
+    portas = [porta for porta, _ in workers]
+    try:
+        esperar_portas(portas)
+        clientes_por_processo = max(1, args.clientes // args.processos_carga)
+        processos = [
+            subprocess.Popen([
+                sys.executable, os.path.abspath(__file__), '--carga',
+                '--portas', ','.join(map(str, portas)),
+                '--clientes', str(clientes_por_processo),
+                '--mensagens', str(args.mensagens),
+                '--indice-processo', str(indice),
+                '--timeout', str(args.timeout),
+            ] + (['--streaming'] if args.streaming else []), stdout=subprocess.PIPE, text=True)
+            for indice in range(args.processos_carga)
+        ]
+        parciais = [json.loads(processo.communicate()[0]) for processo in processos]
+    finally:
+        parar_workers(workers)
+
+    latencias = sorted(valor for parcial in parciais for valor in parcial['latencias'])
+    duracao = max(parcial['duracao'] for parcial in parciais)
+    return {
+        'workers': quantidade_workers,
+        'mensagens': len(latencias),
+        'falhas': sum(parcial['falhas'] for parcial in parciais),
+        'msg_s': len(latencias) / duracao if duracao else 0.0,
+        'p50_ms': (percentil(latencias, 50) or 0) * 1000,
+        'p95_ms': (percentil(latencias, 95) or 0) * 1000,
+        'p99_ms': (percentil(latencias, 99) or 0) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--clientes', type=int, default=200, help="Clientes Socket.IO simultâneos (total).")
+    parser.add_argument('--mensagens', type=int, default=5, help="Mensagens por cliente.")
+    parser.add_argument('--processos-carga', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--latencia-llm', type=float, default=0.2, help="Latência do Gemini falso (s).")
+    parser.add_argument('--streaming', action='store_true', help="Respostas em trechos (mais eventos por mensagem).")
+    parser.add_argument('--timeout', type=float, default=30.0, help="Espera máxima por resposta (s).")
+    parser.add_argument('--porta-base', type=int, default=5101)
+    parser.add_argument('--porta-broker', type=int, default=5699)
+    # Modo interno: processo gerador de carga
+    parser.add_argument('--carga', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--portas', help=argparse.SUPPRESS)
+    parser.add_argument('--indice-processo', type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.carga:
+        portas = [int(porta) for porta in args.portas.split(',')]
+        resultado = gerar_carga(portas, args.clientes, args.mensagens, args.streaming,
+                                args.indice_processo, args.timeout)
+        print(json.dumps(resultado))
+        return
+
+    iniciar_broker_em_thread('127.0.0.1', args.porta_broker)
+    print(f"{args.clientes} clientes x {args.mensagens} mensagens, {args.processos_carga} processos de carga, "
+          f"Gemini falso com {args.latencia_llm}s\n")
+    print(f"{'workers':>7} {'msg/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'falhas':>7} {'escala':>7}")
+    base = None
+    for quantidade in args.workers:
+        r = medir(quantidade, args, args.porta_broker)
+        base = base or r['msg_s'] or None
+        escala = r['msg_s'] / base if base else 0.0
+        print(f"{r['workers']:>7} {r['msg_s']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+              f"{r['p99_ms']:>8.1f} {r['falhas']:>7} {escala:>6.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark da criação de chats do Professor Dinossauro com o Gemini falso.
+
+Compara, para --chats conversas de --mensagens perguntas cada:
+  - antigo:    instrução e GenerateContentConfig montados a cada chat, inline;
+  - compilado: CatalogoInstrucoes sem cache do provedor (instrução reaproveitada);
+  - cache:     CatalogoInstrucoes com cache de contexto (caches.create).
+Mostra o tempo de criação do chat, a latência por mensagem e os tokens de
+instrução enviados em cada chamada x lidos do cache. O Gemini falso soma
+--latencia-mil-tokens segundos por mil tokens de instrução enviados inline.
+
+O Gemini 2.5 Flash só aceita em cache conteúdos a partir de 1024 tokens; a
+instrução do curso sozinha fica abaixo disso. O padrão --min-tokens-cache 0
+mostra o ganho que uma instrução longa (por exemplo, com --resumo-modulo e
+módulos grandes) teria.
+
+Uso: python bench_instrucoes.py [--chats 200] [--mensagens 5] [--resumo-modulo]
+"""
+import argparse
+import json
+import os
+import time
+
+from google.genai import types
+
+from gemini_fake import ClienteGeminiFake
+from instrucoes_chat import CatalogoInstrucoes, resumir_modulo, texto_instrucao
+from metricas import percentil
+from pool_chaves import EstadoChave, SessaoChat
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELO = "gemini-2.5-flash"
+CURSOS = ('Inglês', 'Espanhol')
+
+
+def carregar_resumos():
+    resumos = {}
+    for curso, pasta in (('Inglês', 'ingles'), ('Espanhol', 'espanhol')):
+        caminho = os.path.join(BASE_DIR, '..', 'static', 'json_content', pasta, 'basico', 'modulo_1.json')
+        with open(caminho, encoding='utf-8') as arquivo:
+            resumos[curso] = resumir_modulo(json.load(arquivo))
+    return resumos
+
+
+def medir(modo, args, resumos):
+    cliente = ClienteGeminiFake(api_key='bench', latencia=args.latencia, variacao=0,
+                                latencia_mil_tokens=args.latencia_mil_tokens,
+                                minimo_tokens_cache=args.min_tokens_cache)
+    estado = EstadoChave(0, cliente)
+    catalogo = CatalogoInstrucoes(MODELO, usar_cache_provedor=(modo == 'cache'),
+                                  minimo_tokens_cache=args.min_tokens_cache)
+    criacoes = []
+    mensagens = []
+    for indice in range(args.chats):
+        curso = CURSOS[indice % len(CURSOS)]
+        resumo = resumos.get(curso)
+        inicio = time.perf_counter()
+        if modo == 'antigo':
+            config = types.GenerateContentConfig(system_instruction=texto_instrucao(curso, resumo))
+        else:
+            config = catalogo.config_para(curso, estado, resumo)
+        sessao = SessaoChat(curso, MODELO, config, estado)
+        criacoes.append(time.perf_counter() - inicio)
+        for numero in range(args.mensagens):
+            inicio = time.perf_counter()
+            sessao.chat.send_message(f"Pergunta {numero} sobre o verbo to be")
+            mensagens.append(time.perf_counter() - inicio)
+
+    criacoes.sort()
+    mensagens.sort()
+    return {
+        'modo': modo,
+        'criacao_p50_us': percentil(criacoes, 50) * 1e6,
+        'criacao_p99_us': percentil(criacoes, 99) * 1e6,
+        'mensagem_p50_ms': percentil(mensagens, 50) * 1000,
+        'tokens_enviados': cliente.tokens_instrucao_enviados,
+        'tokens_cache': cliente.tokens_instrucao_cache,
+        'caches': cliente.caches_criados,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chats', type=int, default=200)
+    parser.add_argument('--mensagens', type=int, default=5, help="Mensagens por chat.")
+    parser.add_argument('--latencia', type=float, default=0.0, help="Latência fixa do Gemini falso (s).")
+    parser.add_argument('--latencia-mil-tokens', type=float, default=0.02,
+                        help="Latência por mil tokens de instrução inline (s).")
+    parser.add_argument('--min-tokens-cache', type=int, default=0)
+    parser.add_argument('--resumo-modulo', action='store_true', help="Inclui o resumo do módulo na instrução.")
+    parser.add_argument('--modos', nargs='+', default=['antigo', 'compilado', 'cache'])
+    args = parser.parse_args()
+
+    resumos = carregar_resumos() if args.resumo_modulo else {}
+    print(f"{args.chats} chats x {args.mensagens} mensagens\n")
+    print(f"{'modo':<10} {'criação p50 µs':>15} {'p99 µs':>8} {'msg p50 ms':>11} "
+          f"{'tokens enviados':>16} {'tokens cache':>13} {'caches':>7}")
+    base = None
+    for modo in args.modos:
+        r = medir(modo, args, resumos)
+        base = base or r
+        print(f"{r['modo']:<10} {r['criacao_p50_us']:>15.1f} {r['criacao_p99_us']:>8.1f} {r['mensagem_p50_ms']:>11.2f} "
+              f"{r['tokens_enviados']:>16} {r['tokens_cache']:>13} {r['caches']:>7}")
+    print(f"\nInstrução inline: {base['tokens_enviados'] / max(1, args.chats * args.mensagens):.0f} tokens "
+          "por mensagem (estimativa de ~4 caracteres por token).")
+
+
+if __name__ == '__main__':
+    main()
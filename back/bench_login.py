@@ -0,0 +1,89 @@
+"""
+Benchmark da verificação de senha no login com N alunos simultâneos.
+
+Roda sob eventlet (como o app) e compara:
+  - legado: SHA-256 sem salt (o login antigo);
+  - direto: scrypt na própria green thread (trava o hub enquanto calcula);
+  - tpool:  scrypt no pool de threads nativas (modo usado pelo app).
+Para cada modo mostra vazão, latência do login (p50/p95/p99) e o maior atraso
+do hub, medido por uma green thread que tenta acordar a cada 10 ms: é o atraso
+que qualquer outra requisição ou evento do SocketIO sofreria no mesmo momento.
+
+Uso: python bench_login.py [--usuarios 50] [--logins 4] [--n 16384] [--modos legado direto tpool]
+"""
+import eventlet
+eventlet.monkey_patch()
+
+import argparse
+import time
+
+from metricas import percentil
+from senhas import MODO_DIRETO, MODO_TPOOL, ServicoSenhas, gerar_hash, hash_legado
+
+INTERVALO_BATIMENTO = 0.01
+
+
+def medir(servico, hash_armazenado, usuarios, logins_por_usuario):
+    latencias = []
+    atrasos = []
+    rodando = [True]
+
+    def batimento():
+        while rodando[0]:
+            antes = time.monotonic()
+            eventlet.sleep(INTERVALO_BATIMENTO)
+            atrasos.append(time.monotonic() - antes - INTERVALO_BATIMENTO)
+
+    def aluno():
+        for _ in range(logins_por_usuario):
+            inicio = time.monotonic()
+            resultado = servico.verificar('senha-do-aluno', hash_armazenado)
+            latencias.append(time.monotonic() - inicio)
+            assert resultado.valida
+
+    monitor = eventlet.spawn(batimento)
+    eventlet.sleep(0)
+    inicio = time.monotonic()
+    pool = eventlet.GreenPool(usuarios)
+    for _ in range(usuarios):
+        pool.spawn(aluno)
+    pool.waitall()
+    duracao = time.monotonic() - inicio
+    rodando[0] = False
+    monitor.wait()
+
+    latencias.sort()
+    atrasos.sort()
+    return {
+        'logins_s': len(latencias) / duracao,
+        'p50_ms': percentil(latencias, 50) * 1000,
+        'p95_ms': percentil(latencias, 95) * 1000,
+        'p99_ms': percentil(latencias, 99) * 1000,
+        'atraso_hub_max_ms': (atrasos[-1] if atrasos else 0.0) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--usuarios', type=int, default=50, help="Logins simultâneos.")
+    parser.add_argument('--logins', type=int, default=4, help="Logins por usuário.")
+    parser.add_argument('--n', type=int, default=2 ** 14, help="Parâmetro N do scrypt.")
+    parser.add_argument('--modos', nargs='+', default=['legado', MODO_DIRETO, MODO_TPOOL],
+                        choices=['legado', MODO_DIRETO, MODO_TPOOL])
+    args = parser.parse_args()
+
+    hash_scrypt = gerar_hash('senha-do-aluno', n=args.n)
+    print(f"{args.usuarios} usuários x {args.logins} logins, scrypt N={args.n}\n")
+    print(f"{'modo':<8} {'logins/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'atraso hub ms':>14}")
+    for modo in args.modos:
+        if modo == 'legado':
+            servico, armazenado = ServicoSenhas(n=args.n, modo=MODO_DIRETO), hash_legado('senha-do-aluno')
+        else:
+            servico, armazenado = ServicoSenhas(n=args.n, modo=modo), hash_scrypt
+        r = medir(servico, armazenado, args.usuarios, args.logins)
+        print(f"{modo:<8} {r['logins_s']:>9.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+              f"{r['p99_ms']:>8.1f} {r['atraso_hub_max_ms']:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""
+Fila de mensagens local para o Socket.IO com vários processos.
+
+Com mais de um worker, um emit feito no processo A precisa chegar aos clientes
+conectados no processo B: o Flask-SocketIO resolve isso com um backend de
+pub/sub (SOCKETIO_MESSAGE_QUEUE). Em produção use um Redis
+(redis://host:6379/0); para desenvolvimento e benchmarks numa máquina só,
+este módulo tem um broker mínimo sem dependências:
+
+    python broker_local.py --porta 5600
+    SOCKETIO_MESSAGE_QUEUE=levelup://127.0.0.1:5600 python app.py
+
+Protocolo (TCP, uma linha JSON por mensagem):
+    cliente -> broker  {"assinar": "<canal>"}              (conexão de escuta)
+    cliente -> broker  {"canal": "<canal>", "dados": "..."} (publicação)
+    broker  -> cliente  a mesma linha de publicação, para cada assinante do canal
+O broker não guarda nada: quem não estiver conectado perde as mensagens,
+como no PUBLISH do Redis.
+"""
+import argparse
+import json
+import logging
+import socket
+import socketserver
+import threading
+import time
+from urllib.parse import urlparse
+
+import socketio
+
+logger = logging.getLogger(__name__)
+
+PREFIXO_URL = 'levelup://'
+PORTA_PADRAO = 5600
+
+
+def endereco_da_url(url):
+    """'levelup://127.0.0.1:5600' -> ('127.0.0.1', 5600)"""
+    partes = urlparse(url)
+    return partes.hostname or '127.0.0.1', partes.port or PORTA_PADRAO
+
+
+# *******************************************************************
+# Broker
+# *******************************************************************
+class _ConexaoBroker(socketserver.StreamRequestHandler):
+
+    def setup(self):
+        super().setup()
+        # Publicações de conexões diferentes não podem se misturar na mesma linha
+        self._lock_envio = threading.Lock()
+
+    def handle(self):
+        broker = self.server
+        canal_assinado = None
+        try:
+            for linha in self.rfile:
+                try:
+                    mensagem = json.loads(linha)
+                except ValueError:
+                    logger.warning("Linha inválida recebida pelo broker; ignorando.")
+                    continue
+                if 'assinar' in mensagem:
+                    canal_assinado = mensagem['assinar']
+                    broker.assinar(canal_assinado, self)
+                elif 'canal' in mensagem:
+                    broker.publicar(mensagem['canal'], linha)
+        except OSError:
+            pass
+        finally:
+            if canal_assinado is not None:
+                broker.cancelar(canal_assinado, self)
+
+    def enviar(self, linha):
+        with self._lock_envio:
+            self.wfile.write(linha)
+            self.wfile.flush()
+
+
+class BrokerLocal(socketserver.ThreadingTCPServer):
+    """Repassa cada publicação a todas as conexões que assinaram o canal."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', porta=PORTA_PADRAO):
+        super().__init__((host, porta), _ConexaoBroker)
+        self._assinantes = {}
+        self._lock = threading.Lock()
+        self._metricas = {'publicadas': 0, 'entregues': 0, 'falhas_entrega': 0}
+
+    def assinar(self, canal, conexao):
+        with self._lock:
+            self._assinantes.setdefault(canal, set()).add(conexao)
+
+    def cancelar(self, canal, conexao):
+        with self._lock:
+            self._assinantes.get(canal, set()).discard(conexao)
+
+    def publicar(self, canal, linha):
+        with self._lock:
+            assinantes = list(self._assinantes.get(canal, ()))
+            self._metricas['publicadas'] += 1
+        for conexao in assinantes:
+            try:
+                conexao.enviar(linha)
+                entregue = True
+            except OSError:
+                entregue = False
+                self.cancelar(canal, conexao)
+            with self._lock:
+                self._metricas['entregues' if entregue else 'falhas_entrega'] += 1
+
+    def estatisticas(self):
+        with self._lock:
+            metricas = dict(self._metricas)
+            metricas['assinantes'] = sum(len(conexoes) for conexoes in self._assinantes.values())
+        return metricas
+
+
+def iniciar_broker_em_thread(host='127.0.0.1', porta=PORTA_PADRAO):
+    """Sobe o broker numa thread daemon (usado pelo lançador e pelo benchmark)."""
+    broker = BrokerLocal(host, porta)
+    threading.Thread(target=broker.serve_forever, daemon=True, name='broker-local').start()
+    return broker
+
+
+# *******************************************************************
+# Gerenciador de clientes do Socket.IO ligado ao broker
+# *******************************************************************
+class GerenciadorBrokerLocal(socketio.PubSubManager):
+    """client_manager do python-socketio que usa o BrokerLocal como pub/sub."""
+    name = 'levelup'
+
+    def __init__(self, url=f'{PREFIXO_URL}127.0.0.1:{PORTA_PADRAO}', channel='flask-socketio',
+                 write_only=False, logger=None, json=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+        self.endereco = endereco_da_url(url)
+        self._conexao_publicacao = None
+        self._lock_publicacao = threading.Lock()
+
+    def _conectar(self):
+        conexao = socket.create_connection(self.endereco, timeout=5)
+        conexao.settimeout(None)
+        return conexao
+
+    def _linha(self, mensagem):
+        return (json.dumps(mensagem, separators=(',', ':')) + '\n').encode('utf-8')
+
+    def _publish(self, data):
+        linha = self._linha({'canal': self.channel, 'dados': self.json.dumps(data)})
+        with self._lock_publicacao:
+            for tentativas_restantes in (1, 0):
+                try:
+                    if self._conexao_publicacao is None:
+                        self._conexao_publicacao = self._conectar()
+                    self._conexao_publicacao.sendall(linha)
+                    return
+                except OSError as e:
+                    self._conexao_publicacao = None
+                    if not tentativas_restantes:
+                        self._get_logger().error(f"Não foi possível publicar no broker {self.endereco}: {e}")
+
+    def _listen(self):
+        espera = 1
+        while True:
+            try:
+                conexao = self._conectar()
+                conexao.sendall(self._linha({'assinar': self.channel}))
+                espera = 1
+                with conexao.makefile('rb') as leitor:
+                    for linha in leitor:
+                        mensagem = json.loads(linha)
+                        if mensagem.get('canal') == self.channel:
+                            yield mensagem['dados']
+            except OSError as e:
+                self._get_logger().error(f"Conexão com o broker {self.endereco} perdida ({e}); "
+                                         f"tentando de novo em {espera}s")
+            time.sleep(espera)
+            espera = min(espera * 2, 30)
+
+
+def criar_gerenciador(url, canal='flask-socketio'):
+    """client_manager para SOCKETIO_MESSAGE_QUEUE=levelup://...; None para outras URLs."""
+    if not url or not url.startswith(PREFIXO_URL):
+        return None
+    return GerenciadorBrokerLocal(url, channel=canal)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=PORTA_PADRAO)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    broker = BrokerLocal(args.host, args.porta)
+    logger.info(f"Broker local do Socket.IO em {args.host}:{args.porta}")
+    try:
+        broker.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+Build dos arquivos estáticos (imagens e textos) para produção.
+
+Lê ../static (menos static/dist), gera em ../static/dist:
+  - imagens redimensionadas em WebP (e AVIF, se o Pillow tiver suporte) em
+    algumas larguras, mais um PNG otimizado como fallback;
+  - nomes com hash do conteúdo (logo.3f2a9c1b.webp), que podem ser servidos
+    com cache "immutable": se o arquivo mudar, o nome muda;
+  - versões .gz e .br (se o pacote brotli estiver instalado) dos arquivos de texto;
+  - manifest.json, que o app usa para trocar 'img/logo.png' pelas URLs novas.
+
+Uso:
+    python build_assets.py
+    python build_assets.py --larguras 160 320 640 1024 --qualidade 80
+"""
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+
+from PIL import Image, features
+from unidecode import unidecode
+
+try:
+    import brotli
+except ImportError:  # opcional: sem ele só o .gz é gerado
+    brotli = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DIRETORIO_STATIC = os.path.join(BASE_DIR, '..', 'static')
+NOME_DIST = 'dist'
+NOME_MANIFESTO = 'manifest.json'
+
+EXTENSOES_IMAGEM = {'.png', '.jpg', '.jpeg'}
+EXTENSOES_TEXTO = {'.css', '.js', '.svg', '.json', '.txt', '.html'}
+# Pastas de static/ que não passam pelo build (servidas como estão)
+IGNORAR = {NOME_DIST, 'json_content', 'videos'}
+
+LARGURAS_PADRAO = (160, 320, 640, 1024)
+# Textos menores que isso não compensam a versão comprimida
+TAMANHO_MINIMO_COMPRESSAO = 1024
+
+
+def nome_seguro(caminho_relativo):
+    """'img/Dino Básico.png' -> 'img/dino-basico' (sem extensão, sem espaços/acentos)."""
+    pasta, arquivo = os.path.split(caminho_relativo)
+    base = os.path.splitext(arquivo)[0]
+    base = unidecode(base).strip().lower().replace(' ', '-')
+    return f"{pasta}/{base}" if pasta else base
+
+
+def hash_conteudo(dados, tamanho=8):
+    return hashlib.sha256(dados).hexdigest()[:tamanho]
+
+
+def gravar_com_hash(diretorio_dist, base, extensao, dados):
+    """Grava `dados` como {base}.{hash}{extensao} e retorna o caminho relativo ao dist."""
+    relativo = f"{base}.{hash_conteudo(dados)}{extensao}"
+    destino = os.path.join(diretorio_dist, relativo)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    with open(destino, 'wb') as arquivo:
+        arquivo.write(dados)
+    return relativo
+
+
+def codificar_imagem(imagem, formato, qualidade):
+    saida = io.BytesIO()
+    if formato == 'webp':
+        imagem.save(saida, 'WEBP', quality=qualidade, method=6)
+    elif formato == 'avif':
+        imagem.save(saida, 'AVIF', quality=qualidade)
+    else:
+        imagem.save(saida, 'PNG', optimize=True)
+    return saida.getvalue()
+
+
+def processar_imagem(caminho, relativo, diretorio_dist, larguras, formatos, qualidade):
+    with Image.open(caminho) as original:
+        original.load()
+        largura_original, altura_original = original.size
+        imagem = original if original.mode in ('RGB', 'RGBA') else original.convert('RGBA')
+
+        base = nome_seguro(relativo)
+        larguras_usadas = sorted({l for l in larguras if l < largura_original} | {min(largura_original, max(larguras))})
+
+        entrada = {
+            'largura': largura_original,
+            'altura': altura_original,
+            'variantes': {formato: [] for formato in formatos},
+        }
+        for largura in larguras_usadas:
+            altura = round(altura_original * largura / largura_original)
+            redimensionada = imagem if largura == largura_original else imagem.resize((largura, altura), Image.LANCZOS)
+            for formato in formatos:
+                dados = codificar_imagem(redimensionada, formato, qualidade)
+                arquivo = gravar_com_hash(diretorio_dist, f"{base}-{largura}", f".{formato}", dados)
+                entrada['variantes'][formato].append({'largura': largura, 'arquivo': arquivo})
+
+        # Fallback para navegadores sem WebP: PNG otimizado na maior largura gerada
+        maior = larguras_usadas[-1]
+        fallback = imagem if maior == largura_original else imagem.resize(
+            (maior, round(altura_original * maior / largura_original)), Image.LANCZOS)
+        entrada['arquivo'] = gravar_com_hash(diretorio_dist, base, '.png', codificar_imagem(fallback, 'png', qualidade))
+    return entrada
+
+
+def processar_texto(caminho, relativo, diretorio_dist):
+    with open(caminho, 'rb') as arquivo:
+        dados = arquivo.read()
+    base, extensao = os.path.splitext(relativo)
+    destino = gravar_com_hash(diretorio_dist, base, extensao, dados)
+    comprimir(os.path.join(diretorio_dist, destino), dados)
+    return {'arquivo': destino}
+
+
+def comprimir(destino, dados):
+    """Grava destino.gz (e destino.br) ao lado do arquivo, se valer a pena."""
+    if len(dados) < TAMANHO_MINIMO_COMPRESSAO:
+        return
+    with open(destino + '.gz', 'wb') as arquivo:
+        arquivo.write(gzip.compress(dados, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(destino + '.br', 'wb') as arquivo:
+            arquivo.write(brotli.compress(dados, quality=11))
+
+
+def varrer(diretorio_static):
+    for raiz, pastas, arquivos in os.walk(diretorio_static):
+        if raiz == diretorio_static:
+            pastas[:] = [p for p in pastas if p not in IGNORAR]
+        for nome in sorted(arquivos):
+            caminho = os.path.join(raiz, nome)
+            yield caminho, os.path.relpath(caminho, diretorio_static).replace(os.sep, '/')
+
+
+def construir(diretorio_static=DIRETORIO_STATIC, larguras=LARGURAS_PADRAO, qualidade=80, formatos=None):
+    diretorio_static = os.path.abspath(diretorio_static)
+    diretorio_dist = os.path.join(diretorio_static, NOME_DIST)
+    if formatos is None:
+        formatos = ['avif', 'webp'] if features.check('avif') else ['webp']
+
+    # Sempre do zero: arquivos com hash antigo não devem sobrar no dist
+    shutil.rmtree(diretorio_dist, ignore_errors=True)
+    os.makedirs(diretorio_dist)
+
+    manifesto = {}
+    bytes_originais = bytes_gerados = 0
+    for caminho, relativo in varrer(diretorio_static):
+        extensao = os.path.splitext(relativo)[1].lower()
+        if extensao in EXTENSOES_IMAGEM:
+            entrada = processar_imagem(caminho, relativo, diretorio_dist, larguras, formatos, qualidade)
+            bytes_originais += os.path.getsize(caminho)
+            # Na página vai só uma variante por imagem: conta a maior do primeiro formato
+            bytes_gerados += os.path.getsize(os.path.join(diretorio_dist, entrada['variantes'][formatos[0]][-1]['arquivo']))
+            manifesto[relativo] = entrada
+            print(f"  {relativo}: {len(entrada['variantes'][formatos[0]])} larguras x {len(formatos)} formatos")
+        elif extensao in EXTENSOES_TEXTO:
+            manifesto[relativo] = processar_texto(caminho, relativo, diretorio_dist)
+            print(f"  {relativo}: {manifesto[relativo]['arquivo']}")
+
+    with open(os.path.join(diretorio_dist, NOME_MANIFESTO), 'w', encoding='utf-8') as arquivo:
+        json.dump({'formatos': formatos, 'arquivos': manifesto}, arquivo, ensure_ascii=False, indent=1, sort_keys=True)
+
+    return manifesto, bytes_originais, bytes_gerados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--static', default=DIRETORIO_STATIC, help="Diretório static/ de origem.")
+    parser.add_argument('--larguras', type=int, nargs='+', default=list(LARGURAS_PADRAO))
+    parser.add_argument('--qualidade', type=int, default=80, help="Qualidade WebP/AVIF (0-100).")
+    parser.add_argument('--formatos', nargs='+', choices=['avif', 'webp'], default=None,
+                        help="Padrão: avif e webp se o Pillow suportar AVIF, senão só webp.")
+    args = parser.parse_args(argv)
+
+    manifesto, originais, gerados = construir(args.static, args.larguras, args.qualidade, args.formatos)
+    print(f"{len(manifesto)} arquivos no manifesto.")
+    if originais:
+        print(f"Imagens: {originais / 1024:.0f} KB originais -> {gerados / 1024:.0f} KB "
+              f"(maior variante de cada uma, {100 * gerados / originais:.1f}%)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
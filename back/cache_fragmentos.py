@@ -0,0 +1,91 @@
+"""
+Cache de fragmentos renderizados dos templates.
+
+Registra a tag Jinja `{% cache 'nome', parte1, parte2 %} ... {% endcache %}`:
+o trecho entre as tags é renderizado uma vez por chave ('nome', parte1, ...)
+e reaproveitado nas próximas requisições. Use só em trechos que dependem
+apenas das partes da chave (ex.: a lista de questões de um módulo depende de
+curso, nível, ordem e versão do conteúdo; nunca de dados do aluno).
+"""
+import threading
+from collections import OrderedDict
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+
+class CacheFragmentos:
+    """Cache LRU de HTML renderizado, com invalidação por prefixo da chave."""
+
+    def __init__(self, max_entradas=1000):
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self._metricas = {'hits': 0, 'misses': 0, 'invalidacoes': 0}
+
+    def obter_ou_renderizar(self, chave, renderizar):
+        with self._lock:
+            html = self._entradas.get(chave)
+            if html is not None:
+                self._entradas.move_to_end(chave)
+                self._metricas['hits'] += 1
+                return html
+
+        html = Markup(renderizar())
+        with self._lock:
+            self._metricas['misses'] += 1
+            self._entradas[chave] = html
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+        return html
+
+    def invalidar(self, *prefixo):
+        """
+        Remove as entradas cuja chave começa com `prefixo`
+        (ex.: invalidar('modulo_atividades', 'ingles')); sem argumentos limpa tudo.
+        """
+        with self._lock:
+            if not prefixo:
+                removidas = len(self._entradas)
+                self._entradas.clear()
+            else:
+                tamanho = len(prefixo)
+                chaves = [chave for chave in self._entradas if chave[:tamanho] == prefixo]
+                for chave in chaves:
+                    del self._entradas[chave]
+                removidas = len(chaves)
+            self._metricas['invalidacoes'] += removidas
+        return removidas
+
+    def estatisticas(self):
+        with self._lock:
+            metricas = dict(self._metricas)
+            metricas['entradas'] = len(self._entradas)
+        return metricas
+
+
+class ExtensaoCacheFragmentos(Extension):
+    """Tag `{% cache ... %}` ligada ao CacheFragmentos em environment.cache_fragmentos."""
+
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(cache_fragmentos=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        partes = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            partes.append(parser.parse_expression())
+        corpo = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method('_renderizar', [nodes.List(partes)]), [], [], corpo
+        ).set_lineno(lineno)
+
+    def _renderizar(self, partes, caller):
+        cache = self.environment.cache_fragmentos
+        if cache is None:
+            return caller()
+        return cache.obter_ou_renderizar(tuple(partes), caller)
@@ -0,0 +1,216 @@
+"""
+Cache de respostas frequentes (FAQ) do Professor Dinossauro.
+
+Alunos do mesmo curso e nível fazem as mesmas perguntas ("O que é o verbo to
+be?", "oi professor, o que é o verb to be??"). A pergunta é normalizada
+(unidecode, minúsculas, sem pontuação e sem saudações) e a resposta do Gemini fica
+guardada por (curso, nível, pergunta normalizada). Só a pergunta normalizada
+igual recebe a resposta: a ordem e a repetição das palavras são mantidas, porque
+"present perfect e past perfect" e "present perfect e past simple" (ou "much e
+many" e "many e much") são perguntas diferentes para um tutor de idiomas.
+
+A busca por similaridade (limiar_similaridade, desligada por padrão) só tolera
+erros de digitação: a pergunta precisa ter as mesmas palavras, na mesma ordem,
+e cada palavra diferente precisa ser parecida com a guardada (trigramas de
+caracteres, Jaccard).
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from unidecode import unidecode
+
+PADRAO_TOKEN = re.compile(r'[a-z0-9]+')
+
+# Só saudações e vocativos (já sem acento). Artigos, preposições, pronomes e
+# palavras funcionais do inglês/espanhol ficam: são o assunto das perguntas
+# ("quando usar a ou an?", "por ou para?", "do ou does?")
+PALAVRAS_VAZIAS = frozenset("""
+    oi ola ei opa hello hi hey professor prof dino dinossauro pf pfv please
+""".split())
+# Expressões de cortesia de mais de uma palavra ("por" sozinho é conteúdo)
+EXPRESSOES_VAZIAS = (('por', 'favor'),)
+
+# Perguntas com menos palavras que isso dependem do contexto ("e esse?", "e aí?")
+# e não são guardadas nem agrupadas
+MINIMO_TOKENS = 3
+
+# Grafias equivalentes que viram um único token canônico
+SINONIMOS = {
+    'oque': 'que',
+    'oq': 'que',
+    'pq': 'porque',
+    'verbo': 'verb',
+    'verbos': 'verb',
+    'verbs': 'verb',
+}
+
+
+def normalizar_pergunta(texto):
+    """Tokens canônicos da pergunta, na ordem original (repetições mantidas), sem saudações."""
+    tokens = []
+    for token in PADRAO_TOKEN.findall(unidecode(texto).lower()):
+        token = SINONIMOS.get(token, token)
+        if token in PALAVRAS_VAZIAS:
+            continue
+        tokens.append(token)
+        for expressao in EXPRESSOES_VAZIAS:
+            if tuple(tokens[-len(expressao):]) == expressao:
+                del tokens[-len(expressao):]
+    return tokens
+
+
+def trigramas(texto):
+    texto = f"  {texto} "
+    return frozenset(texto[i:i + 3] for i in range(len(texto) - 2))
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class _EntradaFaq:
+    __slots__ = ('resposta', 'criado_em', 'trigramas')
+
+    def __init__(self, resposta, criado_em, trigramas_pergunta):
+        self.resposta = resposta
+        self.criado_em = criado_em
+        self.trigramas = trigramas_pergunta
+
+
+class CacheRespostas:
+
+    def __init__(self, max_entradas=2000, ttl_segundos=6 * 3600, limiar_similaridade=None):
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+        # Similaridade de Jaccard mínima de cada palavra diferente para tolerar
+        # erro de digitação (None, o padrão, deixa só a chave exata)
+        self.limiar_similaridade = limiar_similaridade
+
+        self._entradas = OrderedDict()   # (curso, nivel, chave) -> _EntradaFaq
+        self._indice = {}                # (curso, nivel, trigrama) -> set de chaves
+        self._lock = threading.Lock()
+        self._metricas = {
+            'consultas': 0,
+            'hits_exatos': 0,
+            'hits_similares': 0,
+            'misses': 0,
+            'ignoradas': 0,
+            'insercoes': 0,
+            'despejos': 0,
+            'expiradas': 0,
+        }
+
+    def _chave(self, mensagem):
+        tokens = normalizar_pergunta(mensagem)
+        # Perguntas curtas demais ("e esse?", "e aí?") dependem do contexto da conversa
+        if len(tokens) < MINIMO_TOKENS:
+            return None
+        return ' '.join(tokens)
+
+    def obter(self, curso, nivel, mensagem):
+        """Resposta em cache para a pergunta, ou None."""
+        chave = self._chave(mensagem)
+        agora = time.monotonic()
+        with self._lock:
+            self._metricas['consultas'] += 1
+            if chave is None:
+                self._metricas['ignoradas'] += 1
+                return None
+
+            id_entrada = (curso, nivel, chave)
+            entrada = self._entradas.get(id_entrada)
+            if entrada is not None and self._valida(id_entrada, entrada, agora):
+                self._entradas.move_to_end(id_entrada)
+                self._metricas['hits_exatos'] += 1
+                return entrada.resposta
+
+            if self.limiar_similaridade is not None:
+                id_similar = self._buscar_similar(curso, nivel, chave, agora)
+                if id_similar is not None:
+                    self._entradas.move_to_end(id_similar)
+                    self._metricas['hits_similares'] += 1
+                    return self._entradas[id_similar].resposta
+
+            self._metricas['misses'] += 1
+            return None
+
+    def guardar(self, curso, nivel, mensagem, resposta):
+        chave = self._chave(mensagem)
+        if chave is None or not resposta:
+            return
+        id_entrada = (curso, nivel, chave)
+        entrada = _EntradaFaq(resposta, time.monotonic(), trigramas(chave))
+        with self._lock:
+            if id_entrada in self._entradas:
+                self._remover(id_entrada)
+            self._entradas[id_entrada] = entrada
+            for trigrama in entrada.trigramas:
+                self._indice.setdefault((curso, nivel, trigrama), set()).add(id_entrada)
+            self._metricas['insercoes'] += 1
+            while len(self._entradas) > self.max_entradas:
+                self._remover(next(iter(self._entradas)))
+                self._metricas['despejos'] += 1
+
+    def _valida(self, id_entrada, entrada, agora):
+        if agora - entrada.criado_em <= self.ttl_segundos:
+            return True
+        self._remover(id_entrada)
+        self._metricas['expiradas'] += 1
+        return False
+
+    def _buscar_similar(self, curso, nivel, chave, agora):
+        trigramas_pergunta = trigramas(chave)
+        # Conta trigramas em comum usando o índice invertido (só candidatas do mesmo curso/nível)
+        em_comum = {}
+        for trigrama in trigramas_pergunta:
+            for id_entrada in self._indice.get((curso, nivel, trigrama), ()):
+                em_comum[id_entrada] = em_comum.get(id_entrada, 0) + 1
+
+        melhor_id, melhor_similaridade = None, 0.0
+        for id_entrada, comuns in em_comum.items():
+            entrada = self._entradas[id_entrada]
+            similaridade = comuns / (len(trigramas_pergunta) + len(entrada.trigramas) - comuns)
+            if similaridade > melhor_similaridade and self._mesma_sequencia(chave, id_entrada[2]):
+                melhor_id, melhor_similaridade = id_entrada, similaridade
+
+        if melhor_id is None:
+            return None
+        if not self._valida(melhor_id, self._entradas[melhor_id], agora):
+            return None
+        return melhor_id
+
+    def _mesma_sequencia(self, chave, chave_guardada):
+        # Mesmas palavras na mesma ordem; as diferentes só podem ser erro de digitação
+        tokens, guardados = chave.split(), chave_guardada.split()
+        if len(tokens) != len(guardados):
+            return False
+        return all(token == guardado or jaccard(trigramas(token), trigramas(guardado)) >= self.limiar_similaridade
+                   for token, guardado in zip(tokens, guardados))
+
+    def _remover(self, id_entrada):
+        entrada = self._entradas.pop(id_entrada, None)
+        if entrada is None:
+            return
+        curso, nivel, _ = id_entrada
+        for trigrama in entrada.trigramas:
+            chaves = self._indice.get((curso, nivel, trigrama))
+            if chaves is not None:
+                chaves.discard(id_entrada)
+                if not chaves:
+                    del self._indice[(curso, nivel, trigrama)]
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._indice.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            metricas = dict(self._metricas)
+            metricas['entradas'] = len(self._entradas)
+        respondidas = metricas['hits_exatos'] + metricas['hits_similares']
+        elegiveis = respondidas + metricas['misses']
+        metricas['taxa_acerto'] = round(respondidas / elegiveis, 4) if elegiveis else 0.0
+        return metricas
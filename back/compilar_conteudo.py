@@ -0,0 +1,115 @@
+"""
+Compilador do conteúdo dos módulos (static/json_content) para um pacote único.
+
+Valida cada {curso}/{nivel}/modulo_N.json (campos obrigatórios, alternativas,
+toda atividade com entrada em respostas_corretas e vice-versa), a estrutura
+das pastas (nível conhecido, ordens 1..N sem buracos, sem duas pastas que
+viram a mesma chave, como 'avançado' e 'avancado') e, se tudo estiver certo,
+grava o pacote que o CatalogoConteudo lê em uma única leitura na inicialização.
+Com qualquer erro o pacote não é gerado e o comando sai com código 1.
+
+Uso:
+    python compilar_conteudo.py                # valida e gera conteudo.pack
+    python compilar_conteudo.py --verificar    # só valida
+    python compilar_conteudo.py --saida /tmp/conteudo.pack
+"""
+import argparse
+import json
+import os
+import sys
+from collections import defaultdict
+
+from conteudo import (
+    NIVEIS_VALIDOS, caminho_padrao_pacote, gerar_pacote, ler_pacote, listar_arquivos_modulos,
+    normalizar_slug, validar_modulo,
+)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DIRETORIO_CONTEUDO = os.path.join(BASE_DIR, '..', 'static', 'json_content')
+
+
+def compilar(diretorio_conteudo):
+    """Retorna (modulos, erros, avisos); `modulos` só deve ser usado se não houver erros."""
+    modulos = []
+    erros = []
+    avisos = []
+    origens = {}
+    ordens = defaultdict(list)
+
+    for caminho, (curso, nivel, ordem) in listar_arquivos_modulos(diretorio_conteudo):
+        relativo = os.path.relpath(caminho, diretorio_conteudo).replace(os.sep, '/')
+        nome_curso, nome_nivel = relativo.split('/')[:2]
+
+        if nivel not in NIVEIS_VALIDOS:
+            erros.append(f"{relativo}: nível '{nome_nivel}' desconhecido (use {', '.join(NIVEIS_VALIDOS)})")
+        for pasta in (nome_curso, f"{nome_curso}/{nome_nivel}"):
+            nome = pasta.rsplit('/', 1)[-1]
+            aviso = f"pasta '{pasta}' fora do padrão (renomeie para '{normalizar_slug(nome)}')"
+            if nome != normalizar_slug(nome) and aviso not in avisos:
+                avisos.append(aviso)
+
+        chave = (curso, nivel, ordem)
+        if chave in origens:
+            erros.append(f"{relativo}: mesma chave {chave} que {origens[chave]}")
+            continue
+        origens[chave] = relativo
+
+        try:
+            with open(caminho, 'r', encoding='utf-8') as f:
+                conteudo = json.load(f)
+        except (OSError, UnicodeDecodeError, json.JSONDecodeError) as erro:
+            erros.append(f"{relativo}: não foi possível ler o JSON ({erro})")
+            continue
+
+        problemas = validar_modulo(conteudo)
+        erros.extend(f"{relativo}: {problema}" for problema in problemas)
+        if not problemas:
+            modulos.append({'curso': curso, 'nivel': nivel, 'ordem': ordem, 'origem': relativo, 'conteudo': conteudo})
+        ordens[(curso, nivel)].append(ordem)
+
+    for (curso, nivel), lista in sorted(ordens.items()):
+        esperadas = list(range(1, len(lista) + 1))
+        if sorted(lista) != esperadas:
+            erros.append(f"{curso}/{nivel}: ordens {sorted(lista)} (esperado {esperadas})")
+
+    if not origens:
+        erros.append(f"nenhum módulo encontrado em {diretorio_conteudo}")
+    return modulos, erros, avisos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--conteudo', default=DIRETORIO_CONTEUDO, help="Diretório json_content de origem.")
+    parser.add_argument('--saida', default=caminho_padrao_pacote(BASE_DIR), help="Arquivo do pacote gerado.")
+    parser.add_argument('--verificar', action='store_true', help="Só valida, sem gerar o pacote.")
+    args = parser.parse_args(argv)
+
+    modulos, erros, avisos = compilar(os.path.abspath(args.conteudo))
+    for aviso in avisos:
+        print(f"AVISO: {aviso}")
+    for erro in erros:
+        print(f"ERRO: {erro}", file=sys.stderr)
+    if erros:
+        print(f"{len(erros)} erro(s); pacote não gerado.", file=sys.stderr)
+        return 1
+
+    print(f"{len(modulos)} módulos válidos.")
+    if args.verificar:
+        return 0
+
+    dados = gerar_pacote(modulos)
+    # Confere o que foi gerado antes de trocar o pacote em uso
+    ler_pacote(dados)
+    temporario = args.saida + '.tmp'
+    with open(temporario, 'wb') as f:
+        f.write(dados)
+    os.replace(temporario, args.saida)
+
+    tamanho_json = sum(os.path.getsize(os.path.join(args.conteudo, m['origem'])) for m in modulos)
+    print(f"Pacote gravado em {args.saida}: {len(dados) / 1024:.1f} KB "
+          f"(JSONs somam {tamanho_json / 1024:.1f} KB)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,303 @@
+"""
+Catálogo em memória do conteúdo dos módulos (static/json_content).
+
+Os arquivos JSON são lidos uma única vez na inicialização e indexados por
+(curso, nivel, ordem). Um arquivo só é relido quando o seu mtime muda, então
+editar o conteúdo com o servidor no ar continua funcionando.
+
+Em produção o catálogo pode vir do pacote gerado por compilar_conteudo.py:
+um único arquivo, já validado, lido de uma vez na inicialização.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import zlib
+
+from unidecode import unidecode
+
+from avaliacao import compilar_gabarito
+
+logger = logging.getLogger(__name__)
+
+PADRAO_ARQUIVO_MODULO = re.compile(r'^modulo_(\d+)\.json$')
+
+# Formato do pacote: MAGICO + versão (1 byte) + sha256 do corpo + corpo (JSON compacto em zlib)
+MAGICO_PACOTE = b'LVUPCONT'
+VERSAO_PACOTE = 1
+NIVEIS_VALIDOS = ('basico', 'intermediario', 'avancado')
+PADRAO_ALTERNATIVA = re.compile(r'^[A-Za-z]$')
+
+
+class ErroPacoteConteudo(ValueError):
+    """Pacote de conteúdo ausente de cabeçalho, corrompido ou de outra versão."""
+
+
+def normalizar_slug(texto):
+    """
+    Forma canônica usada como chave do catálogo.
+    'Inglês' -> 'ingles', 'Avançado' -> 'avancado', 'avancado' -> 'avancado'.
+    """
+    return unidecode(str(texto)).strip().lower().replace(' ', '_')
+
+
+def validar_modulo(conteudo):
+    """Lista de problemas do conteúdo de um módulo (vazia se estiver válido)."""
+    if not isinstance(conteudo, dict):
+        return ["o módulo deve ser um objeto JSON"]
+
+    erros = []
+    if not isinstance(conteudo.get('titulo'), str) or not conteudo['titulo'].strip():
+        erros.append("'titulo' ausente ou vazio")
+    for campo in ('video_path', 'video_url', 'descricao'):
+        if campo in conteudo and conteudo[campo] is not None and not isinstance(conteudo[campo], str):
+            erros.append(f"'{campo}' deve ser texto")
+
+    atividades = conteudo.get('atividades')
+    respostas = conteudo.get('respostas_corretas')
+    if not isinstance(atividades, list) or not atividades:
+        erros.append("'atividades' deve ser uma lista não vazia")
+        atividades = []
+    if not isinstance(respostas, dict):
+        erros.append("'respostas_corretas' deve ser um objeto {id: alternativa}")
+        respostas = {}
+
+    ids = set()
+    for posicao, atividade in enumerate(atividades, start=1):
+        if not isinstance(atividade, dict):
+            erros.append(f"atividade {posicao}: deve ser um objeto")
+            continue
+        id_atividade = atividade.get('id')
+        rotulo = f"atividade {posicao} ({id_atividade})"
+        if not isinstance(id_atividade, str) or not id_atividade:
+            erros.append(f"atividade {posicao}: 'id' ausente")
+            continue
+        if id_atividade in ids:
+            erros.append(f"{rotulo}: id repetido")
+        ids.add(id_atividade)
+        if not isinstance(atividade.get('pergunta'), str) or not atividade['pergunta'].strip():
+            erros.append(f"{rotulo}: 'pergunta' ausente ou vazia")
+
+        opcoes = atividade.get('opcoes')
+        if not isinstance(opcoes, dict) or len(opcoes) < 2:
+            erros.append(f"{rotulo}: 'opcoes' deve ter pelo menos 2 alternativas")
+            opcoes = {}
+        for alternativa, texto in opcoes.items():
+            if not PADRAO_ALTERNATIVA.match(alternativa):
+                erros.append(f"{rotulo}: alternativa '{alternativa}' deve ser uma letra")
+            if not isinstance(texto, str) or not texto.strip():
+                erros.append(f"{rotulo}: alternativa '{alternativa}' sem texto")
+
+        if id_atividade not in respostas:
+            erros.append(f"{rotulo}: sem entrada em 'respostas_corretas'")
+        elif str(respostas[id_atividade]).upper() not in {a.upper() for a in opcoes}:
+            erros.append(f"{rotulo}: resposta correta '{respostas[id_atividade]}' não está nas opções")
+
+    for id_resposta in respostas:
+        if id_resposta not in ids:
+            erros.append(f"'respostas_corretas' tem o id '{id_resposta}', que não existe em 'atividades'")
+    return erros
+
+
+def versao_conteudo(conteudo):
+    """Versão estável (inteiro) derivada do conteúdo: muda sempre que ele muda."""
+    compacto = json.dumps(conteudo, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return int.from_bytes(hashlib.sha256(compacto.encode('utf-8')).digest()[:8], 'big')
+
+
+def gerar_pacote(modulos):
+    """
+    Serializa [{'curso', 'nivel', 'ordem', 'origem', 'conteudo'}, ...] no formato
+    do pacote (bytes). Os módulos já devem estar validados.
+    """
+    corpo = zlib.compress(json.dumps(
+        {'modulos': modulos}, ensure_ascii=False, sort_keys=True, separators=(',', ':')
+    ).encode('utf-8'), 9)
+    return MAGICO_PACOTE + bytes([VERSAO_PACOTE]) + hashlib.sha256(corpo).digest() + corpo
+
+
+def ler_pacote(dados):
+    """Inverso de gerar_pacote; levanta ErroPacoteConteudo se os bytes não conferirem."""
+    tamanho_cabecalho = len(MAGICO_PACOTE) + 1 + 32
+    if len(dados) < tamanho_cabecalho or not dados.startswith(MAGICO_PACOTE):
+        raise ErroPacoteConteudo("arquivo não é um pacote de conteúdo")
+    versao = dados[len(MAGICO_PACOTE)]
+    if versao != VERSAO_PACOTE:
+        raise ErroPacoteConteudo(f"versão do pacote {versao} (esperada {VERSAO_PACOTE})")
+    resumo = dados[len(MAGICO_PACOTE) + 1:tamanho_cabecalho]
+    corpo = dados[tamanho_cabecalho:]
+    if hashlib.sha256(corpo).digest() != resumo:
+        raise ErroPacoteConteudo("checksum não confere (pacote corrompido)")
+    try:
+        return json.loads(zlib.decompress(corpo).decode('utf-8'))['modulos']
+    except (zlib.error, UnicodeDecodeError, json.JSONDecodeError, KeyError) as erro:
+        raise ErroPacoteConteudo(f"corpo inválido: {erro}") from erro
+
+
+def listar_arquivos_modulos(diretorio_base):
+    """Gera (caminho, (curso, nivel, ordem)) para cada {curso}/{nivel}/modulo_N.json."""
+    if not os.path.isdir(diretorio_base):
+        logger.error("Diretório de conteúdo não encontrado: %s", diretorio_base)
+        return
+
+    for nome_curso in sorted(os.listdir(diretorio_base)):
+        dir_curso = os.path.join(diretorio_base, nome_curso)
+        if not os.path.isdir(dir_curso):
+            continue
+        for nome_nivel in sorted(os.listdir(dir_curso)):
+            dir_nivel = os.path.join(dir_curso, nome_nivel)
+            if not os.path.isdir(dir_nivel):
+                continue
+            for nome_arquivo in sorted(os.listdir(dir_nivel)):
+                match = PADRAO_ARQUIVO_MODULO.match(nome_arquivo)
+                if not match:
+                    continue
+                chave = (normalizar_slug(nome_curso), normalizar_slug(nome_nivel), int(match.group(1)))
+                yield os.path.join(dir_nivel, nome_arquivo), chave
+
+
+class CatalogoConteudo:
+    """Índice (curso, nivel, ordem) -> conteúdo do módulo já parseado."""
+
+    def __init__(self, diretorio_base, caminho_pacote=None):
+        self.diretorio_base = os.path.abspath(diretorio_base)
+        # Pacote compilado (compilar_conteudo.py); se existir, substitui a varredura dos JSONs
+        self.caminho_pacote = caminho_pacote
+        self.origem = None
+        self._modulos = {}
+        self._lock = threading.Lock()
+
+    def carregar(self):
+        """Carrega o pacote compilado, se houver; senão varre os JSONs do diretório base."""
+        if self.caminho_pacote and os.path.isfile(self.caminho_pacote):
+            try:
+                return self.carregar_pacote(self.caminho_pacote)
+            except (OSError, ErroPacoteConteudo) as erro:
+                logger.error("Pacote de conteúdo inválido (%s): %s. Usando os JSONs.", self.caminho_pacote, erro)
+        return self.carregar_diretorio()
+
+    def carregar_pacote(self, caminho):
+        """Lê o pacote inteiro em uma única leitura e substitui o catálogo."""
+        with open(caminho, 'rb') as f:
+            modulos = ler_pacote(f.read())
+
+        novos = {}
+        for modulo in modulos:
+            chave = (normalizar_slug(modulo['curso']), normalizar_slug(modulo['nivel']), int(modulo['ordem']))
+            novos[chave] = {
+                # Sem caminho: entradas do pacote não são relidas do disco
+                'caminho': None,
+                'mtime': versao_conteudo(modulo['conteudo']),
+                'conteudo': modulo['conteudo'],
+                'gabarito': compilar_gabarito(modulo['conteudo']),
+            }
+        with self._lock:
+            self._modulos = novos
+        self.origem = caminho
+        logger.info("Catálogo de conteúdo carregado do pacote %s: %d módulos.", caminho, len(novos))
+        self._avisar_se_desatualizado(caminho)
+        return len(novos)
+
+    def _avisar_se_desatualizado(self, caminho):
+        try:
+            mtime_pacote = os.stat(caminho).st_mtime_ns
+            mais_recente = max((os.stat(c).st_mtime_ns for c, _ in self._varrer_arquivos()), default=0)
+        except OSError:
+            return
+        if mais_recente > mtime_pacote:
+            logger.warning("Há JSONs de conteúdo mais novos que %s; rode compilar_conteudo.py.", caminho)
+
+    def carregar_diretorio(self):
+        """Varre o diretório base e (re)carrega todos os módulos encontrados."""
+        novos = {}
+        for caminho, chave in self._varrer_arquivos():
+            entrada = self._ler_arquivo(caminho)
+            if entrada is not None:
+                novos[chave] = entrada
+        with self._lock:
+            self._modulos = novos
+        self.origem = self.diretorio_base
+        logger.info("Catálogo de conteúdo carregado: %d módulos.", len(novos))
+        return len(novos)
+
+    def obter_modulo(self, curso, nivel, ordem):
+        """Retorna o conteúdo do módulo ou None se ele não existir/for inválido."""
+        entrada = self._obter_entrada(curso, nivel, ordem)
+        return entrada['conteudo'] if entrada else None
+
+    def obter_gabarito(self, curso, nivel, ordem):
+        """Retorna o GabaritoCompilado do módulo ou None."""
+        entrada = self._obter_entrada(curso, nivel, ordem)
+        return entrada['gabarito'] if entrada else None
+
+    def versao(self, curso, nivel, ordem):
+        """
+        Versão do módulo em uso (mtime em ns do JSON, ou hash do conteúdo quando
+        vem do pacote), ou None; muda sempre que o conteúdo muda.
+        """
+        entrada = self._obter_entrada(curso, nivel, ordem)
+        return entrada['mtime'] if entrada else None
+
+    def _obter_entrada(self, curso, nivel, ordem):
+        chave = (normalizar_slug(curso), normalizar_slug(nivel), int(ordem))
+        entrada = self._modulos.get(chave)
+        if entrada is None or entrada['caminho'] is None:
+            return entrada
+
+        try:
+            mtime = os.stat(entrada['caminho']).st_mtime_ns
+        except OSError:
+            logger.error("Arquivo de conteúdo removido: %s", entrada['caminho'])
+            with self._lock:
+                self._modulos.pop(chave, None)
+            return None
+
+        if mtime != entrada['mtime']:
+            nova_entrada = self._ler_arquivo(entrada['caminho'])
+            if nova_entrada is not None:
+                with self._lock:
+                    self._modulos[chave] = nova_entrada
+                entrada = nova_entrada
+            # Se o JSON novo estiver mal formatado ou inválido, continua servindo a versão anterior.
+
+        return entrada
+
+    def existe(self, curso, nivel, ordem):
+        chave = (normalizar_slug(curso), normalizar_slug(nivel), int(ordem))
+        return chave in self._modulos
+
+    def chaves(self):
+        return sorted(self._modulos)
+
+    def _varrer_arquivos(self):
+        return listar_arquivos_modulos(self.diretorio_base)
+
+    def _ler_arquivo(self, caminho):
+        try:
+            mtime = os.stat(caminho).st_mtime_ns
+            with open(caminho, 'r', encoding='utf-8') as f:
+                conteudo = json.load(f)
+        except FileNotFoundError:
+            logger.error("Arquivo não encontrado no caminho: %s", caminho)
+            return None
+        except json.JSONDecodeError:
+            logger.error("JSON mal formatado em: %s", caminho)
+            return None
+        erros = validar_modulo(conteudo)
+        if erros:
+            # Conteúdo inválido não é compilado: o módulo fica como não encontrado
+            for erro in erros:
+                logger.error("Conteúdo inválido em %s: %s", caminho, erro)
+            return None
+        return {
+            'caminho': caminho,
+            'mtime': mtime,
+            'conteudo': conteudo,
+            'gabarito': compilar_gabarito(conteudo),
+        }
+
+
+def caminho_padrao_pacote(base_dir):
+    return os.getenv('CONTEUDO_PACOTE', os.path.join(base_dir, 'conteudo.pack'))
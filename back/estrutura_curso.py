@@ -0,0 +1,101 @@
+"""
+Estrutura dos cursos (tabela `modulo`) mantida em memória.
+
+A tabela `modulo` é dado de referência (populada pelo scriptbd.sql), então ela
+é lida uma única vez e as perguntas de navegação — módulo anterior, próximo,
+primeiro/último do nível — são respondidas por dicionários, sem ir ao banco.
+Depois de alterar a tabela, chame invalidar() para forçar a releitura.
+"""
+import logging
+import threading
+
+from conteudo import normalizar_slug
+
+logger = logging.getLogger(__name__)
+
+SQL_MODULOS = "SELECT modulo_id, nome, ordem, nivel, curso_acesso FROM modulo"
+
+
+class EstruturaCurso:
+    """Grafo curso -> nível -> módulos, carregado sob demanda a partir do banco."""
+
+    def __init__(self, carregador):
+        # carregador: função sem argumentos que devolve as linhas de SQL_MODULOS
+        self._carregador = carregador
+        self._lock = threading.Lock()
+        self._dados = None
+
+    def carregar(self):
+        """Lê a tabela `modulo` e monta os índices."""
+        linhas = self._carregador()
+        por_chave = {}
+        por_nivel = {}
+        por_id = {}
+        total_por_curso = {}
+
+        for linha in linhas:
+            modulo = dict(linha)
+            curso = normalizar_slug(modulo['curso_acesso'])
+            nivel = normalizar_slug(modulo['nivel'])
+            por_chave[(curso, nivel, modulo['ordem'])] = modulo
+            por_nivel.setdefault((curso, nivel), []).append(modulo)
+            por_id[modulo['modulo_id']] = modulo
+            total_por_curso[curso] = total_por_curso.get(curso, 0) + 1
+
+        for modulos in por_nivel.values():
+            modulos.sort(key=lambda m: m['ordem'])
+
+        dados = {
+            'por_chave': por_chave,
+            'por_nivel': {chave: tuple(modulos) for chave, modulos in por_nivel.items()},
+            'por_id': por_id,
+            'total_por_curso': total_por_curso,
+        }
+        with self._lock:
+            self._dados = dados
+        logger.info("Estrutura dos cursos carregada: %d módulos.", len(por_id))
+        return dados
+
+    def invalidar(self):
+        """Descarta a estrutura; a próxima consulta relê a tabela `modulo`."""
+        with self._lock:
+            self._dados = None
+
+    def _obter_dados(self):
+        dados = self._dados
+        if dados is None:
+            dados = self.carregar()
+        return dados
+
+    # -----------------------------------------------------------------
+    # Consultas
+    # -----------------------------------------------------------------
+    def modulo(self, curso, nivel, ordem):
+        """Linha do módulo (modulo_id, nome, ordem, nivel, curso_acesso) ou None."""
+        chave = (normalizar_slug(curso), normalizar_slug(nivel), int(ordem))
+        return self._obter_dados()['por_chave'].get(chave)
+
+    def modulo_por_id(self, modulo_id):
+        return self._obter_dados()['por_id'].get(modulo_id)
+
+    def anterior(self, curso, nivel, ordem):
+        return self.modulo(curso, nivel, int(ordem) - 1)
+
+    def proximo(self, curso, nivel, ordem):
+        return self.modulo(curso, nivel, int(ordem) + 1)
+
+    def modulos_do_nivel(self, curso, nivel):
+        """Módulos do nível em ordem crescente (tupla vazia se o nível não existir)."""
+        chave = (normalizar_slug(curso), normalizar_slug(nivel))
+        return self._obter_dados()['por_nivel'].get(chave, ())
+
+    def primeiro_do_nivel(self, curso, nivel):
+        modulos = self.modulos_do_nivel(curso, nivel)
+        return modulos[0] if modulos else None
+
+    def ultimo_do_nivel(self, curso, nivel):
+        modulos = self.modulos_do_nivel(curso, nivel)
+        return modulos[-1] if modulos else None
+
+    def total_do_curso(self, curso):
+        return self._obter_dados()['total_por_curso'].get(normalizar_slug(curso), 0)
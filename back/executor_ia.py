@@ -0,0 +1,115 @@
+"""
+Executor limitado para as chamadas ao Gemini.
+
+Uma resposta lenta do LLM não pode travar o hub do eventlet nem acumular
+chamadas sem limite. Este executor:
+  - limita quantas chamadas rodam ao mesmo tempo (concorrencia);
+  - limita quantas podem ficar esperando vaga (max_fila) e rejeita o excedente
+    com ErroSobrecarga, para o handler responder com um evento 'erro';
+  - aplica um tempo máximo por chamada (timeout), contando a espera na fila;
+  - opcionalmente roda a chamada no pool de threads nativas do eventlet
+    (tpool), para clientes que fazem I/O bloqueante fora do monkey_patch.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+import eventlet
+from eventlet import tpool
+
+
+class ErroSobrecarga(RuntimeError):
+    """A fila de chamadas ao LLM está cheia; a requisição foi descartada."""
+
+
+class ErroTempoEsgotado(RuntimeError):
+    """A chamada ao LLM (incluindo a espera na fila) passou do tempo limite."""
+
+
+class ExecutorIA:
+
+    def __init__(self, concorrencia=8, max_fila=32, timeout=30.0, usar_tpool=False):
+        self.concorrencia = concorrencia
+        self.max_fila = max_fila
+        self.timeout = timeout
+        self.usar_tpool = usar_tpool
+
+        self._vagas = threading.BoundedSemaphore(concorrencia)
+        self._lock = threading.Lock()
+        self._pendentes = 0
+        self._metricas = {
+            'executadas': 0,
+            'rejeitadas': 0,
+            'tempo_esgotado': 0,
+            'falhas': 0,
+            'em_execucao': 0,
+        }
+
+    @contextmanager
+    def reservar(self):
+        """
+        Reserva uma vaga respeitando fila, concorrência e tempo limite.
+        Tudo o que rodar dentro do bloco conta para o timeout da chamada.
+        """
+        with self._lock:
+            if self._pendentes >= self.concorrencia + self.max_fila:
+                self._metricas['rejeitadas'] += 1
+                raise ErroSobrecarga("Fila de chamadas ao LLM cheia.")
+            self._pendentes += 1
+
+        inicio = time.monotonic()
+        try:
+            if not self._vagas.acquire(timeout=self.timeout):
+                self._contar('tempo_esgotado')
+                raise ErroTempoEsgotado("Tempo esgotado esperando vaga para chamar o LLM.")
+            try:
+                restante = max(self.timeout - (time.monotonic() - inicio), 0.1)
+                with self._lock:
+                    self._metricas['em_execucao'] += 1
+                try:
+                    with eventlet.Timeout(restante, ErroTempoEsgotado("Tempo esgotado na chamada ao LLM.")):
+                        yield
+                except ErroTempoEsgotado:
+                    self._contar('tempo_esgotado')
+                    raise
+                except Exception:
+                    self._contar('falhas')
+                    raise
+                finally:
+                    with self._lock:
+                        self._metricas['em_execucao'] -= 1
+                self._contar('executadas')
+            finally:
+                self._vagas.release()
+        finally:
+            with self._lock:
+                self._pendentes -= 1
+
+    def executar(self, funcao, *args, **kwargs):
+        """Executa funcao(*args, **kwargs) respeitando os limites do executor."""
+        with self.reservar():
+            if self.usar_tpool:
+                return tpool.execute(funcao, *args, **kwargs)
+            return funcao(*args, **kwargs)
+
+    def iterar(self, iteravel):
+        """
+        Envolve um iterador bloqueante (ex.: resposta em streaming) para que
+        cada next() rode no tpool quando usar_tpool estiver ativo.
+        Deve ser consumido dentro de reservar().
+        """
+        if self.usar_tpool:
+            return tpool.Proxy(iter(iteravel))
+        return iter(iteravel)
+
+    def _contar(self, nome):
+        with self._lock:
+            self._metricas[nome] += 1
+
+    def estatisticas(self):
+        with self._lock:
+            metricas = dict(self._metricas)
+            metricas['pendentes'] = self._pendentes
+        metricas['concorrencia'] = self.concorrencia
+        metricas['max_fila'] = self.max_fila
+        return metricas
@@ -0,0 +1,171 @@
+"""
+Cliente Gemini falso, para desenvolvimento e testes de carga sem rede.
+
+Imita a parte do google.genai.Client usada pelo app (client.chats.create,
+chat.send_message, chat.send_message_stream e client.caches) e responde
+depois de uma latência configurável, usando time.sleep (que vira cooperativo
+com o eventlet.monkey_patch()).
+
+Ative com GENAI_FAKE=1 no .env. Latência em segundos: GENAI_FAKE_LATENCIA.
+GENAI_FAKE_TAXA_429 (0 a 1) simula erros de cota para exercitar a troca de chaves.
+
+Cache de contexto: caches.create guarda a instrução do sistema no próprio
+cliente (como no Gemini, um cache só vale para a chave que o criou) e recusa
+instruções menores que GENAI_FAKE_CACHE_MIN_TOKENS. Cada chamada soma a
+latência de processar a instrução inline (GENAI_FAKE_LATENCIA_MIL_TOKENS
+segundos por mil tokens); a instrução em cache não custa nada.
+"""
+import os
+import random
+import time
+from itertools import count
+
+from google.genai import errors as genai_errors
+
+
+class RespostaFake:
+    def __init__(self, text):
+        self.text = text
+
+
+class ChatFake:
+
+    def __init__(self, cliente, model, config=None, history=None):
+        self._cliente = cliente
+        self.model = model
+        self.config = config
+        self._historico = list(history or [])
+
+    def send_message(self, message):
+        self._cliente.chamadas += 1
+        self._cliente.talvez_falhar()
+        time.sleep(self._cliente.sortear_latencia() + self._cliente.processar_instrucao(self.config))
+        texto = f"[resposta simulada] Você perguntou: {message}"
+        self._historico.append({'role': 'user', 'text': str(message)})
+        self._historico.append({'role': 'model', 'text': texto})
+        return RespostaFake(texto)
+
+    def send_message_stream(self, message):
+        """Entrega a resposta em trechos: o primeiro após ~30% da latência."""
+        self._cliente.chamadas += 1
+        self._cliente.talvez_falhar()
+        latencia = self._cliente.sortear_latencia() + self._cliente.processar_instrucao(self.config)
+        texto = f"[resposta simulada] Você perguntou: {message}"
+        palavras = texto.split(' ')
+        time.sleep(latencia * 0.3)
+        intervalo = (latencia * 0.7) / max(len(palavras), 1)
+        for indice, palavra in enumerate(palavras):
+            if indice:
+                time.sleep(intervalo)
+            yield RespostaFake(palavra if indice == 0 else ' ' + palavra)
+        self._historico.append({'role': 'user', 'text': str(message)})
+        self._historico.append({'role': 'model', 'text': texto})
+
+    def get_history(self, curated=False):
+        return list(self._historico)
+
+
+class ChatsFake:
+
+    def __init__(self, cliente):
+        self._cliente = cliente
+
+    def create(self, model, config=None, history=None):
+        return ChatFake(self._cliente, model, config=config, history=history)
+
+
+class CacheFake:
+    def __init__(self, name, model, display_name, expire_time, tokens):
+        self.name = name
+        self.model = model
+        self.display_name = display_name
+        self.expire_time = expire_time
+        self.usage_metadata = type('UsoCacheFake', (), {'total_token_count': tokens})()
+
+
+class CachesFake:
+
+    _sequencia = count(1)
+
+    def __init__(self, cliente):
+        self._cliente = cliente
+        self._caches = {}
+
+    def create(self, model, config=None):
+        instrucao = str(getattr(config, 'system_instruction', None) or '')
+        tokens = max(1, len(instrucao) // 4)
+        if tokens < self._cliente.minimo_tokens_cache:
+            raise genai_errors.ClientError(400, {'error': {
+                'code': 400, 'status': 'INVALID_ARGUMENT',
+                'message': f'Cached content is too small. total_token_count={tokens}, min_total_token_count={self._cliente.minimo_tokens_cache}'}})
+        ttl = float(str(getattr(config, 'ttl', None) or '3600s').rstrip('s'))
+        cache = CacheFake(f"cachedContents/fake-{next(self._sequencia)}", model,
+                          getattr(config, 'display_name', None), time.time() + ttl, tokens)
+        self._caches[cache.name] = (cache, instrucao)
+        self._cliente.caches_criados += 1
+        return cache
+
+    def get(self, name):
+        entrada = self._caches.get(name)
+        if entrada is None or entrada[0].expire_time < time.time():
+            self._caches.pop(name, None)
+            raise genai_errors.ClientError(404, {'error': {'code': 404, 'status': 'NOT_FOUND',
+                                                           'message': f'CachedContent not found: {name}'}})
+        return entrada[0]
+
+    def update(self, name, config=None):
+        cache = self.get(name)
+        ttl = float(str(getattr(config, 'ttl', None) or '3600s').rstrip('s'))
+        cache.expire_time = time.time() + ttl
+        return cache
+
+    def delete(self, name):
+        self._caches.pop(name, None)
+
+
+class ClienteGeminiFake:
+
+    def __init__(self, api_key=None, latencia=None, variacao=0.25, taxa_erro_cota=None,
+                 latencia_mil_tokens=None, minimo_tokens_cache=None):
+        self.api_key = api_key
+        if latencia is None:
+            latencia = float(os.getenv('GENAI_FAKE_LATENCIA', 1.0))
+        if taxa_erro_cota is None:
+            taxa_erro_cota = float(os.getenv('GENAI_FAKE_TAXA_429', 0))
+        self.latencia = latencia
+        self.taxa_erro_cota = taxa_erro_cota
+        if latencia_mil_tokens is None:
+            latencia_mil_tokens = float(os.getenv('GENAI_FAKE_LATENCIA_MIL_TOKENS', 0))
+        if minimo_tokens_cache is None:
+            minimo_tokens_cache = int(os.getenv('GENAI_FAKE_CACHE_MIN_TOKENS', 1024))
+        self.latencia_mil_tokens = latencia_mil_tokens
+        self.minimo_tokens_cache = minimo_tokens_cache
+        # Variação relativa da latência (0.25 = +/-25%)
+        self.variacao = variacao
+        self.chamadas = 0
+        self.caches_criados = 0
+        # Tokens de instrução do sistema: enviados em cada chamada x lidos do cache
+        self.tokens_instrucao_enviados = 0
+        self.tokens_instrucao_cache = 0
+        self.chats = ChatsFake(self)
+        self.caches = CachesFake(self)
+
+    def processar_instrucao(self, config):
+        """Contabiliza a instrução do sistema de uma chamada; retorna a latência extra (s)."""
+        nome_cache = getattr(config, 'cached_content', None)
+        if nome_cache:
+            self.tokens_instrucao_cache += self.caches.get(nome_cache).usage_metadata.total_token_count
+            return 0.0
+        instrucao = str(getattr(config, 'system_instruction', None) or '')
+        tokens = len(instrucao) // 4
+        self.tokens_instrucao_enviados += tokens
+        return self.latencia_mil_tokens * tokens / 1000
+
+    def talvez_falhar(self):
+        if self.taxa_erro_cota and random.random() < self.taxa_erro_cota:
+            raise genai_errors.ClientError(429, {'error': {'code': 429, 'message': 'Cota simulada esgotada.', 'status': 'RESOURCE_EXHAUSTED'}})
+
+    def sortear_latencia(self):
+        if not self.variacao:
+            return self.latencia
+        return max(0.0, self.latencia * random.uniform(1 - self.variacao, 1 + self.variacao))
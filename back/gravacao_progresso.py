@@ -0,0 +1,312 @@
+"""
+Gravação adiada (write-behind) do progresso dos alunos.
+
+No fim de uma aula todos os alunos enviam as atividades ao mesmo tempo, e cada
+envio fazia até três upserts e um commit próprio em `desempenho_modulo`/`aluno`.
+Com o GravadorProgresso o envio só:
+  1. acrescenta as alterações em um diário (JSONL com fsync), que sobrevive a
+     uma queda do processo. A escrita é feita sob o lock; o fsync, fora dele e
+     em grupo: um envio sincroniza o diário por todos que escreveram antes dele
+     e os outros só esperam. Com fsync_tpool o fsync roda no pool de threads
+     nativas do eventlet, sem travar o hub;
+  2. junta as alterações pendentes em memória (o último resultado de cada
+     aluno/módulo vale; desbloqueios repetidos viram um só).
+Uma tarefa de fundo descarrega tudo em lote (upserts de várias linhas e um
+único commit) quando o lote enche ou a cada `intervalo_segundos`.
+
+Leituras feitas antes do descarregamento continuam vendo as alterações: o
+snapshot do ServicoProgresso já é atualizado no envio, e `sobrepor()` aplica
+as pendências às linhas lidas do banco quando o snapshot precisa ser recarregado.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from progresso import STATUS_EM_ANDAMENTO
+
+logger = logging.getLogger(__name__)
+
+SQL_RESULTADO = """
+    INSERT INTO desempenho_modulo (aluno_id, modulo_id, nivel_modulo, status_modulo, nota_final, data_conclusao)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        status_modulo = VALUES(status_modulo),
+        nota_final = VALUES(nota_final),
+        data_conclusao = VALUES(data_conclusao)
+"""
+
+SQL_DESBLOQUEIO = """
+    INSERT INTO desempenho_modulo (aluno_id, modulo_id, status_modulo, nivel_modulo)
+    VALUES (%s, %s, 'Em Andamento', %s)
+    ON DUPLICATE KEY UPDATE aluno_id = aluno_id
+"""
+
+SQL_NIVEL_ALUNO = "UPDATE aluno SET nivel_curso = %s WHERE aluno_id = %s"
+
+SUFIXO_DESCARREGANDO = '.descarregando'
+
+
+class GravadorProgresso:
+
+    def __init__(self, gravar_lote, caminho_diario, max_lote=200, intervalo_segundos=1.0, fsync=True,
+                 fsync_tpool=False):
+        # gravar_lote(resultados, desbloqueios, niveis) grava tudo em uma transação:
+        #   resultados:   [(aluno_id, modulo_id, nivel, status, nota_final, data_conclusao)]
+        #   desbloqueios: [(aluno_id, modulo_id, nivel)]
+        #   niveis:       [(nivel_curso, aluno_id)]
+        self._gravar_lote = gravar_lote
+        self.caminho_diario = caminho_diario
+        self.max_lote = max_lote
+        self.intervalo_segundos = intervalo_segundos
+        self.fsync = fsync
+        self.fsync_tpool = fsync_tpool
+
+        self._lock = threading.Lock()
+        # Um fsync por vez; quem chega depois aproveita o do anterior se ele já cobriu a sua escrita
+        self._lock_fsync = threading.Lock()
+        self._escritos = 0          # escritas no diário (sequência)
+        self._sincronizados = 0     # escritas já cobertas por um fsync
+        # Serializa descarregamentos (tarefa de fundo x fechar())
+        self._lock_descarga = threading.Lock()
+        self._lote_cheio = threading.Event()
+        self._pendentes = self._vazio()
+        # Lote sendo gravado agora: ainda entra em sobrepor() até o commit
+        self._em_voo = self._vazio()
+        self._diario = None
+        self._metricas = {
+            'envios': 0,
+            'alteracoes': 0,
+            'descarregamentos': 0,
+            'linhas_gravadas': 0,
+            'falhas': 0,
+            'recuperadas': 0,
+            'fsyncs': 0,
+            'ultimo_descarregamento_s': 0.0,
+        }
+        self._recuperar()
+        self._diario = open(self.caminho_diario, 'a', encoding='utf-8')
+
+    @staticmethod
+    def _vazio():
+        return {'resultados': {}, 'desbloqueios': {}, 'niveis': {}}
+
+    # -----------------------------------------------------------------
+    # Envio
+    # -----------------------------------------------------------------
+    def registrar_envio(self, aluno_id, resultado=None, desbloqueios=(), nivel_aluno=None):
+        """
+        Registra as alterações de um envio de atividade.
+        resultado = (modulo_id, nivel, status, nota_final); desbloqueios = [(modulo_id, nivel)].
+        Retorna depois que elas estão no diário (em disco).
+        """
+        registro = {
+            'aluno_id': aluno_id,
+            'data': datetime.now().isoformat(timespec='seconds'),
+            'resultado': list(resultado) if resultado else None,
+            'desbloqueios': [list(d) for d in desbloqueios],
+            'nivel_aluno': nivel_aluno,
+        }
+        linha = json.dumps(registro, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._diario.write(linha)
+            self._diario.flush()
+            self._escritos += 1
+            sequencia = self._escritos
+            self._aplicar(registro)
+            self._metricas['envios'] += 1
+            lote_cheio = self._tamanho(self._pendentes) >= self.max_lote
+        if self.fsync:
+            self._sincronizar(sequencia)
+        if lote_cheio:
+            self._lote_cheio.set()
+
+    def _sincronizar(self, sequencia):
+        """Garante o fsync do diário até a escrita `sequencia` (um fsync cobre todas as anteriores)."""
+        with self._lock_fsync:
+            if self._sincronizados >= sequencia:
+                return
+            with self._lock:
+                alvo = self._escritos
+                # Cópia do descritor: o diário pode ser girado durante o fsync
+                descritor = os.dup(self._diario.fileno())
+            try:
+                self._fsync(descritor)
+            finally:
+                os.close(descritor)
+            self._sincronizados = alvo
+            with self._lock:
+                self._metricas['fsyncs'] += 1
+
+    def _fsync(self, descritor):
+        if self.fsync_tpool:
+            from eventlet import tpool
+            tpool.execute(os.fsync, descritor)
+        else:
+            os.fsync(descritor)
+
+    def _aplicar(self, registro):
+        aluno_id = registro['aluno_id']
+        if registro['resultado']:
+            modulo_id, nivel, status, nota_final = registro['resultado']
+            self._pendentes['resultados'][(aluno_id, modulo_id)] = (nivel, status, nota_final, registro['data'])
+        for modulo_id, nivel in registro['desbloqueios']:
+            # Desbloqueio não altera linha existente: vale o primeiro
+            self._pendentes['desbloqueios'].setdefault((aluno_id, modulo_id), nivel)
+        if registro['nivel_aluno']:
+            self._pendentes['niveis'][aluno_id] = registro['nivel_aluno']
+        self._metricas['alteracoes'] += (bool(registro['resultado']) + len(registro['desbloqueios'])
+                                         + bool(registro['nivel_aluno']))
+
+    @staticmethod
+    def _tamanho(alteracoes):
+        return sum(len(grupo) for grupo in alteracoes.values())
+
+    # -----------------------------------------------------------------
+    # Leituras (read-your-writes)
+    # -----------------------------------------------------------------
+    def sobrepor(self, aluno_id, linhas):
+        """Aplica as alterações ainda não gravadas às linhas de SQL_PROGRESSO_ALUNO do aluno."""
+        registros = {linha['modulo_id']: dict(linha) for linha in linhas}
+        with self._lock:
+            camadas = (self._em_voo, self._pendentes)
+            for camada in camadas:
+                for (aluno, modulo_id), nivel in camada['desbloqueios'].items():
+                    if aluno == aluno_id and modulo_id not in registros:
+                        registros[modulo_id] = {
+                            'modulo_id': modulo_id, 'nivel_modulo': nivel,
+                            'status_modulo': STATUS_EM_ANDAMENTO, 'nota_final': None, 'data_conclusao': None,
+                        }
+                for (aluno, modulo_id), (nivel, status, nota_final, data) in camada['resultados'].items():
+                    if aluno == aluno_id:
+                        registro = registros.setdefault(modulo_id, {'modulo_id': modulo_id, 'nivel_modulo': nivel})
+                        registro['status_modulo'] = status
+                        registro['nota_final'] = nota_final
+                        registro['data_conclusao'] = datetime.fromisoformat(data)
+        return list(registros.values())
+
+    def nivel_pendente(self, aluno_id):
+        """Nível do aluno ainda não gravado em `aluno.nivel_curso`, ou None."""
+        with self._lock:
+            return self._pendentes['niveis'].get(aluno_id) or self._em_voo['niveis'].get(aluno_id)
+
+    # -----------------------------------------------------------------
+    # Descarregamento
+    # -----------------------------------------------------------------
+    def descarregar(self):
+        """Grava as pendências em lote; retorna quantas alterações foram gravadas."""
+        with self._lock_descarga:
+            with self._lock:
+                if not self._tamanho(self._pendentes):
+                    return 0
+                self._em_voo, self._pendentes = self._pendentes, self._vazio()
+                self._girar_diario()
+                self._lote_cheio.clear()
+                lote = self._em_voo
+
+            resultados = [
+                (aluno_id, modulo_id, nivel, status, nota_final, datetime.fromisoformat(data))
+                for (aluno_id, modulo_id), (nivel, status, nota_final, data) in lote['resultados'].items()
+            ]
+            desbloqueios = [(aluno_id, modulo_id, nivel) for (aluno_id, modulo_id), nivel in lote['desbloqueios'].items()]
+            niveis = [(nivel, aluno_id) for aluno_id, nivel in lote['niveis'].items()]
+
+            inicio = time.monotonic()
+            try:
+                self._gravar_lote(resultados, desbloqueios, niveis)
+            except Exception:
+                with self._lock:
+                    self._devolver(lote)
+                    self._em_voo = self._vazio()
+                    self._metricas['falhas'] += 1
+                raise
+
+            # Tudo no banco: o diário do lote pode ir embora
+            try:
+                os.remove(self.caminho_diario + SUFIXO_DESCARREGANDO)
+            except FileNotFoundError:
+                pass
+            gravadas = len(resultados) + len(desbloqueios) + len(niveis)
+            with self._lock:
+                self._em_voo = self._vazio()
+                self._metricas['descarregamentos'] += 1
+                self._metricas['linhas_gravadas'] += gravadas
+                self._metricas['ultimo_descarregamento_s'] = round(time.monotonic() - inicio, 4)
+            return gravadas
+
+    def _girar_diario(self):
+        """Separa o diário do lote que vai ser gravado; novos envios vão para um diário vazio."""
+        if self.fsync:
+            # Escritas ainda sem fsync não podem ficar para trás no diário que sai de uso
+            self._fsync(self._diario.fileno())
+        self._diario.close()
+        caminho_lote = self.caminho_diario + SUFIXO_DESCARREGANDO
+        if os.path.exists(caminho_lote):
+            # Sobra de um descarregamento que falhou: o lote atual inclui essas alterações
+            with open(self.caminho_diario, 'r', encoding='utf-8') as origem, \
+                    open(caminho_lote, 'a', encoding='utf-8') as destino:
+                destino.write(origem.read())
+                destino.flush()
+                self._fsync(destino.fileno())
+            self._diario = open(self.caminho_diario, 'w', encoding='utf-8')
+        else:
+            os.replace(self.caminho_diario, caminho_lote)
+            self._diario = open(self.caminho_diario, 'a', encoding='utf-8')
+
+    def _devolver(self, lote):
+        """Junta um lote que falhou de volta às pendências (o que chegou depois prevalece)."""
+        for chave, valor in lote['resultados'].items():
+            self._pendentes['resultados'].setdefault(chave, valor)
+        for chave, nivel in lote['desbloqueios'].items():
+            self._pendentes['desbloqueios'][chave] = nivel
+        for aluno_id, nivel in lote['niveis'].items():
+            self._pendentes['niveis'].setdefault(aluno_id, nivel)
+
+    def _recuperar(self):
+        """Relê os diários deixados por uma execução anterior (ainda não gravados)."""
+        for caminho in (self.caminho_diario + SUFIXO_DESCARREGANDO, self.caminho_diario):
+            if not os.path.exists(caminho):
+                continue
+            with open(caminho, 'r', encoding='utf-8') as f:
+                for numero, linha in enumerate(f, start=1):
+                    if not linha.strip():
+                        continue
+                    try:
+                        registro = json.loads(linha)
+                    except json.JSONDecodeError:
+                        # Normalmente a última linha, cortada por uma queda no meio da escrita
+                        logger.warning("Linha %d ilegível no diário %s; ignorada.", numero, caminho)
+                        continue
+                    self._aplicar(registro)
+                    self._metricas['recuperadas'] += 1
+        if self._metricas['recuperadas']:
+            logger.info("%d envios recuperados do diário de progresso.", self._metricas['recuperadas'])
+
+    def executar(self, dormir=time.sleep):
+        """Laço da tarefa de fundo: descarrega quando o lote enche ou a cada intervalo."""
+        while True:
+            self._lote_cheio.wait(self.intervalo_segundos)
+            try:
+                self.descarregar()
+            except Exception as erro:
+                logger.error("Falha ao gravar lote de progresso (nova tentativa em breve): %s", erro, exc_info=True)
+                dormir(self.intervalo_segundos)
+
+    def fechar(self):
+        """Descarrega o que estiver pendente e fecha o diário."""
+        try:
+            self.descarregar()
+        except Exception as erro:
+            logger.error("Lote de progresso não gravado ao fechar; fica no diário para a próxima execução: %s", erro)
+        finally:
+            with self._lock:
+                self._diario.close()
+
+    def estatisticas(self):
+        with self._lock:
+            metricas = dict(self._metricas)
+            metricas['pendentes'] = self._tamanho(self._pendentes)
+            metricas['em_voo'] = self._tamanho(self._em_voo)
+        return metricas
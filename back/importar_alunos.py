@@ -0,0 +1,221 @@
+"""
+Importação em massa de alunos a partir de um CSV.
+
+Cadastrar uma escola pela rota /cadastro custa, por aluno, um SELECT pelo
+email, um hash de senha e um INSERT com commit próprio. Aqui:
+  - o CSV é lido em fluxo (não precisa caber na memória);
+  - os emails já cadastrados vêm de uma única consulta e ficam em um conjunto,
+    junto com os emails já vistos no próprio arquivo;
+  - as senhas de cada lote são calculadas em paralelo (ServicoSenhas no modo
+    'processos');
+  - cada lote vira um INSERT de várias linhas e um commit.
+Um email cadastrado por outra via durante a importação não derruba o lote:
+o upsert o ignora e ele é contado como duplicado.
+
+Colunas (cabeçalho obrigatório, separador ',' ou ';'):
+    nome, email, senha, curso_acesso[, nivel_curso]
+curso_acesso aceita 'Inglês'/'ingles' e 'Espanhol'; nivel_curso (padrão
+'Básico') posiciona o aluno já no nível em que ele estava na escola de origem.
+
+Uso:
+    python importar_alunos.py alunos.csv
+    python importar_alunos.py alunos.csv --lote 1000 --processos 8
+    python importar_alunos.py alunos.csv --verificar     # só valida e conta
+
+Conexão: as mesmas variáveis MYSQL_* do app.py (e SENHAS_SCRYPT_* para o hash).
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+from banco import criar_banco_script
+from conteudo import normalizar_slug
+from senhas import MODO_PROCESSOS, SCRYPT_N, SCRYPT_P, SCRYPT_R, ServicoSenhas
+
+SQL_EMAILS_CADASTRADOS = "SELECT LOWER(email) AS email FROM aluno"
+
+SQL_INSERIR_ALUNO = """
+    INSERT INTO aluno (nome, email, senha_hash, curso_acesso, nivel_curso)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE aluno_id = aluno_id
+"""
+
+CURSOS = {'ingles': 'Inglês', 'espanhol': 'Espanhol'}
+NIVEIS = {'basico': 'Básico', 'intermediario': 'Intermediário', 'avancado': 'Avançado'}
+COLUNAS_OBRIGATORIAS = ('nome', 'email', 'senha', 'curso_acesso')
+TAMANHO_MAX = {'nome': 100, 'email': 100}
+
+
+def abrir_csv(caminho):
+    """Leitor de dicionários; descobre o separador pelo início do arquivo."""
+    arquivo = open(caminho, newline='', encoding='utf-8-sig')
+    amostra = arquivo.read(4096)
+    arquivo.seek(0)
+    try:
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=',;')
+    except csv.Error:
+        dialeto = csv.excel
+    leitor = csv.DictReader(arquivo, dialect=dialeto)
+    leitor.fieldnames = [(campo or '').strip().lower() for campo in leitor.fieldnames or []]
+    return arquivo, leitor
+
+
+def validar_linha(linha):
+    """(nome, email, senha, curso, nivel) normalizados, ou levanta ValueError com o motivo."""
+    nome = (linha.get('nome') or '').strip()
+    email = (linha.get('email') or '').strip().lower()
+    senha = linha.get('senha') or ''
+    if not nome:
+        raise ValueError("nome vazio")
+    if '@' not in email or email.startswith('@') or email.endswith('@'):
+        raise ValueError(f"email inválido: {email!r}")
+    if not senha:
+        raise ValueError("senha vazia")
+    for campo, valor in (('nome', nome), ('email', email)):
+        if len(valor) > TAMANHO_MAX[campo]:
+            raise ValueError(f"{campo} com mais de {TAMANHO_MAX[campo]} caracteres")
+    curso = CURSOS.get(normalizar_slug(linha.get('curso_acesso') or ''))
+    if curso is None:
+        raise ValueError(f"curso desconhecido: {linha.get('curso_acesso')!r}")
+    nivel = NIVEIS.get(normalizar_slug(linha.get('nivel_curso') or 'basico'))
+    if nivel is None:
+        raise ValueError(f"nível desconhecido: {linha.get('nivel_curso')!r}")
+    return nome, email, senha, curso, nivel
+
+
+class Importacao:
+
+    def __init__(self, banco, servico_senhas, tamanho_lote=500, verificar=False, saida=sys.stdout):
+        self.banco = banco
+        self.servico_senhas = servico_senhas
+        self.tamanho_lote = tamanho_lote
+        self.verificar = verificar
+        self.saida = saida
+        self.vistos = set()
+        self.lote = []
+        self.rejeicoes = []
+        self.contagem = {'lidas': 0, 'inseridas': 0, 'ja_cadastradas': 0, 'repetidas_no_arquivo': 0,
+                         'duplicadas_na_gravacao': 0, 'rejeitadas': 0}
+        self.tempo = {'hash_s': 0.0, 'banco_s': 0.0}
+        self.inicio = None
+
+    def executar(self, leitor):
+        self.inicio = time.perf_counter()
+        faltando = [coluna for coluna in COLUNAS_OBRIGATORIAS if coluna not in leitor.fieldnames]
+        if faltando:
+            raise ValueError(f"Colunas ausentes no cabeçalho: {', '.join(faltando)}")
+
+        # Um conjunto com todos os emails do banco: uma consulta em vez de uma por aluno
+        inicio = time.perf_counter()
+        self.vistos = {linha['email'] for linha in self.banco.consultar_todos(SQL_EMAILS_CADASTRADOS)}
+        self.tempo['banco_s'] += time.perf_counter() - inicio
+        cadastrados = set(self.vistos)
+
+        for linha in leitor:
+            self.contagem['lidas'] += 1
+            try:
+                nome, email, senha, curso, nivel = validar_linha(linha)
+            except ValueError as e:
+                self.contagem['rejeitadas'] += 1
+                self.rejeicoes.append((leitor.line_num, str(e)))
+                continue
+            if email in self.vistos:
+                self.contagem['ja_cadastradas' if email in cadastrados else 'repetidas_no_arquivo'] += 1
+                continue
+            self.vistos.add(email)
+            self.lote.append((nome, email, senha, curso, nivel))
+            if len(self.lote) >= self.tamanho_lote:
+                self._gravar_lote()
+        self._gravar_lote()
+        return self.contagem
+
+    def _gravar_lote(self):
+        if not self.lote:
+            return
+        lote, self.lote = self.lote, []
+        if self.verificar:
+            self.contagem['inseridas'] += len(lote)
+            self._mostrar_progresso()
+            return
+
+        inicio = time.perf_counter()
+        hashes = self.servico_senhas.gerar_varios([senha for _, _, senha, _, _ in lote])
+        self.tempo['hash_s'] += time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        try:
+            # Um INSERT de várias linhas e um commit por lote
+            inseridas = self.banco.executar_varios(SQL_INSERIR_ALUNO, [
+                (nome, email, senha_hash, curso, nivel)
+                for (nome, email, _, curso, nivel), senha_hash in zip(lote, hashes)
+            ])
+            self.banco.commit()
+        except Exception:
+            self.banco.rollback()
+            raise
+        self.tempo['banco_s'] += time.perf_counter() - inicio
+        self.contagem['inseridas'] += inseridas
+        self.contagem['duplicadas_na_gravacao'] += len(lote) - inseridas
+        self._mostrar_progresso()
+
+    def linhas_por_segundo(self):
+        duracao = time.perf_counter() - self.inicio
+        return self.contagem['lidas'] / duracao if duracao else 0.0
+
+    def _mostrar_progresso(self):
+        c = self.contagem
+        print(f"  {c['lidas']:>7} lidas | {c['inseridas']:>7} inseridas | "
+              f"{c['ja_cadastradas'] + c['repetidas_no_arquivo'] + c['duplicadas_na_gravacao']:>6} duplicadas | "
+              f"{c['rejeitadas']:>5} rejeitadas | {self.linhas_por_segundo():>7.1f} linhas/s",
+              file=self.saida, flush=True)
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('arquivo', help="CSV com os alunos.")
+    parser.add_argument('--lote', type=int, default=500, help="Alunos por INSERT/commit.")
+    parser.add_argument('--processos', type=int, default=os.cpu_count() or 2, help="Processos para o hash das senhas.")
+    parser.add_argument('--verificar', action='store_true', help="Só valida e deduplica; não grava nada.")
+    parser.add_argument('--max-rejeicoes', type=int, default=20, help="Quantas linhas rejeitadas listar.")
+    args = parser.parse_args()
+
+    app, banco = criar_banco_script('importar_alunos')
+    servico_senhas = ServicoSenhas(
+        n=int(os.getenv('SENHAS_SCRYPT_N', SCRYPT_N)),
+        r=int(os.getenv('SENHAS_SCRYPT_R', SCRYPT_R)),
+        p=int(os.getenv('SENHAS_SCRYPT_P', SCRYPT_P)),
+        modo=MODO_PROCESSOS,
+        max_simultaneos=args.processos,
+    )
+    importacao = Importacao(banco, servico_senhas, tamanho_lote=args.lote, verificar=args.verificar)
+
+    arquivo, leitor = abrir_csv(args.arquivo)
+    try:
+        with app.app_context():
+            contagem = importacao.executar(leitor)
+    except ValueError as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        arquivo.close()
+        servico_senhas.fechar()
+
+    duracao = time.perf_counter() - importacao.inicio
+    print(f"\n{'Verificação' if args.verificar else 'Importação'} concluída em {duracao:.1f}s "
+          f"({importacao.linhas_por_segundo():.1f} linhas/s; hash {importacao.tempo['hash_s']:.1f}s, "
+          f"banco {importacao.tempo['banco_s']:.1f}s)")
+    for chave, valor in contagem.items():
+        print(f"  {chave:<24} {valor}")
+    if importacao.rejeicoes:
+        print(f"\nLinhas rejeitadas (primeiras {args.max_rejeicoes}):")
+        for numero, motivo in importacao.rejeicoes[:args.max_rejeicoes]:
+            print(f"  linha {numero}: {motivo}")
+
+
+if __name__ == '__main__':
+    main()
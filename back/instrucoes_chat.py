@@ -0,0 +1,225 @@
+"""
+Instruções do sistema do Professor Dinossauro, compiladas uma vez por curso.
+
+Antes, cada chat novo montava a f-string da instrução e um
+GenerateContentConfig novo, e a instrução inteira ia junto em todas as
+chamadas daquela conversa. Agora:
+  - a instrução de cada curso (opcionalmente com o resumo do módulo atual do
+    aluno) é montada uma vez e o GenerateContentConfig é reaproveitado por
+    todos os chats com a mesma instrução;
+  - com cache de contexto do provedor (client.caches.create), a instrução
+    fica guardada no Gemini e o chat só referencia o cache (cached_content).
+    Um cache pertence à chave de API que o criou, então há um por chave, e
+    perto de expirar ele tem o TTL estendido (caches.update), sem criar outro.
+    Se a instrução for menor que o mínimo do provedor, ou a criação falhar,
+    o chat usa a instrução inline, como antes. As instruções atuais (uns 200
+    tokens, até ~600 com o resumo do módulo) ficam abaixo do mínimo de 1024 do
+    Gemini 2.5 Flash: por isso o cache do provedor vem desligado;
+  - estatisticas() mostra quantos tokens de instrução deixaram de ser
+    enviados e o tempo de montagem economizado por criação de chat.
+Os tokens são estimados (~4 caracteres por token), sem chamada ao provedor.
+"""
+import hashlib
+import logging
+import threading
+import time
+
+from google.genai import types
+
+from metricas import JanelaLatencias
+
+logger = logging.getLogger(__name__)
+
+CARACTERES_POR_TOKEN = 4
+
+
+def estimar_tokens(texto):
+    return max(1, len(texto) // CARACTERES_POR_TOKEN)
+
+
+def texto_instrucao(curso_acesso, resumo_modulo=None):
+    """Instrução do sistema do curso; com resumo_modulo, o tutor conhece o módulo atual do aluno."""
+    texto = f"""
+Você é o Professor Dinossauro, um assistente virtual inteligente, amigável e focado.
+Seu papel é atuar como um professor particular, oferecendo informações, dicas e tirando dúvidas **APENAS** sobre o conteúdo do curso de {curso_acesso} que o aluno está estudando.
+
+Seja breve, direto e sucinto. Evite respostas longas. Use um tom encorajador e educativo.
+Se a pergunta for irrelevante ou fora do escopo do curso de {curso_acesso}, responda educadamente que você é especialista apenas neste curso.
+
+Regras importantes:
+Não incentive nem normalize conteúdos impróprios, ilegais ou perigosos.
+Não forneça diagnósticos médicos, conselhos legais ou instruções perigosas. Sempre recomende profissionais.
+Ignore provocações.
+
+Exemplos de tom:
+“Opa! Vou te ajudar rapidinho com isso do {curso_acesso}.”
+“Boa pergunta! No módulo X, você viu que...”
+"""
+    if resumo_modulo:
+        texto += f"""
+Módulo que o aluno está estudando agora (use como referência; não entregue as respostas das atividades):
+{resumo_modulo}
+"""
+    return texto
+
+
+def resumir_modulo(conteudo, max_caracteres=1500):
+    """Título e enunciados das atividades do módulo (sem alternativas nem gabarito), até max_caracteres."""
+    linhas = [conteudo.get('titulo', '').strip()]
+    tamanho = len(linhas[0])
+    for atividade in conteudo.get('atividades', []):
+        linha = f"- {str(atividade.get('pergunta', '')).strip()}"
+        if tamanho + len(linha) + 1 > max_caracteres:
+            break
+        linhas.append(linha)
+        tamanho += len(linha) + 1
+    return '\n'.join(linha for linha in linhas if linha)
+
+
+class _InstrucaoCompilada:
+    __slots__ = ('texto', 'tokens', 'config', 'caches', 'falha_cache_ate', 'lock')
+
+    def __init__(self, texto):
+        self.texto = texto
+        self.tokens = estimar_tokens(texto)
+        self.config = types.GenerateContentConfig(system_instruction=texto)
+        self.caches = {}             # índice da chave -> (nome, config, expira_em, cliente)
+        self.falha_cache_ate = {}    # índice da chave -> não tenta de novo antes disso
+        self.lock = threading.Lock()
+
+
+class CatalogoInstrucoes:
+
+    def __init__(self, modelo, usar_cache_provedor=False, ttl_cache_segundos=7200, margem_renovacao=1800,
+                 minimo_tokens_cache=1024, espera_apos_falha=600):
+        self.modelo = modelo
+        self.usar_cache_provedor = usar_cache_provedor
+        self.ttl_cache_segundos = ttl_cache_segundos
+        # Chats criados agora podem viver até a margem (TTL de inatividade dos chats):
+        # um cache com menos vida que isso tem o TTL estendido
+        self.margem_renovacao = margem_renovacao
+        self.minimo_tokens_cache = minimo_tokens_cache
+        self.espera_apos_falha = espera_apos_falha
+        self._compiladas = {}
+        self._lock = threading.Lock()
+        self._metricas = {
+            'compiladas': 0, 'reusos': 0, 'criacoes_chat': 0, 'chats_com_cache': 0,
+            'caches_criados': 0, 'caches_renovados': 0, 'falhas_cache': 0, 'abaixo_minimo_cache': 0,
+            'tokens_instrucao': 0, 'tokens_do_cache': 0, 'tempo_compilacao_s': 0.0,
+        }
+        self.latencias = JanelaLatencias()
+
+    def compilar(self, curso_acesso, resumo_modulo=None):
+        """Instrução compilada do curso (e do resumo do módulo), montada só na primeira vez."""
+        chave = (curso_acesso, resumo_modulo)
+        with self._lock:
+            compilada = self._compiladas.get(chave)
+            if compilada is not None:
+                self._metricas['reusos'] += 1
+                return compilada
+        inicio = time.perf_counter()
+        compilada = _InstrucaoCompilada(texto_instrucao(curso_acesso, resumo_modulo))
+        duracao = time.perf_counter() - inicio
+        with self._lock:
+            if chave in self._compiladas:
+                self._metricas['reusos'] += 1
+                return self._compiladas[chave]
+            self._compiladas[chave] = compilada
+            self._metricas['compiladas'] += 1
+            self._metricas['tempo_compilacao_s'] += duracao
+        return compilada
+
+    def config_para(self, curso_acesso, estado_chave, resumo_modulo=None):
+        """GenerateContentConfig de um chat novo na chave informada (com cache do provedor, se houver)."""
+        inicio = time.perf_counter()
+        compilada = self.compilar(curso_acesso, resumo_modulo)
+        config = None
+        if self.usar_cache_provedor:
+            config = self._config_em_cache(compilada, estado_chave)
+        with self._lock:
+            self._metricas['criacoes_chat'] += 1
+            self._metricas['tokens_instrucao'] += compilada.tokens
+            if config is not None:
+                self._metricas['chats_com_cache'] += 1
+                self._metricas['tokens_do_cache'] += compilada.tokens
+        self.latencias.registrar(time.perf_counter() - inicio)
+        return config or compilada.config
+
+    def _config_em_cache(self, compilada, estado_chave):
+        if compilada.tokens < self.minimo_tokens_cache:
+            with self._lock:
+                self._metricas['abaixo_minimo_cache'] += 1
+            return None
+        indice = estado_chave.indice
+        with compilada.lock:
+            agora = time.time()
+            existente = compilada.caches.get(indice)
+            if existente is not None and existente[2] - agora > self.margem_renovacao:
+                return existente[1]
+            if compilada.falha_cache_ate.get(indice, 0) > agora:
+                return None
+            if existente is not None:
+                nome, config, _, cliente = existente
+                try:
+                    cliente.caches.update(name=nome, config=types.UpdateCachedContentConfig(
+                        ttl=f"{int(self.ttl_cache_segundos)}s"))
+                except Exception as e:
+                    # Expirado ou apagado: cria outro e não deixa o antigo cobrando armazenamento
+                    logger.warning("Cache de contexto %s não renovado; criando outro: %s", nome, e)
+                    del compilada.caches[indice]
+                    self._apagar(cliente, nome)
+                else:
+                    compilada.caches[indice] = (nome, config, agora + self.ttl_cache_segundos, cliente)
+                    with self._lock:
+                        self._metricas['caches_renovados'] += 1
+                    return config
+            try:
+                cache = estado_chave.cliente.caches.create(
+                    model=self.modelo,
+                    config=types.CreateCachedContentConfig(
+                        system_instruction=compilada.texto,
+                        ttl=f"{int(self.ttl_cache_segundos)}s",
+                        display_name=f"levelup-{hashlib.sha1(compilada.texto.encode('utf-8')).hexdigest()[:12]}",
+                    ),
+                )
+            except Exception as e:
+                compilada.falha_cache_ate[indice] = agora + self.espera_apos_falha
+                with self._lock:
+                    self._metricas['falhas_cache'] += 1
+                logger.warning("Cache de contexto indisponível na chave %d; usando a instrução inline: %s", indice, e)
+                return None
+            config = types.GenerateContentConfig(cached_content=cache.name)
+            compilada.caches[indice] = (cache.name, config, agora + self.ttl_cache_segundos, estado_chave.cliente)
+        with self._lock:
+            self._metricas['caches_criados'] += 1
+        return config
+
+    @staticmethod
+    def _apagar(cliente, nome):
+        try:
+            cliente.caches.delete(name=nome)
+        except Exception as e:
+            logger.warning("Cache de contexto %s não apagado: %s", nome, e)
+
+    def fechar(self):
+        """Apaga no provedor os caches criados (eles cobram armazenamento até expirar)."""
+        with self._lock:
+            compiladas = list(self._compiladas.values())
+        for compilada in compiladas:
+            with compilada.lock:
+                caches, compilada.caches = compilada.caches, {}
+            for nome, _, _, cliente in caches.values():
+                self._apagar(cliente, nome)
+
+    def estatisticas(self):
+        with self._lock:
+            metricas = dict(self._metricas)
+            metricas['instrucoes'] = len(self._compiladas)
+        compilacoes = metricas['compiladas']
+        # Cada reuso evitou uma montagem: estimada pelo tempo médio das compilações
+        media = metricas['tempo_compilacao_s'] / compilacoes if compilacoes else 0.0
+        metricas['tempo_economizado_s'] = metricas['reusos'] * media
+        criacoes = metricas['criacoes_chat']
+        metricas['tokens_economizados_por_chat'] = metricas['tokens_do_cache'] / criacoes if criacoes else 0.0
+        metricas['latencia_config_s'] = self.latencias.resumo()
+        return metricas
@@ -0,0 +1,204 @@
+"""
+Controle de admissão do chat do Professor Dinossauro.
+
+A cota do Gemini (GENAI_KEY_1..N) é de todos os alunos. Sem limite, um aluno
+mandando mensagens sem parar esgota todas as chaves para a turma inteira.
+Três camadas, todas com baldes de tokens em memória:
+  - por sessão do navegador e por aluno_id (LimitadorTaxa): rajada curta
+    permitida, depois uma mensagem a cada 1/taxa segundos;
+  - por chave da API (BaldeTokens em cada EstadoChave do pool): não passa do
+    limite de requisições por minuto da chave, em vez de esperar o 429;
+  - FilaJusta: quando as chaves estão sem tokens, as mensagens esperam numa
+    fila por aluno atendida em rodízio, e nenhum aluno passa na frente dos
+    outros só por mandar mais.
+Quem é rejeitado recebe ErroLimiteTaxa com `retry_after` (segundos).
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class ErroLimiteTaxa(RuntimeError):
+    """Mensagem recusada pelo controle de admissão; tente de novo após retry_after segundos."""
+
+    def __init__(self, mensagem, retry_after):
+        super().__init__(mensagem)
+        self.retry_after = retry_after
+
+
+class BaldeTokens:
+    """Balde com `capacidade` tokens, reabastecido a `taxa` tokens por segundo."""
+
+    __slots__ = ('capacidade', 'taxa', 'tokens', 'atualizado_em')
+
+    def __init__(self, capacidade, taxa, agora=None):
+        self.capacidade = float(capacidade)
+        self.taxa = float(taxa)
+        self.tokens = float(capacidade)
+        self.atualizado_em = time.monotonic() if agora is None else agora
+
+    def _reabastecer(self, agora):
+        if agora > self.atualizado_em:
+            self.tokens = min(self.capacidade, self.tokens + (agora - self.atualizado_em) * self.taxa)
+            self.atualizado_em = agora
+
+    def espera(self, agora, quantidade=1):
+        """Segundos até haver `quantidade` tokens (0 se já há)."""
+        self._reabastecer(agora)
+        falta = quantidade - self.tokens
+        return 0.0 if falta <= 0 else falta / self.taxa
+
+    def consumir(self, agora, quantidade=1):
+        """Consome e retorna 0.0, ou retorna a espera necessária sem consumir nada."""
+        espera = self.espera(agora, quantidade)
+        if espera == 0.0:
+            self.tokens -= quantidade
+        return espera
+
+    def devolver(self, quantidade=1):
+        self.tokens = min(self.capacidade, self.tokens + quantidade)
+
+
+class LimitadorTaxa:
+    """Um BaldeTokens por chave (sessão, aluno...), criado no primeiro uso."""
+
+    def __init__(self, capacidade, taxa_por_segundo, max_chaves=100000):
+        self.capacidade = capacidade
+        self.taxa = taxa_por_segundo
+        self.max_chaves = max_chaves
+        self._baldes = OrderedDict()
+        self._lock = threading.Lock()
+        self._metricas = {'admitidas': 0, 'rejeitadas': 0, 'devolvidas': 0}
+
+    def tentar(self, chave, agora=None):
+        """Consome um token da chave: 0.0 se admitida, senão o retry_after em segundos."""
+        agora = time.monotonic() if agora is None else agora
+        with self._lock:
+            balde = self._baldes.get(chave)
+            if balde is None:
+                balde = self._baldes[chave] = BaldeTokens(self.capacidade, self.taxa, agora)
+                self._podar()
+            else:
+                self._baldes.move_to_end(chave)
+            espera = balde.consumir(agora)
+            self._metricas['admitidas' if espera == 0.0 else 'rejeitadas'] += 1
+        return espera
+
+    def devolver(self, chave):
+        """Desfaz um tentar() admitido (ex.: outra camada recusou a mesma mensagem)."""
+        with self._lock:
+            balde = self._baldes.get(chave)
+            if balde is not None:
+                balde.devolver()
+                self._metricas['devolvidas'] += 1
+
+    def _podar(self):
+        # Sai a chave usada há mais tempo; se ela voltar, recomeça com o balde cheio
+        while len(self._baldes) > self.max_chaves:
+            self._baldes.popitem(last=False)
+
+    def estatisticas(self):
+        with self._lock:
+            metricas = dict(self._metricas)
+            metricas['chaves'] = len(self._baldes)
+        return metricas
+
+
+class _Pedido:
+    __slots__ = ('preferida', 'evento', 'estado')
+
+    def __init__(self, preferida):
+        self.preferida = preferida
+        self.evento = threading.Event()
+        self.estado = None
+
+
+class FilaJusta:
+    """
+    Entrega os tokens das chaves da API aos alunos em rodízio.
+
+    aguardar(aluno, preferida) devolve o EstadoChave com um token já consumido
+    (a chave preferida, se ela tiver token). Sem token livre, o pedido entra
+    na fila do aluno. Um despachante atende um pedido de cada aluno por vez,
+    conforme os baldes das chaves reabastecem. Se a espera estimada passar de
+    max_espera, o pedido é recusado na hora com ErroLimiteTaxa.
+    """
+
+    def __init__(self, pool_chaves, max_espera=10.0):
+        self._pool = pool_chaves
+        self.max_espera = max_espera
+        self._filas = OrderedDict()
+        self._esperando = 0
+        self._despachando = False
+        self._lock = threading.Lock()
+        self._metricas = {'imediatas': 0, 'enfileiradas': 0, 'rejeitadas': 0, 'desistencias': 0}
+
+    def aguardar(self, aluno, preferida=None):
+        with self._lock:
+            if not self._filas:
+                estado = self._pool.consumir_token(preferida)
+                if estado is not None:
+                    self._metricas['imediatas'] += 1
+                    return estado
+            espera = self._espera_estimada()
+            if espera > self.max_espera:
+                self._metricas['rejeitadas'] += 1
+                raise ErroLimiteTaxa("Cota do Gemini ocupada por outros alunos.", espera)
+            pedido = _Pedido(preferida)
+            self._filas.setdefault(aluno, deque()).append(pedido)
+            self._esperando += 1
+            self._metricas['enfileiradas'] += 1
+            if not self._despachando:
+                self._despachando = True
+                threading.Thread(target=self._despachar, daemon=True, name='fila-justa').start()
+
+        if pedido.evento.wait(self.max_espera):
+            return pedido.estado
+        with self._lock:
+            if pedido.estado is not None:
+                # Atendido entre o timeout e o lock
+                return pedido.estado
+            fila = self._filas.get(aluno)
+            if fila is not None and pedido in fila:
+                fila.remove(pedido)
+                self._esperando -= 1
+                if not fila:
+                    del self._filas[aluno]
+            self._metricas['desistencias'] += 1
+        raise ErroLimiteTaxa("Tempo esgotado esperando a cota do Gemini.", self._pool.espera_token())
+
+    def _espera_estimada(self):
+        # Quem já está na fila consome os próximos tokens; a taxa é a soma das chaves
+        taxa = self._pool.taxa_total()
+        espera = self._pool.espera_token()
+        if taxa:
+            espera += self._esperando / taxa
+        return espera
+
+    def _despachar(self):
+        while True:
+            with self._lock:
+                if not self._filas:
+                    self._despachando = False
+                    return
+                # Rodízio: o primeiro aluno da fila é atendido e vai para o fim
+                aluno, fila = next(iter(self._filas.items()))
+                estado = self._pool.consumir_token(fila[0].preferida)
+                if estado is not None:
+                    pedido = fila.popleft()
+                    self._esperando -= 1
+                    del self._filas[aluno]
+                    if fila:
+                        self._filas[aluno] = fila
+                    pedido.estado = estado
+                    pedido.evento.set()
+                    continue
+                espera = self._pool.espera_token()
+            time.sleep(min(max(espera, 0.005), 1.0))
+
+    def estatisticas(self):
+        with self._lock:
+            metricas = dict(self._metricas)
+            metricas['esperando'] = self._esperando
+            metricas['alunos_na_fila'] = len(self._filas)
+        return metricas
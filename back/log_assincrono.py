@@ -0,0 +1,96 @@
+"""
+Log sem bloquear as requisições, com amostragem.
+
+As rotas só colocam o registro numa fila em memória (QueueHandler); uma thread
+(green thread, sob o eventlet) tira da fila e escreve nos destinos de verdade
+(QueueListener). Se a fila encher, o registro é descartado e contado, em vez
+de a requisição esperar pelo stdout.
+
+Loggers de caminhos quentes (ex.: acesso aos módulos) podem ser amostrados:
+só uma fração dos registros abaixo de WARNING é mantida; avisos e erros
+passam sempre.
+"""
+import logging
+import queue
+import random
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+
+class FiltroAmostragem(logging.Filter):
+    """Mantém todos os registros >= nivel_integral e só `taxa` (0 a 1) dos demais."""
+
+    def __init__(self, taxa, nivel_integral=logging.WARNING, aleatorio=random.random):
+        super().__init__()
+        self.taxa = taxa
+        self.nivel_integral = nivel_integral
+        self._aleatorio = aleatorio
+        self.descartados = 0
+
+    def filter(self, record):
+        if record.levelno >= self.nivel_integral or self._aleatorio() < self.taxa:
+            return True
+        self.descartados += 1
+        return False
+
+
+class _HandlerFila(QueueHandler):
+
+    def __init__(self, log):
+        super().__init__(log.fila)
+        self._log = log
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self._log._descartar()
+
+
+class LogAssincrono:
+    """Fila única de log do processo, com os handlers reais rodando fora das requisições."""
+
+    def __init__(self, destinos, tamanho_fila=10000):
+        self.fila = queue.Queue(tamanho_fila)
+        self._listener = QueueListener(self.fila, *destinos, respect_handler_level=True)
+        self._filtros = []
+        self._lock = threading.Lock()
+        self._descartados_fila = 0
+        self._iniciado = False
+
+    def anexar(self, logger, taxa_amostragem=1.0, nivel_integral=logging.WARNING):
+        """Troca os handlers do logger pela fila (com amostragem se taxa_amostragem < 1)."""
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        handler = _HandlerFila(self)
+        if taxa_amostragem < 1.0:
+            filtro = FiltroAmostragem(taxa_amostragem, nivel_integral)
+            handler.addFilter(filtro)
+            self._filtros.append(filtro)
+        logger.addHandler(handler)
+        logger.propagate = False
+        return logger
+
+    def _descartar(self):
+        with self._lock:
+            self._descartados_fila += 1
+
+    def iniciar(self):
+        if not self._iniciado:
+            self._listener.start()
+            self._iniciado = True
+
+    def parar(self):
+        """Escreve o que ainda está na fila e encerra a thread de escrita."""
+        if self._iniciado:
+            self._listener.stop()
+            self._iniciado = False
+
+    def estatisticas(self):
+        with self._lock:
+            descartados_fila = self._descartados_fila
+        return {
+            'pendentes': self.fila.qsize(),
+            'descartados_fila': descartados_fila,
+            'descartados_amostragem': sum(filtro.descartados for filtro in self._filtros),
+        }
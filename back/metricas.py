@@ -0,0 +1,265 @@
+"""
+Métricas simples mantidas em memória pelo servidor.
+
+Além das janelas de latência, há um registro de métricas no formato de
+exposição do Prometheus (contadores, histogramas e medidores com rótulos),
+servido pela rota /metrics do app.
+"""
+import logging
+import math
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Limites (em segundos) dos histogramas de duração
+LIMITES_PADRAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class JanelaLatencias:
+    """Guarda as últimas N medições (em segundos) e calcula percentis sob demanda."""
+
+    def __init__(self, tamanho=1000):
+        self._valores = deque(maxlen=tamanho)
+        self._lock = threading.Lock()
+        self.total = 0
+
+    def registrar(self, valor):
+        with self._lock:
+            self._valores.append(valor)
+            self.total += 1
+
+    def resumo(self):
+        with self._lock:
+            valores = sorted(self._valores)
+            total = self.total
+        if not valores:
+            return {'total': total, 'p50': None, 'p95': None, 'p99': None, 'max': None}
+        return {
+            'total': total,
+            'p50': percentil(valores, 50),
+            'p95': percentil(valores, 95),
+            'p99': percentil(valores, 99),
+            'max': valores[-1],
+        }
+
+
+def percentil(valores_ordenados, p):
+    """Percentil por vizinho mais próximo de uma lista já ordenada."""
+    if not valores_ordenados:
+        return None
+    indice = max(0, min(len(valores_ordenados) - 1, round(p / 100 * len(valores_ordenados)) - 1))
+    return valores_ordenados[indice]
+
+
+# *******************************************************************
+# Formato Prometheus
+# *******************************************************************
+def _escapar_rotulo(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatar_rotulos(nomes, valores):
+    if not nomes:
+        return ''
+    pares = ','.join(f'{nome}="{_escapar_rotulo(valor)}"' for nome, valor in zip(nomes, valores))
+    return '{' + pares + '}'
+
+
+def _formatar_valor(valor):
+    if valor == math.inf:
+        return '+Inf'
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return repr(valor) if isinstance(valor, float) else str(valor)
+
+
+class _Metrica:
+    tipo = 'untyped'
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _chave(self, rotulos):
+        if set(rotulos) != set(self.rotulos):
+            raise ValueError(f"{self.nome}: rótulos esperados {self.rotulos}, recebidos {tuple(rotulos)}")
+        return tuple(str(rotulos[nome]) for nome in self.rotulos)
+
+    def _cabecalho(self):
+        return [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+
+
+class Contador(_Metrica):
+    """Valor que só cresce (ex.: requisições atendidas)."""
+    tipo = 'counter'
+
+    def inc(self, valor=1, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._series[chave] = self._series.get(chave, 0) + valor
+
+    def exportar(self):
+        with self._lock:
+            series = sorted(self._series.items())
+        linhas = self._cabecalho()
+        for chave, valor in series:
+            linhas.append(f"{self.nome}{_formatar_rotulos(self.rotulos, chave)} {_formatar_valor(valor)}")
+        return linhas
+
+
+class Histograma(_Metrica):
+    """Distribuição de valores em faixas cumulativas (_bucket), com _sum e _count."""
+    tipo = 'histogram'
+
+    def __init__(self, nome, ajuda, rotulos=(), limites=LIMITES_PADRAO):
+        super().__init__(nome, ajuda, rotulos)
+        self.limites = tuple(sorted(limites))
+
+    def observar(self, valor, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                # [contagem por faixa (não cumulativa, a última é +Inf), soma]
+                serie = self._series[chave] = [[0] * (len(self.limites) + 1), 0.0]
+            for indice, limite in enumerate(self.limites):
+                if valor <= limite:
+                    break
+            else:
+                indice = len(self.limites)
+            serie[0][indice] += 1
+            serie[1] += valor
+
+    def exportar(self):
+        with self._lock:
+            series = sorted((chave, list(contagens), soma) for chave, (contagens, soma) in self._series.items())
+        nomes_bucket = self.rotulos + ('le',)
+        linhas = self._cabecalho()
+        for chave, contagens, soma in series:
+            acumulado = 0
+            for limite, contagem in zip(self.limites + (math.inf,), contagens):
+                acumulado += contagem
+                rotulos = _formatar_rotulos(nomes_bucket, chave + (_formatar_valor(float(limite)),))
+                linhas.append(f"{self.nome}_bucket{rotulos} {acumulado}")
+            rotulos = _formatar_rotulos(self.rotulos, chave)
+            linhas.append(f"{self.nome}_sum{rotulos} {_formatar_valor(soma)}")
+            linhas.append(f"{self.nome}_count{rotulos} {acumulado}")
+        return linhas
+
+
+class Medidor(_Metrica):
+    """
+    Valor que sobe e desce. Pode ser definido diretamente ou lido na hora da
+    coleta por `funcao` (ex.: lambda: len(active_chats)).
+    """
+    tipo = 'gauge'
+
+    def __init__(self, nome, ajuda, rotulos=(), funcao=None):
+        super().__init__(nome, ajuda, rotulos)
+        self._funcao = funcao
+
+    def definir(self, valor, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._series[chave] = valor
+
+    def exportar(self):
+        if self._funcao is not None:
+            self.definir(self._funcao())
+        with self._lock:
+            series = sorted(self._series.items())
+        linhas = self._cabecalho()
+        for chave, valor in series:
+            linhas.append(f"{self.nome}{_formatar_rotulos(self.rotulos, chave)} {_formatar_valor(valor)}")
+        return linhas
+
+
+def _achatar(estatisticas, prefixo=''):
+    """{'a': 1, 'b': {'c': 2.5}, 'modo': 'x'} -> [('a', 1), ('b_c', 2.5)] (ignora o que não é número)."""
+    for nome, valor in estatisticas.items():
+        nome = f"{prefixo}{nome}"
+        if isinstance(valor, dict):
+            yield from _achatar(valor, f"{nome}_")
+        elif isinstance(valor, bool):
+            yield nome, int(valor)
+        elif isinstance(valor, (int, float)):
+            yield nome, valor
+
+
+class RegistroMetricas:
+    """
+    Conjunto de métricas de um processo, exportado no formato texto do Prometheus.
+
+    Os componentes que já têm estatisticas() (caches, pool do banco, executor da
+    IA...) entram por `coletor()`: cada número do dicionário vira um medidor
+    <prefixo>_<campo>, lido só quando /metrics é consultada.
+    """
+
+    def __init__(self, namespace='levelup'):
+        self.namespace = namespace
+        self._metricas = []
+        self._coletores = []
+        self._lock = threading.Lock()
+
+    def _nome(self, nome):
+        return f"{self.namespace}_{nome}" if self.namespace else nome
+
+    def _adicionar(self, metrica):
+        with self._lock:
+            self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, nome, ajuda, rotulos=()):
+        return self._adicionar(Contador(self._nome(nome), ajuda, rotulos))
+
+    def histograma(self, nome, ajuda, rotulos=(), limites=LIMITES_PADRAO):
+        return self._adicionar(Histograma(self._nome(nome), ajuda, rotulos, limites))
+
+    def medidor(self, nome, ajuda, rotulos=(), funcao=None):
+        return self._adicionar(Medidor(self._nome(nome), ajuda, rotulos, funcao))
+
+    def coletor(self, prefixo, funcao, rotulo_item='indice'):
+        """
+        funcao() -> dict de estatísticas, ou lista de dicts (uma série por item,
+        rotulada por item[rotulo_item], como o estado de cada chave do Gemini).
+        """
+        with self._lock:
+            self._coletores.append((self._nome(prefixo), funcao, rotulo_item))
+
+    def _exportar_coletor(self, prefixo, funcao, rotulo_item):
+        dados = funcao()
+        itens = dados if isinstance(dados, list) else [dados]
+        series = {}
+        for posicao, item in enumerate(itens):
+            rotulos = ((rotulo_item, item.get(rotulo_item, posicao)),) if isinstance(dados, list) else ()
+            for campo, valor in _achatar(item):
+                if campo != rotulo_item:
+                    series.setdefault(campo, []).append((rotulos, valor))
+        linhas = []
+        for campo, valores in sorted(series.items()):
+            nome = f"{prefixo}_{campo}"
+            linhas.append(f"# TYPE {nome} gauge")
+            for rotulos, valor in valores:
+                nomes = tuple(r[0] for r in rotulos)
+                linhas.append(f"{nome}{_formatar_rotulos(nomes, [r[1] for r in rotulos])} {_formatar_valor(valor)}")
+        return linhas
+
+    def exportar(self):
+        """Texto no formato de exposição 0.0.4 do Prometheus."""
+        with self._lock:
+            metricas = list(self._metricas)
+            coletores = list(self._coletores)
+        linhas = []
+        for metrica in metricas:
+            linhas.extend(metrica.exportar())
+        for coletor in coletores:
+            try:
+                linhas.extend(self._exportar_coletor(*coletor))
+            except Exception as e:
+                # Um componente com problema não pode derrubar a coleta inteira
+                logger.warning(f"Falha ao coletar métricas de {coletor[0]}: {e}")
+        return '\n'.join(linhas) + '\n'
@@ -0,0 +1,27 @@
+-- 001: corrige o esquema criado pelo scriptbd.sql original.
+--   - desempenho_modulo.nivel_modulo: gravado por enviar_atividade, mas ausente
+--     do script (só é criada se ainda não existir) e preenchida a partir de modulo.nivel;
+--   - níveis em ENUM (1 byte) no lugar de VARCHAR(50) livre.
+
+SET @existe = (SELECT COUNT(*) FROM information_schema.COLUMNS
+               WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'desempenho_modulo' AND COLUMN_NAME = 'nivel_modulo');
+SET @ddl = IF(@existe = 0,
+              'ALTER TABLE desempenho_modulo ADD COLUMN nivel_modulo VARCHAR(50) NULL AFTER modulo_id',
+              'DO 0');
+PREPARE comando FROM @ddl;
+EXECUTE comando;
+DEALLOCATE PREPARE comando;
+
+UPDATE desempenho_modulo d
+JOIN modulo m ON m.modulo_id = d.modulo_id
+SET d.nivel_modulo = m.nivel
+WHERE d.nivel_modulo IS NULL;
+
+ALTER TABLE modulo
+    MODIFY nivel ENUM('Básico', 'Intermediário', 'Avançado') NOT NULL;
+
+ALTER TABLE aluno
+    MODIFY nivel_curso ENUM('Básico', 'Intermediário', 'Avançado') NOT NULL DEFAULT 'Básico';
+
+ALTER TABLE desempenho_modulo
+    MODIFY nivel_modulo ENUM('Básico', 'Intermediário', 'Avançado') NOT NULL;
@@ -0,0 +1,12 @@
+-- 002: desempenho_modulo agrupado por aluno.
+-- Todas as leituras da tabela são "tudo do aluno X" (SQL_PROGRESSO_ALUNO) e as
+-- escritas são upserts por (aluno_id, modulo_id). Com essa chave como PRIMARY
+-- KEY, as linhas de um aluno ficam juntas no índice agrupado do InnoDB: a
+-- leitura do progresso é uma faixa contínua da chave primária, sem o salto
+-- uk_aluno_modulo -> desempenho_id -> linha. desempenho_id continua único.
+
+ALTER TABLE desempenho_modulo
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (aluno_id, modulo_id),
+    ADD UNIQUE KEY uk_desempenho_id (desempenho_id),
+    DROP INDEX uk_aluno_modulo;
@@ -0,0 +1,144 @@
+"""
+Aplica as migrações do esquema (migracoes/NNN_nome.sql) em ordem.
+
+Cada arquivo é uma versão. As versões aplicadas ficam na tabela
+schema_migracao; o scriptbd.sql já cria o banco na última versão e registra
+todas elas, então migrar.py só faz alguma coisa em bancos criados antes.
+
+No MySQL, DDL faz commit implícito: uma migração que falha no meio não é
+desfeita. A versão só é registrada depois do último comando: confira o
+esquema (python migrar.py --status e SHOW CREATE TABLE) antes de rodar de novo.
+
+Uso:
+    python migrar.py              # aplica as pendentes
+    python migrar.py --status     # lista aplicadas e pendentes
+    python migrar.py --ate 1      # aplica até a versão 1
+
+Conexão: as mesmas variáveis MYSQL_* do app.py.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+from dotenv import load_dotenv
+
+from banco import criar_banco_script
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DIRETORIO_MIGRACOES = os.path.join(BASE_DIR, 'migracoes')
+
+PADRAO_ARQUIVO = re.compile(r'^(\d+)_(\w+)\.sql$')
+
+SQL_CRIAR_CONTROLE = """
+    CREATE TABLE IF NOT EXISTS schema_migracao (
+        versao INT PRIMARY KEY,
+        nome VARCHAR(100) NOT NULL,
+        aplicada_em DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+SQL_APLICADAS = "SELECT versao, nome, aplicada_em FROM schema_migracao ORDER BY versao"
+SQL_REGISTRAR = "INSERT INTO schema_migracao (versao, nome) VALUES (%s, %s)"
+
+
+def listar_migracoes(diretorio=DIRETORIO_MIGRACOES):
+    """[(versao, nome, caminho)] em ordem de versão; versões repetidas são erro."""
+    migracoes = {}
+    for arquivo in sorted(os.listdir(diretorio)):
+        correspondencia = PADRAO_ARQUIVO.match(arquivo)
+        if not correspondencia:
+            continue
+        versao = int(correspondencia.group(1))
+        if versao in migracoes:
+            raise ValueError(f"Versão {versao} repetida: {migracoes[versao][2]} e {arquivo}")
+        migracoes[versao] = (versao, correspondencia.group(2), os.path.join(diretorio, arquivo))
+    return [migracoes[versao] for versao in sorted(migracoes)]
+
+
+def dividir_comandos(texto):
+    """Separa o script em comandos por ';', ignorando os de dentro de aspas e comentários '--'."""
+    comandos = []
+    atual = []
+    aspas = None
+    i = 0
+    while i < len(texto):
+        caractere = texto[i]
+        if aspas:
+            atual.append(caractere)
+            if caractere == '\\' and i + 1 < len(texto):
+                atual.append(texto[i + 1])
+                i += 1
+            elif caractere == aspas:
+                aspas = None
+        elif caractere in ("'", '"', '`'):
+            aspas = caractere
+            atual.append(caractere)
+        elif texto.startswith('--', i):
+            fim = texto.find('\n', i)
+            i = len(texto) if fim == -1 else fim
+            continue
+        elif caractere == ';':
+            comando = ''.join(atual).strip()
+            if comando:
+                comandos.append(comando)
+            atual = []
+        else:
+            atual.append(caractere)
+        i += 1
+    comando = ''.join(atual).strip()
+    if comando:
+        comandos.append(comando)
+    return comandos
+
+
+def aplicar(banco, versao, nome, caminho):
+    with open(caminho, encoding='utf-8') as arquivo:
+        comandos = dividir_comandos(arquivo.read())
+    for numero, comando in enumerate(comandos, start=1):
+        try:
+            banco.executar(comando)
+        except Exception as e:
+            resumo = ' '.join(comando.split())[:120]
+            raise RuntimeError(f"Migração {versao:03d} ({nome}), comando {numero}: {e}\n    {resumo}") from e
+    banco.executar(SQL_REGISTRAR, [versao, nome])
+    banco.commit()
+    return len(comandos)
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--status', action='store_true', help="Só lista as migrações.")
+    parser.add_argument('--ate', type=int, help="Última versão a aplicar.")
+    args = parser.parse_args()
+
+    app, banco = criar_banco_script('migrar')
+    migracoes = listar_migracoes()
+    with app.app_context():
+        banco.executar(SQL_CRIAR_CONTROLE)
+        aplicadas = {linha['versao']: linha for linha in banco.consultar_todos(SQL_APLICADAS)}
+        pendentes = [m for m in migracoes if m[0] not in aplicadas and (args.ate is None or m[0] <= args.ate)]
+
+        if args.status:
+            for versao, nome, _ in migracoes:
+                linha = aplicadas.get(versao)
+                situacao = f"aplicada em {linha['aplicada_em']}" if linha else 'pendente'
+                print(f"{versao:03d} {nome:<40} {situacao}")
+            return
+
+        if not pendentes:
+            print("Esquema atualizado: nenhuma migração pendente.")
+            return
+        for versao, nome, caminho in pendentes:
+            inicio = time.perf_counter()
+            try:
+                quantidade = aplicar(banco, versao, nome, caminho)
+            except RuntimeError as e:
+                print(f"Erro: {e}", file=sys.stderr)
+                sys.exit(1)
+            print(f"{versao:03d} {nome}: {quantidade} comandos em {time.perf_counter() - inicio:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Cache dos dados de perfil dos alunos (tabela `aluno`), por aluno_id.
+
+O login já lê a linha inteira do aluno; ela fica guardada aqui e o perfil é
+respondido sem nova consulta. Quando enviar_atividade sobe o nível do aluno,
+o cache é atualizado no lugar, então a linha continua igual à do banco.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+SQL_PERFIL_ALUNO = """
+    SELECT aluno_id, nome, email, curso_acesso, nivel_curso
+    FROM aluno
+    WHERE aluno_id = %s
+"""
+
+# Login: autenticação e dados do perfil na mesma consulta (índice UNIQUE de email)
+SQL_LOGIN_ALUNO = """
+    SELECT aluno_id, nome, email, senha_hash, curso_acesso, nivel_curso
+    FROM aluno
+    WHERE email = %s
+"""
+
+SQL_EMAIL_CADASTRADO = "SELECT aluno_id FROM aluno WHERE email = %s"
+
+SQL_SENHA_ALUNO = "UPDATE aluno SET senha_hash = %s WHERE aluno_id = %s"
+
+CAMPOS_PERFIL = ('aluno_id', 'nome', 'email', 'curso_acesso', 'nivel_curso')
+
+
+class CachePerfis:
+    """Cache LRU/TTL de {aluno_id, nome, email, curso_acesso, nivel_curso}."""
+
+    def __init__(self, carregador, max_alunos=10000, ttl_segundos=1800):
+        # carregador(aluno_id) -> linha de SQL_PERFIL_ALUNO ou None
+        self._carregador = carregador
+        self._max_alunos = max_alunos
+        self._ttl = ttl_segundos
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._metricas = {'hits': 0, 'misses': 0, 'guardados': 0, 'atualizacoes': 0}
+
+    def obter(self, aluno_id):
+        """Perfil do aluno (consulta o banco só em miss/expiração); None se ele não existir."""
+        agora = time.monotonic()
+        with self._lock:
+            item = self._cache.get(aluno_id)
+            if item and agora - item[0] < self._ttl:
+                self._cache.move_to_end(aluno_id)
+                self._metricas['hits'] += 1
+                return dict(item[1])
+            self._metricas['misses'] += 1
+
+        linha = self._carregador(aluno_id)
+        if linha is None:
+            return None
+        self.guardar(linha, contar=False)
+        return {campo: linha.get(campo) for campo in CAMPOS_PERFIL}
+
+    def guardar(self, linha, contar=True):
+        """Guarda a linha do aluno já lida (ex.: no login); campos extras são ignorados."""
+        perfil = {campo: linha.get(campo) for campo in CAMPOS_PERFIL}
+        with self._lock:
+            self._cache[perfil['aluno_id']] = (time.monotonic(), perfil)
+            self._cache.move_to_end(perfil['aluno_id'])
+            while len(self._cache) > self._max_alunos:
+                self._cache.popitem(last=False)
+            if contar:
+                self._metricas['guardados'] += 1
+
+    def atualizar_nivel(self, aluno_id, nivel_curso):
+        """Espelha o UPDATE aluno SET nivel_curso feito em enviar_atividade."""
+        with self._lock:
+            item = self._cache.get(aluno_id)
+            if item is not None:
+                item[1]['nivel_curso'] = nivel_curso
+                self._metricas['atualizacoes'] += 1
+
+    def invalidar(self, aluno_id=None):
+        with self._lock:
+            if aluno_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(aluno_id, None)
+
+    def estatisticas(self):
+        with self._lock:
+            metricas = dict(self._metricas)
+            metricas['alunos'] = len(self._cache)
+        consultas = metricas['hits'] + metricas['misses']
+        metricas['taxa_acerto'] = round(metricas['hits'] / consultas, 4) if consultas else 0.0
+        return metricas
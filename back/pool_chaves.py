@@ -0,0 +1,213 @@
+"""
+Pool das chaves da API Gemini (GENAI_KEY_1..N) com pontuação de saúde.
+
+Em vez de um único cliente global que é trocado quando uma chave esgota, cada
+chave tem o seu cliente e o seu estado: cooldown após rate limit (429), período
+longo de bloqueio para chave inválida (401/403) e uma taxa de erro com média
+móvel. Cada requisição usa a chave mais saudável disponível, e uma sessão de
+chat que precisa trocar de chave leva junto o histórico da conversa.
+
+Com rpm_por_chave, cada chave tem também um balde de tokens com o limite de
+requisições por minuto dela: consumir_token() só entrega uma chave com token
+livre (usado pela FilaJusta de limites.py), evitando chegar ao 429.
+"""
+import threading
+import time
+
+from google.genai import errors as genai_errors
+from google.genai import types
+
+from limites import BaldeTokens
+
+ERRO_COTA = 'cota'
+ERRO_CHAVE_INVALIDA = 'invalida'
+ERRO_OUTRO = 'outro'
+
+
+def classificar_erro_chave(erro):
+    """
+    Retorna ERRO_COTA ou ERRO_CHAVE_INVALIDA para erros que dependem da chave
+    usada (e justificam tentar outra), ou None para os demais erros.
+    """
+    if isinstance(erro, genai_errors.APIError):
+        if erro.code == 429:
+            return ERRO_COTA
+        if erro.code in (401, 403):
+            return ERRO_CHAVE_INVALIDA
+    return None
+
+
+class EstadoChave:
+    """Cliente e saúde de uma chave de API."""
+
+    __slots__ = ('indice', 'cliente', 'cooldown_ate', 'sucessos', 'erros',
+                 'taxa_erro', 'em_uso', 'ultimo_uso', 'balde')
+
+    def __init__(self, indice, cliente, balde=None):
+        self.indice = indice
+        self.cliente = cliente
+        self.cooldown_ate = 0.0
+        self.sucessos = 0
+        self.erros = 0
+        # Média móvel exponencial de falhas (0 = saudável, 1 = sempre falha)
+        self.taxa_erro = 0.0
+        self.em_uso = 0
+        self.ultimo_uso = 0.0
+        # Limite de requisições por minuto da chave (None = sem limite local)
+        self.balde = balde
+
+    def disponivel(self, agora=None):
+        return (agora or time.monotonic()) >= self.cooldown_ate
+
+
+class PoolChavesGemini:
+
+    def __init__(self, chaves, fabrica_cliente, cooldown_cota=60.0,
+                 cooldown_chave_invalida=3600.0, suavizacao=0.2, rpm_por_chave=0):
+        if not chaves:
+            raise ValueError("O pool precisa de pelo menos uma chave.")
+        # Rajada de até 10 s de cota; depois, uma requisição a cada 60/rpm segundos
+        self._estados = [
+            EstadoChave(i, fabrica_cliente(chave),
+                        BaldeTokens(max(1, rpm_por_chave // 6), rpm_por_chave / 60) if rpm_por_chave else None)
+            for i, chave in enumerate(chaves)
+        ]
+        self.cooldown_cota = cooldown_cota
+        self.cooldown_chave_invalida = cooldown_chave_invalida
+        self.suavizacao = suavizacao
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._estados)
+
+    def escolher(self, excluir=()):
+        """
+        Chave mais saudável fora de cooldown (menor taxa de erro, depois menos
+        chamadas em andamento, depois a usada há mais tempo). None se nenhuma servir.
+        """
+        agora = time.monotonic()
+        with self._lock:
+            candidatas = [
+                estado for estado in self._estados
+                if estado.indice not in excluir and estado.disponivel(agora)
+            ]
+            if not candidatas:
+                return None
+            escolhida = min(candidatas, key=self._ordem_saude)
+            escolhida.ultimo_uso = agora
+            return escolhida
+
+    @staticmethod
+    def _ordem_saude(estado):
+        return (round(estado.taxa_erro, 2), estado.em_uso, estado.ultimo_uso)
+
+    def consumir_token(self, preferida=None):
+        """
+        Chave disponível com um token de cota já consumido: a preferida (a da
+        sessão de chat) se ela tiver token, senão a mais saudável que tiver.
+        None se nenhuma tiver token agora (veja espera_token()).
+        """
+        agora = time.monotonic()
+        with self._lock:
+            candidatas = sorted((e for e in self._estados if e.disponivel(agora)), key=self._ordem_saude)
+            if preferida is not None and preferida in candidatas:
+                candidatas.remove(preferida)
+                candidatas.insert(0, preferida)
+            for estado in candidatas:
+                if estado.balde is None or estado.balde.consumir(agora) == 0.0:
+                    estado.ultimo_uso = agora
+                    return estado
+        return None
+
+    def espera_token(self):
+        """Segundos até alguma chave ter token (e estar fora de cooldown)."""
+        agora = time.monotonic()
+        with self._lock:
+            return min(
+                max(estado.cooldown_ate - agora, estado.balde.espera(agora) if estado.balde else 0.0, 0.0)
+                for estado in self._estados
+            )
+
+    def taxa_total(self):
+        """Tokens por segundo somando as chaves com limite (0 se nenhuma tem)."""
+        return sum(estado.balde.taxa for estado in self._estados if estado.balde is not None)
+
+    def iniciar_uso(self, estado):
+        with self._lock:
+            estado.em_uso += 1
+
+    def reportar_sucesso(self, estado):
+        with self._lock:
+            estado.em_uso = max(0, estado.em_uso - 1)
+            estado.sucessos += 1
+            estado.taxa_erro *= (1 - self.suavizacao)
+
+    def reportar_erro(self, estado, tipo):
+        with self._lock:
+            estado.em_uso = max(0, estado.em_uso - 1)
+            estado.erros += 1
+            estado.taxa_erro = estado.taxa_erro * (1 - self.suavizacao) + self.suavizacao
+            if tipo == ERRO_COTA:
+                estado.cooldown_ate = time.monotonic() + self.cooldown_cota
+            elif tipo == ERRO_CHAVE_INVALIDA:
+                estado.cooldown_ate = time.monotonic() + self.cooldown_chave_invalida
+
+    def estatisticas(self):
+        agora = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    'indice': estado.indice,
+                    'disponivel': estado.disponivel(agora),
+                    'cooldown_restante_s': max(0.0, estado.cooldown_ate - agora),
+                    'sucessos': estado.sucessos,
+                    'erros': estado.erros,
+                    'taxa_erro': round(estado.taxa_erro, 4),
+                    'em_uso': estado.em_uso,
+                    'tokens': round(estado.balde.tokens, 2) if estado.balde else None,
+                }
+                for estado in self._estados
+            ]
+
+
+class SessaoChat:
+    """
+    Sessão de chat de um aluno ligada a uma chave do pool. Guarda modelo e
+    configuração para poder recriar a conversa em outra chave sem perder contexto.
+    config_para_chave(estado_chave), se informado, dá a configuração de cada
+    chave (um cache de contexto do Gemini só vale na chave que o criou).
+    """
+
+    def __init__(self, curso, modelo, config, estado_chave, historico=None, config_para_chave=None):
+        self.curso = curso
+        self.modelo = modelo
+        self.config = config
+        self.config_para_chave = config_para_chave
+        self.estado_chave = estado_chave
+        self.chat = estado_chave.cliente.chats.create(model=modelo, config=config, history=historico)
+
+    def migrar_para(self, estado_chave):
+        """Recria o chat no cliente de outra chave, reenviando o histórico atual."""
+        historico = self.chat.get_history(curated=True)
+        if self.config_para_chave is not None:
+            self.config = self.config_para_chave(estado_chave)
+        self.chat = estado_chave.cliente.chats.create(
+            model=self.modelo,
+            config=self.config,
+            history=list(historico) or None
+        )
+        self.estado_chave = estado_chave
+
+    def sem_historico(self):
+        """True se a conversa ainda não tem nenhuma troca (primeira pergunta)."""
+        return not self.chat.get_history(curated=True)
+
+    def acrescentar_troca(self, pergunta, resposta):
+        """
+        Inclui no histórico uma troca respondida fora deste chat (resposta
+        compartilhada de outra sessão); as próximas perguntas têm esse contexto.
+        """
+        historico = list(self.chat.get_history(curated=True))
+        historico.append(types.Content(role='user', parts=[types.Part(text=pergunta)]))
+        historico.append(types.Content(role='model', parts=[types.Part(text=resposta)]))
+        self.chat = self.estado_chave.cliente.chats.create(model=self.modelo, config=self.config, history=historico)
@@ -0,0 +1,152 @@
+"""
+Progresso dos alunos (tabela `desempenho_modulo`) com cache por aluno.
+
+Todo o estado de progresso de um aluno é lido em uma única consulta e guardado
+em memória como um SnapshotProgresso. Curso, perfil e as validações de acesso
+dos módulos são respondidos a partir dele, junto com a EstruturaCurso.
+Quando enviar_atividade grava um resultado, o snapshot é atualizado no lugar.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+SQL_PROGRESSO_ALUNO = """
+    SELECT modulo_id, nivel_modulo, status_modulo, nota_final, data_conclusao
+    FROM desempenho_modulo
+    WHERE aluno_id = %s
+"""
+
+STATUS_CONCLUIDO = 'Concluído'
+STATUS_EM_ANDAMENTO = 'Em Andamento'
+STATUS_NAO_INICIADO = 'Não Iniciado'
+
+
+class SnapshotProgresso:
+    """Todas as linhas de desempenho_modulo de um aluno, indexadas por modulo_id."""
+
+    def __init__(self, aluno_id, linhas):
+        self.aluno_id = aluno_id
+        self.registros = {linha['modulo_id']: dict(linha) for linha in linhas}
+
+    def registro(self, modulo_id):
+        return self.registros.get(modulo_id)
+
+    def status(self, modulo_id, nivel=None):
+        """Status do módulo; se `nivel` for informado, o registro precisa ser desse nível."""
+        registro = self.registros.get(modulo_id)
+        if not registro:
+            return None
+        if nivel is not None and registro.get('nivel_modulo') != nivel:
+            return None
+        return registro['status_modulo']
+
+    def concluido(self, modulo_id, nivel=None):
+        return self.status(modulo_id, nivel) == STATUS_CONCLUIDO
+
+    def modulos_com_progresso(self, modulos):
+        """Lista usada pelo curso_home: cada módulo com status e nota do aluno."""
+        resultado = []
+        for modulo in modulos:
+            registro = self.registros.get(modulo['modulo_id'])
+            resultado.append({
+                'modulo_id': modulo['modulo_id'],
+                'nome': modulo['nome'],
+                'ordem': modulo['ordem'],
+                'status': registro['status_modulo'] if registro else STATUS_NAO_INICIADO,
+                'nota_final': registro.get('nota_final') if registro else None
+            })
+        return resultado
+
+    def modulos_concluidos(self, estrutura, curso_acesso):
+        """Quantidade de módulos concluídos do curso informado."""
+        total = 0
+        for modulo_id, registro in self.registros.items():
+            if registro['status_modulo'] != STATUS_CONCLUIDO:
+                continue
+            modulo = estrutura.modulo_por_id(modulo_id)
+            if modulo and modulo['curso_acesso'] == curso_acesso:
+                total += 1
+        return total
+
+    def atividades_recentes(self, estrutura, limite=5):
+        """Últimos módulos concluídos (nome e data), do mais recente para o mais antigo."""
+        concluidos = [
+            registro for registro in self.registros.values()
+            if registro['status_modulo'] == STATUS_CONCLUIDO and registro.get('data_conclusao')
+        ]
+        concluidos.sort(key=lambda r: r['data_conclusao'], reverse=True)
+
+        atividades = []
+        for registro in concluidos[:limite]:
+            modulo = estrutura.modulo_por_id(registro['modulo_id'])
+            atividades.append({
+                'nome': modulo['nome'] if modulo else '',
+                'data_conclusao': registro['data_conclusao']
+            })
+        return atividades
+
+
+class ServicoProgresso:
+    """Cache LRU de SnapshotProgresso por aluno_id."""
+
+    def __init__(self, carregador, max_alunos=5000, ttl_segundos=300):
+        # carregador(aluno_id) -> linhas de SQL_PROGRESSO_ALUNO
+        self._carregador = carregador
+        self._max_alunos = max_alunos
+        self._ttl = ttl_segundos
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, aluno_id):
+        """Snapshot do aluno (uma consulta ao banco só em caso de miss/expiração)."""
+        agora = time.monotonic()
+        with self._lock:
+            item = self._cache.get(aluno_id)
+            if item and agora - item[0] < self._ttl:
+                self._cache.move_to_end(aluno_id)
+                return item[1]
+
+        snapshot = SnapshotProgresso(aluno_id, self._carregador(aluno_id))
+        with self._lock:
+            self._cache[aluno_id] = (agora, snapshot)
+            self._cache.move_to_end(aluno_id)
+            while len(self._cache) > self._max_alunos:
+                self._cache.popitem(last=False)
+        return snapshot
+
+    def invalidar(self, aluno_id=None):
+        """Descarta o snapshot de um aluno (ou de todos, se aluno_id for None)."""
+        with self._lock:
+            if aluno_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(aluno_id, None)
+
+    def _snapshot_em_cache(self, aluno_id):
+        with self._lock:
+            item = self._cache.get(aluno_id)
+        return item[1] if item else None
+
+    def registrar_resultado(self, aluno_id, modulo_id, nivel, status, nota_final):
+        """Espelha o upsert de resultado feito em enviar_atividade."""
+        snapshot = self._snapshot_em_cache(aluno_id)
+        if snapshot is None:
+            return
+        registro = snapshot.registros.setdefault(modulo_id, {'modulo_id': modulo_id, 'nivel_modulo': nivel})
+        registro['status_modulo'] = status
+        registro['nota_final'] = nota_final
+        registro['data_conclusao'] = datetime.now()
+
+    def registrar_desbloqueio(self, aluno_id, modulo_id, nivel):
+        """Espelha o desbloqueio (INSERT ... ON DUPLICATE KEY UPDATE sem alteração)."""
+        snapshot = self._snapshot_em_cache(aluno_id)
+        if snapshot is None or modulo_id in snapshot.registros:
+            return
+        snapshot.registros[modulo_id] = {
+            'modulo_id': modulo_id,
+            'nivel_modulo': nivel,
+            'status_modulo': STATUS_EM_ANDAMENTO,
+            'nota_final': None,
+            'data_conclusao': None
+        }
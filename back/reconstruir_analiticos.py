@@ -0,0 +1,76 @@
+"""
+Reconstrói os analíticos da turma a partir do histórico do banco, em lote.
+
+Lê `desempenho_modulo` (e o nome dos alunos) em uma única consulta, monta as
+faixas de nota, a aprovação e o ranking de cada módulo com o mesmo código que
+o app usa na inicialização e mostra o resumo. Os erros por questão vêm do
+arquivo salvo pelo app (ANALITICOS_ARQUIVO), porque o banco não guarda as
+respostas.
+
+Uso:
+    python reconstruir_analiticos.py                  # tabela com todos os módulos
+    python reconstruir_analiticos.py --modulo 2       # resumo completo de um módulo (JSON)
+    python reconstruir_analiticos.py --saida analiticos.json
+
+Conexão: as mesmas variáveis MYSQL_* do app.py.
+"""
+import argparse
+import json
+import os
+import time
+
+from dotenv import load_dotenv
+
+from analiticos import AnaliticosTurma, SQL_HISTORICO_NOTAS
+from banco import criar_banco_script
+from estrutura_curso import SQL_MODULOS
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--arquivo', default=os.getenv('ANALITICOS_ARQUIVO',
+                                                        os.path.join(BASE_DIR, 'analiticos_questoes.json')),
+                        help="Erros por questão salvos pelo app.")
+    parser.add_argument('--modulo', type=int, help="Mostra o resumo completo de um modulo_id.")
+    parser.add_argument('--ranking', type=int, default=10, help="Tamanho do ranking.")
+    parser.add_argument('--saida', help="Grava o resumo de todos os módulos neste arquivo JSON.")
+    args = parser.parse_args()
+
+    app, banco = criar_banco_script('reconstruir_analiticos')
+    analiticos = AnaliticosTurma(tamanho_ranking=args.ranking)
+    analiticos.carregar_arquivo(args.arquivo)
+
+    inicio = time.perf_counter()
+    with app.app_context():
+        linhas = banco.consultar_todos(SQL_HISTORICO_NOTAS)
+        modulos = {linha['modulo_id']: linha for linha in banco.consultar_todos(SQL_MODULOS)}
+    leitura = time.perf_counter() - inicio
+    analiticos.reconstruir(linhas)
+    total = time.perf_counter() - inicio
+    print(f"{len(linhas)} notas lidas em {leitura * 1000:.1f} ms; "
+          f"analíticos reconstruídos em {total * 1000:.1f} ms\n")
+
+    if args.modulo is not None:
+        print(json.dumps(analiticos.resumo(args.modulo), ensure_ascii=False, indent=2))
+        return
+
+    resumos = [analiticos.resumo(modulo_id) for modulo_id in sorted(analiticos.modulos())]
+    print(f"{'id':>4} {'módulo':<45} {'alunos':>6} {'aprov.':>7} {'média':>6}  questão mais errada")
+    for resumo in resumos:
+        nome = modulos.get(resumo['modulo_id'], {}).get('nome', '?')
+        erros = resumo['erros_por_questao']
+        mais_errada = f"{erros[0]['questao']} ({erros[0]['taxa_erro']:.0%})" if erros else '-'
+        print(f"{resumo['modulo_id']:>4} {nome[:45]:<45} {resumo['alunos']:>6} "
+              f"{resumo['taxa_aprovacao']:>7.0%} {resumo['nota_media']:>6.1f}  {mais_errada}")
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(resumos, arquivo, ensure_ascii=False, indent=2)
+        print(f"\nResumo gravado em {args.saida}")
+
+
+if __name__ == '__main__':
+    main()
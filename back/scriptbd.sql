@@ -1,6 +1,16 @@
 CREATE DATABASE IF NOT EXISTS levelup CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
 USE levelup;
 
+-- Esquema já com todas as migrações de migracoes/ (ver migrar.py).
+-- Bancos criados com uma versão anterior deste script: python migrar.py
+
+-- 0. Controle das migrações aplicadas
+CREATE TABLE schema_migracao (
+    versao INT PRIMARY KEY,
+    nome VARCHAR(100) NOT NULL,
+    aplicada_em DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
 -- 1. Tabela ALUNO - Adicionado o campo 'nivel_curso'
 CREATE TABLE aluno (
     aluno_id INT PRIMARY KEY AUTO_INCREMENT,
@@ -8,7 +18,7 @@ CREATE TABLE aluno (
     email VARCHAR(100) NOT NULL UNIQUE,
     senha_hash VARCHAR(255) NOT NULL,
     curso_acesso ENUM('Inglês', 'Espanhol') NOT NULL,
-    nivel_curso VARCHAR(50) NOT NULL DEFAULT 'Básico' -- NOVO CAMPO para rastrear o nível atual do aluno
+    nivel_curso ENUM('Básico', 'Intermediário', 'Avançado') NOT NULL DEFAULT 'Básico' -- nível atual do aluno
 );
 
 -- 2. Tabela MODULO - Adicionado o campo 'nivel' e ajustada a chave única
@@ -16,26 +26,34 @@ CREATE TABLE modulo (
     modulo_id INT PRIMARY KEY AUTO_INCREMENT,
     nome VARCHAR(100) NOT NULL,
     ordem INT NOT NULL,
-    nivel VARCHAR(50) NOT NULL, -- CAMPO ADICIONADO para identificar o nível do módulo (Básico, Intermediário, etc.)
+    nivel ENUM('Básico', 'Intermediário', 'Avançado') NOT NULL, -- nível do módulo
     curso_acesso ENUM('Inglês', 'Espanhol') NOT NULL,
     -- Chave única agora combina curso, nível e ordem, permitindo "Módulo 1" em vários níveis.
     UNIQUE KEY uk_curso_nivel_ordem (curso_acesso, nivel, ordem) 
 );
 
--- 3. Tabela DESEMPENHO_MODULO - Sem alterações, já estava completa
+-- 3. Tabela DESEMPENHO_MODULO
+-- Chave primária (aluno_id, modulo_id): as linhas de um aluno ficam juntas no
+-- índice agrupado, e o progresso dele é lido em uma faixa contínua (migração 002)
 CREATE TABLE desempenho_modulo (
-    desempenho_id INT PRIMARY KEY AUTO_INCREMENT,
+    desempenho_id INT NOT NULL AUTO_INCREMENT,
     aluno_id INT NOT NULL,
     modulo_id INT NOT NULL,
+    nivel_modulo ENUM('Básico', 'Intermediário', 'Avançado') NOT NULL, -- nível do módulo na hora do envio
     status_modulo ENUM('Não Iniciado', 'Em Andamento', 'Concluído') DEFAULT 'Não Iniciado',
     nota_final DECIMAL(5,2),
     data_conclusao DATETIME,
 
+    PRIMARY KEY (aluno_id, modulo_id),
+    UNIQUE KEY uk_desempenho_id (desempenho_id),
     FOREIGN KEY (aluno_id) REFERENCES aluno(aluno_id),
-    FOREIGN KEY (modulo_id) REFERENCES modulo(modulo_id),
-    UNIQUE KEY uk_aluno_modulo (aluno_id, modulo_id) 
+    FOREIGN KEY (modulo_id) REFERENCES modulo(modulo_id)
 );
 
+INSERT INTO schema_migracao (versao, nome) VALUES
+(1, 'nivel_modulo_e_enums'),
+(2, 'desempenho_por_aluno');
+
 -- 4. INSERTS para MODULO - Atualizados para incluir o campo 'nivel'
 -- INGLÊS (Nível Básico)
 INSERT INTO modulo (nome, ordem, nivel, curso_acesso) VALUES 
@@ -0,0 +1,179 @@
+"""
+Hash de senhas dos alunos.
+
+Formato atual (versionado, cabe em aluno.senha_hash VARCHAR(255)):
+    scrypt$<n>$<r>$<p>$<salt base64>$<hash base64>
+Formato legado: SHA-256 em hexadecimal, sem salt (64 caracteres). Um hash
+legado continua aceito no login e é trocado pelo formato atual assim que a
+senha é confirmada (o mesmo vale para hashes scrypt com parâmetros antigos).
+
+O scrypt é caro de propósito (CPU e memória). Para não travar o hub do
+eventlet, o ServicoSenhas roda o KDF fora das green threads:
+  - 'tpool': pool de threads nativas do eventlet. O hashlib.scrypt libera o
+    GIL durante o cálculo, então as threads rodam em paralelo de verdade;
+  - 'processos': ProcessPoolExecutor, para scripts sem eventlet (importação
+    em massa, benchmarks);
+  - 'direto': na própria thread (testes e ferramentas de linha de comando).
+"""
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import namedtuple
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+
+from metricas import JanelaLatencias
+
+PREFIXO_SCRYPT = 'scrypt'
+TAMANHO_SALT = 16
+TAMANHO_HASH = 32
+# Parâmetros padrão: ~16 MB de memória por hash (128 * r * n bytes)
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+MODO_TPOOL = 'tpool'
+MODO_PROCESSOS = 'processos'
+MODO_DIRETO = 'direto'
+
+ResultadoVerificacao = namedtuple('ResultadoVerificacao', ['valida', 'precisa_atualizar'])
+
+
+def _b64(dados):
+    return base64.b64encode(dados).decode('ascii').rstrip('=')
+
+
+def _de_b64(texto):
+    return base64.b64decode(texto + '=' * (-len(texto) % 4))
+
+
+def _scrypt(senha, salt, n, r, p, tamanho=TAMANHO_HASH):
+    return hashlib.scrypt(senha.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * r * n, dklen=tamanho)
+
+
+def gerar_hash(senha, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    salt = os.urandom(TAMANHO_SALT)
+    return f"{PREFIXO_SCRYPT}${n}${r}${p}${_b64(salt)}${_b64(_scrypt(senha, salt, n, r, p))}"
+
+
+def hash_legado(senha):
+    """SHA-256 sem salt usado pelas versões antigas do cadastro."""
+    return hashlib.sha256(senha.encode()).hexdigest()
+
+
+def eh_legado(armazenado):
+    return len(armazenado) == 64 and all(c in '0123456789abcdef' for c in armazenado.lower())
+
+
+def verificar_hash(senha, armazenado, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    """
+    Confere a senha com o hash guardado. `precisa_atualizar` indica que a senha
+    está certa mas o hash deve ser regravado (legado ou parâmetros diferentes de n, r, p).
+    """
+    if not armazenado:
+        return ResultadoVerificacao(False, False)
+
+    if eh_legado(armazenado):
+        valida = hmac.compare_digest(hash_legado(senha), armazenado.lower())
+        return ResultadoVerificacao(valida, valida)
+
+    partes = armazenado.split('$')
+    if len(partes) != 6 or partes[0] != PREFIXO_SCRYPT:
+        return ResultadoVerificacao(False, False)
+    try:
+        n_salvo, r_salvo, p_salvo = int(partes[1]), int(partes[2]), int(partes[3])
+        salt, esperado = _de_b64(partes[4]), _de_b64(partes[5])
+    except (ValueError, TypeError):
+        return ResultadoVerificacao(False, False)
+
+    valida = hmac.compare_digest(_scrypt(senha, salt, n_salvo, r_salvo, p_salvo, len(esperado)), esperado)
+    return ResultadoVerificacao(valida, valida and (n_salvo, r_salvo, p_salvo) != (n, r, p))
+
+
+class ServicoSenhas:
+
+    def __init__(self, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P, modo=MODO_DIRETO, max_simultaneos=None):
+        if modo not in (MODO_TPOOL, MODO_PROCESSOS, MODO_DIRETO):
+            raise ValueError(f"Modo de hash de senha desconhecido: {modo}")
+        self.n, self.r, self.p = n, r, p
+        self.modo = modo
+        self.max_simultaneos = max_simultaneos or os.cpu_count() or 2
+        # Cada scrypt usa ~128*r*n bytes: limita quantos rodam ao mesmo tempo
+        self._vagas = threading.BoundedSemaphore(self.max_simultaneos)
+        self._processos = None
+        self._lock = threading.Lock()
+        self._metricas = {'hashes': 0, 'verificacoes': 0, 'falhas_verificacao': 0, 'hashes_desatualizados': 0}
+        self.latencias = JanelaLatencias()
+
+    def _executar(self, funcao, *args):
+        with self._vagas:
+            inicio = time.monotonic()
+            if self.modo == MODO_TPOOL:
+                from eventlet import tpool
+                resultado = tpool.execute(funcao, *args)
+            elif self.modo == MODO_PROCESSOS:
+                resultado = self._pool_processos().submit(funcao, *args).result()
+            else:
+                resultado = funcao(*args)
+            self.latencias.registrar(time.monotonic() - inicio)
+        return resultado
+
+    def _pool_processos(self):
+        with self._lock:
+            if self._processos is None:
+                self._processos = ProcessPoolExecutor(max_workers=self.max_simultaneos)
+            return self._processos
+
+    def gerar(self, senha):
+        """Hash no formato atual para gravar em aluno.senha_hash."""
+        resultado = self._executar(gerar_hash, senha, self.n, self.r, self.p)
+        with self._lock:
+            self._metricas['hashes'] += 1
+        return resultado
+
+    def gerar_varios(self, senhas):
+        """
+        Hashes de várias senhas, na mesma ordem. No modo 'processos' o lote é
+        repartido entre os processos do pool (importação em massa).
+        """
+        senhas = list(senhas)
+        if self.modo != MODO_PROCESSOS:
+            return [self.gerar(senha) for senha in senhas]
+        quantidade = len(senhas)
+        # Pedaços grandes o bastante para diluir o envio entre processos,
+        # pequenos o bastante para todos os processos terem trabalho
+        pedaco = max(1, quantidade // (self.max_simultaneos * 4))
+        resultado = list(self._pool_processos().map(
+            gerar_hash, senhas, repeat(self.n, quantidade), repeat(self.r, quantidade),
+            repeat(self.p, quantidade), chunksize=pedaco))
+        with self._lock:
+            self._metricas['hashes'] += quantidade
+        return resultado
+
+    def verificar(self, senha, armazenado):
+        resultado = self._executar(verificar_hash, senha, armazenado or '', self.n, self.r, self.p)
+        with self._lock:
+            self._metricas['verificacoes'] += 1
+            if not resultado.valida:
+                self._metricas['falhas_verificacao'] += 1
+            if resultado.precisa_atualizar:
+                self._metricas['hashes_desatualizados'] += 1
+        return resultado
+
+    def fechar(self):
+        with self._lock:
+            if self._processos is not None:
+                self._processos.shutdown()
+                self._processos = None
+
+    def estatisticas(self):
+        with self._lock:
+            metricas = dict(self._metricas)
+        metricas['modo'] = self.modo
+        metricas['parametros'] = {'n': self.n, 'r': self.r, 'p': self.p}
+        metricas['latencia_s'] = self.latencias.resumo()
+        return metricas
@@ -0,0 +1,202 @@
+"""
+Sobe o LevelUp com vários processos (workers) na mesma máquina.
+
+Um processo eventlet usa um núcleo só. Este lançador sobe N cópias do app.py
+(portas PORTA_BASE, PORTA_BASE+1, ...) ligadas por uma fila de mensagens do
+Socket.IO. Cada worker grava o próprio diário de progresso. O histórico de
+chat (SQLite) é o mesmo para todos, com versão por conversa.
+
+    python servidor_multiprocesso.py --workers 4
+    python servidor_multiprocesso.py --workers 4 --message-queue redis://127.0.0.1:6379/0
+
+Sem --message-queue, o broker local (broker_local.py) roda dentro do lançador.
+
+Roteamento: o transporte long-polling do Socket.IO exige que todas as
+requisições de um cliente caiam no mesmo worker (sticky). Com --proxy, o
+lançador escuta em --porta e escolhe o worker pelo IP do cliente (como o
+ip_hash do nginx). Em produção, use o nginx:
+
+    upstream levelup {
+        ip_hash;
+        server 127.0.0.1:5001;
+        server 127.0.0.1:5002;
+    }
+
+O proxy é TCP: para os workers, todo cliente vem do endereço do proxy. Por
+isso ele conecta nos workers a partir de --origem-proxy (127.0.0.2), que não
+está em METRICAS_ENDERECOS: /metrics continua só para quem acessa os workers
+direto de 127.0.0.1, e não para a internet através do proxy. Um
+METRICAS_ENDERECOS que inclua a origem do proxy é recusado. Nada no app usa o
+remote_addr como identidade do aluno (os limites são por conexão e por aluno).
+Com o nginx, bloqueie /metrics no próprio nginx.
+
+Os caches de progresso e de perfil são de cada processo, assim como os erros
+por questão dos analíticos (cada worker salva o seu arquivo). As notas e o
+ranking dos analíticos são reconstruídos do banco a cada
+ANALITICOS_RECONSTRUIR_S (60 s), então as correções feitas em outro worker
+aparecem com esse atraso. O sticky por IP mantém
+o aluno no mesmo worker; o chat não depende disso, porque confere a versão do
+histórico a cada mensagem.
+"""
+import argparse
+import hashlib
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+from broker_local import PORTA_PADRAO, PREFIXO_URL, iniciar_broker_em_thread
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def iniciar_workers(quantidade, porta_base, message_queue, ambiente_extra=None, saida=None):
+    """Sobe `quantidade` processos do app.py; retorna a lista de (porta, Popen)."""
+    workers = []
+    for indice in range(quantidade):
+        porta = porta_base + indice
+        ambiente = dict(os.environ)
+        ambiente.update({
+            'PORTA': str(porta),
+            'SOCKETIO_MESSAGE_QUEUE': message_queue,
+            'CHAT_COMPARTILHADO': '1',
+            # O diário do write-behind é de um processo só (ele é rotacionado a cada lote)
+            'PROGRESSO_DIARIO': os.path.join(BASE_DIR, f'progresso_diario.{porta}.jsonl'),
+            'ANALITICOS_ARQUIVO': os.path.join(BASE_DIR, f'analiticos_questoes.{porta}.json'),
+        })
+        ambiente.update(ambiente_extra or {})
+        processo = subprocess.Popen([sys.executable, os.path.join(BASE_DIR, 'app.py')],
+                                    cwd=BASE_DIR, env=ambiente, stdout=saida, stderr=saida)
+        workers.append((porta, processo))
+    return workers
+
+
+def esperar_portas(portas, host='127.0.0.1', timeout=60.0):
+    """Espera até todas as portas aceitarem conexão (ou levanta TimeoutError)."""
+    limite = time.monotonic() + timeout
+    pendentes = list(portas)
+    while pendentes:
+        porta = pendentes[0]
+        try:
+            socket.create_connection((host, porta), timeout=1).close()
+            pendentes.pop(0)
+        except OSError:
+            if time.monotonic() > limite:
+                raise TimeoutError(f"Worker na porta {porta} não subiu em {timeout}s.")
+            time.sleep(0.2)
+
+
+def parar_workers(workers, timeout=10.0):
+    for _, processo in workers:
+        if processo.poll() is None:
+            processo.send_signal(signal.SIGINT)
+    limite = time.monotonic() + timeout
+    for _, processo in workers:
+        try:
+            processo.wait(max(0.1, limite - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            processo.kill()
+
+
+def worker_do_cliente(ip, portas):
+    """Worker fixo por IP do cliente (hash estável entre reinícios do lançador)."""
+    resumo = hashlib.sha1(ip.encode('utf-8')).digest()
+    return portas[int.from_bytes(resumo[:4], 'big') % len(portas)]
+
+
+def validar_origem_proxy(origem):
+    """Erro (texto) se /metrics ficaria exposto pelo proxy ou se a origem não pode ser usada; None se ok."""
+    enderecos = {e.strip() for e in os.getenv('METRICAS_ENDERECOS', '').split(',') if e.strip()}
+    if origem in enderecos:
+        return f"METRICAS_ENDERECOS inclui {origem}, a origem do proxy: /metrics ficaria aberto pelo proxy."
+    teste = socket.socket()
+    try:
+        teste.bind((origem, 0))
+    except OSError as e:
+        return (f"Não foi possível usar {origem} como origem do proxy ({e}). "
+                "Informe outro endereço de loopback em --origem-proxy.")
+    finally:
+        teste.close()
+    return None
+
+
+def servir_proxy(host, porta, portas_workers, origem='127.0.0.2'):
+    """Proxy TCP com afinidade por IP na frente dos workers (roda até Ctrl+C)."""
+    import eventlet
+
+    def repassar(origem, destino):
+        try:
+            while True:
+                dados = origem.recv(65536)
+                if not dados:
+                    break
+                destino.sendall(dados)
+        except OSError:
+            pass
+        finally:
+            for conexao in (origem, destino):
+                try:
+                    conexao.close()
+                except OSError:
+                    pass
+
+    def atender(cliente, endereco):
+        try:
+            worker = eventlet.connect(('127.0.0.1', worker_do_cliente(endereco[0], portas_workers)),
+                                      bind=(origem, 0))
+        except OSError:
+            cliente.close()
+            return
+        eventlet.spawn_n(repassar, cliente, worker)
+        repassar(worker, cliente)
+
+    servidor = eventlet.listen((host, porta))
+    print(f"Proxy com afinidade por IP em {host}:{porta} -> workers {portas_workers}")
+    eventlet.serve(servidor, atender)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--porta-base', type=int, default=5001, help="Porta do primeiro worker.")
+    parser.add_argument('--message-queue', default=None,
+                        help="URL da fila (redis://...). Padrão: broker local em --porta-broker.")
+    parser.add_argument('--porta-broker', type=int, default=PORTA_PADRAO)
+    parser.add_argument('--proxy', action='store_true', help="Sobe o proxy com afinidade por IP em --porta.")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--porta', type=int, default=5000)
+    parser.add_argument('--origem-proxy', default='127.0.0.2',
+                        help="Endereço de loopback de onde o proxy conecta nos workers (fora de METRICAS_ENDERECOS).")
+    args = parser.parse_args()
+
+    if args.proxy:
+        erro = validar_origem_proxy(args.origem_proxy)
+        if erro:
+            parser.error(erro)
+
+    message_queue = args.message_queue
+    if not message_queue:
+        iniciar_broker_em_thread('127.0.0.1', args.porta_broker)
+        message_queue = f"{PREFIXO_URL}127.0.0.1:{args.porta_broker}"
+
+    workers = iniciar_workers(args.workers, args.porta_base, message_queue)
+    portas = [porta for porta, _ in workers]
+    try:
+        esperar_portas(portas)
+        print(f"{len(workers)} workers nas portas {portas} (fila: {message_queue})")
+        if args.proxy:
+            servir_proxy(args.host, args.porta, portas, args.origem_proxy)
+        else:
+            while all(processo.poll() is None for _, processo in workers):
+                time.sleep(1)
+            print("Um worker terminou; encerrando os demais.")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        parar_workers(workers)
+
+
+if __name__ == '__main__':
+    main()
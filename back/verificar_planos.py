@@ -0,0 +1,103 @@
+"""
+Confere, com EXPLAIN, o plano das consultas que o app faz a cada requisição.
+
+Cada consulta quente precisa usar um índice (nada de varredura completa, tipo
+ALL, nem de varredura inteira de um índice, tipo index). As marcadas com
+cobertura precisam ser respondidas só pelo índice: 'Using index' ou a chave
+primária, que no InnoDB é o próprio índice agrupado com a linha inteira.
+As leituras em lote (estrutura dos cursos, reconstrução dos analíticos,
+importação) leem a tabela toda de propósito: o plano delas só é mostrado.
+
+Com qualquer consulta quente fora da regra o comando sai com código 1; rode
+depois de mexer no scriptbd.sql, em migracoes/ ou nas consultas.
+
+    docker compose -f bench_mysql.yml up -d
+    MYSQL_PORT=3307 python verificar_planos.py
+
+Conexão: as mesmas variáveis MYSQL_* do app.py.
+"""
+import sys
+
+from dotenv import load_dotenv
+
+from analiticos import SQL_HISTORICO_NOTAS
+from banco import criar_banco_script
+from estrutura_curso import SQL_MODULOS
+from gravacao_progresso import SQL_NIVEL_ALUNO
+from importar_alunos import SQL_EMAILS_CADASTRADOS
+from perfis import SQL_EMAIL_CADASTRADO, SQL_LOGIN_ALUNO, SQL_PERFIL_ALUNO, SQL_SENHA_ALUNO
+from progresso import SQL_PROGRESSO_ALUNO
+
+INDICE = 'índice'
+COBERTURA = 'cobertura'
+
+# (nome, sql, parâmetros(aluno_id, email), exigência)
+CONSULTAS_QUENTES = (
+    ('login', SQL_LOGIN_ALUNO, lambda aluno_id, email: [email], INDICE),
+    ('cadastro: email existe', SQL_EMAIL_CADASTRADO, lambda aluno_id, email: [email], COBERTURA),
+    ('perfil', SQL_PERFIL_ALUNO, lambda aluno_id, email: [aluno_id], INDICE),
+    ('progresso do aluno', SQL_PROGRESSO_ALUNO, lambda aluno_id, email: [aluno_id], COBERTURA),
+    ('login: atualiza hash', SQL_SENHA_ALUNO, lambda aluno_id, email: ['x', aluno_id], INDICE),
+    ('sobe nível', SQL_NIVEL_ALUNO, lambda aluno_id, email: ['Básico', aluno_id], INDICE),
+)
+
+LEITURAS_EM_LOTE = (
+    ('estrutura dos cursos', SQL_MODULOS),
+    ('reconstrução dos analíticos', SQL_HISTORICO_NOTAS),
+    ('importação: emails cadastrados', SQL_EMAILS_CADASTRADOS),
+)
+
+# Com a chave única/primária o MySQL resolve a consulta antes de executar
+# (nenhuma linha com aquele valor): o índice foi usado
+SEM_LINHA_PELA_CHAVE = ('no matching row in const table', 'Impossible WHERE noticed after reading const tables')
+
+
+def problemas_do_plano(linhas, exigencia):
+    """Lista de problemas de um EXPLAIN (vazia se o plano está dentro da regra)."""
+    problemas = []
+    for linha in linhas:
+        extra = linha.get('Extra') or ''
+        if any(mensagem in extra for mensagem in SEM_LINHA_PELA_CHAVE):
+            continue
+        tabela = linha.get('table')
+        if linha.get('type') in ('ALL', 'index') or not linha.get('key'):
+            problemas.append(f"{tabela}: varredura completa (type={linha.get('type')}, key={linha.get('key')})")
+        elif exigencia == COBERTURA and linha['key'] != 'PRIMARY' and 'Using index' not in extra:
+            problemas.append(f"{tabela}: índice {linha['key']} não cobre a consulta (Extra: {extra or '-'})")
+    return problemas
+
+
+def resumo_do_plano(linhas):
+    return '; '.join(f"{l.get('table')} type={l.get('type')} key={l.get('key')} rows={l.get('rows')}"
+                     f"{' [' + l['Extra'] + ']' if l.get('Extra') else ''}" for l in linhas)
+
+
+def main():
+    load_dotenv()
+    app, banco = criar_banco_script('verificar_planos')
+    falhas = 0
+    with app.app_context():
+        # Valores reais quando existem; com a tabela vazia o plano continua valendo
+        aluno = banco.consultar_um("SELECT aluno_id, email FROM aluno LIMIT 1") or {'aluno_id': 1, 'email': 'x@levelup.test'}
+
+        print("Consultas quentes:")
+        for nome, sql, parametros, exigencia in CONSULTAS_QUENTES:
+            linhas = banco.consultar_todos("EXPLAIN " + sql, parametros(aluno['aluno_id'], aluno['email']))
+            problemas = problemas_do_plano(linhas, exigencia)
+            falhas += bool(problemas)
+            print(f"  [{'FALHOU' if problemas else 'ok'}] {nome} ({exigencia}): {resumo_do_plano(linhas)}")
+            for problema in problemas:
+                print(f"           {problema}")
+
+        print("\nLeituras em lote (varredura esperada):")
+        for nome, sql in LEITURAS_EM_LOTE:
+            print(f"  {nome}: {resumo_do_plano(banco.consultar_todos('EXPLAIN ' + sql))}")
+
+    if falhas:
+        print(f"\n{falhas} consulta(s) quente(s) sem o índice esperado.", file=sys.stderr)
+        sys.exit(1)
+    print("\nTodas as consultas quentes usam índice.")
+
+
+if __name__ == '__main__':
+    main()
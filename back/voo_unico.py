@@ -0,0 +1,75 @@
+"""
+Agrupamento de chamadas iguais e simultâneas ("single-flight").
+
+Quando o professor pede para a turma "perguntar ao Dino sobre o módulo 2",
+dezenas de mensagens quase iguais chegam no mesmo segundo. A primeira
+(líder) faz a chamada ao Gemini; as que chegam com a mesma chave enquanto
+ela está em andamento esperam e recebem o mesmo resultado (ou a mesma
+exceção). Nada fica guardado depois que a chamada termina: repetir
+respostas prontas é papel do CacheRespostas.
+"""
+import threading
+
+
+class ErroEsperaVooUnico(RuntimeError):
+    """A chamada líder não terminou dentro do tempo de espera de quem aguardava por ela."""
+
+
+class _Voo:
+    __slots__ = ('evento', 'resultado', 'erro', 'seguidores')
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.erro = None
+        self.seguidores = 0
+
+
+class VooUnico:
+
+    def __init__(self, timeout_espera=60.0):
+        self.timeout_espera = timeout_espera
+        self._voos = {}
+        self._lock = threading.Lock()
+        self._metricas = {'lideres': 0, 'chamadas_evitadas': 0, 'falhas_compartilhadas': 0}
+
+    def executar(self, chave, funcao):
+        """
+        Roda funcao() uma vez por chave em andamento.
+        Retorna (resultado, compartilhado): compartilhado=True para quem só esperou.
+        """
+        with self._lock:
+            voo = self._voos.get(chave)
+            lider = voo is None
+            if lider:
+                voo = self._voos[chave] = _Voo()
+                self._metricas['lideres'] += 1
+            else:
+                voo.seguidores += 1
+                self._metricas['chamadas_evitadas'] += 1
+
+        if not lider:
+            if not voo.evento.wait(self.timeout_espera):
+                raise ErroEsperaVooUnico("Tempo esgotado esperando a resposta compartilhada.")
+            if voo.erro is not None:
+                raise voo.erro
+            return voo.resultado, True
+
+        try:
+            voo.resultado = funcao()
+            return voo.resultado, False
+        except BaseException as e:
+            voo.erro = e
+            raise
+        finally:
+            with self._lock:
+                del self._voos[chave]
+                if voo.erro is not None and voo.seguidores:
+                    self._metricas['falhas_compartilhadas'] += voo.seguidores
+            voo.evento.set()
+
+    def estatisticas(self):
+        with self._lock:
+            metricas = dict(self._metricas)
+            metricas['em_andamento'] = len(self._voos)
+        return metricas